@@ -17,18 +17,22 @@ class Hardcoded_Baseline:
         self.agent = PSClient(id=id)
         self.amp_factor = amp_factor
 
+    def act(self, state):
+        """Returns the action moving the bar towards the puck"""
+        puck_pos, bar_pos, theta, v_ind = state
+        puck_x, puck_y = puck_pos
+        bar_x, bar_y = bar_pos
+
+        action = self.amp_factor * (puck_y - bar_y)
+        return max(-1, min(1, action))
+
     def run(self, seed=0):
         state, done = self.agent.connect()
 
         action = 1
         while not done:
             state, reward, done, info = self.agent.step(action)
-            puck_pos, bar_pos, theta, v_ind = state
-            puck_x, puck_y = puck_pos
-            bar_x, bar_y = bar_pos
-
-            action = self.amp_factor * (puck_y - bar_y)
-            action = max(-1, min(1, action))
+            action = self.act(state)
 
             print(state, reward)
 
@@ -46,18 +50,22 @@ class Hardcoded_Baseline_Adaptive:
         # assert(id=='B')
         self.agent = PSClient(id=id)
 
+    def act(self, state):
+        """Returns the action moving the bar towards the puck, faster as the puck gets closer"""
+        puck_pos, bar_pos, theta, v_ind = state
+        puck_x, puck_y = puck_pos
+        bar_x, bar_y = bar_pos
+
+        action = (puck_y - bar_y) * ((0.75 + 0.77) / (0.77 - puck_x + 1e-6))
+        return max(-1, min(1, action))
+
     def run(self, seed=0):
         state, done = self.agent.connect()
 
         action = 1
         while not done:
             state, reward, done, info = self.agent.step(action)
-            puck_pos, bar_pos, theta, v_ind = state
-            puck_x, puck_y = puck_pos
-            bar_x, bar_y = bar_pos
-
-            action = (puck_y - bar_y) * ((0.75 + 0.77) / (0.77 - puck_x + 1e-6))
-            action = max(-1, min(1, action))
+            action = self.act(state)
 
             print(state, reward)
 
@@ -3,8 +3,13 @@ import numpy as np
 
 
 class PE:
-    def __init__(self, id):
+    def __init__(self, id, seed=0):
         self.agent = PSClient(id=id)
+        self.rnd = np.random.default_rng(seed=seed)
+
+    def act(self, state):
+        """Returns a uniformly random action"""
+        return 2 * self.rnd.random() - 1
 
     def run(self, seed=0):
         res = self.agent.connect()
@@ -15,9 +20,9 @@ class PE:
         state, done = res
         # print(state, done)
 
-        rnd = np.random.default_rng(seed=seed)
+        self.rnd = np.random.default_rng(seed=seed)
         while not done:
-            res = self.agent.step(2 * rnd.random() - 1)
+            res = self.agent.step(self.act(state))
             if not res:
                 print("server not responding")
                 break
@@ -32,11 +37,14 @@ class move_up:
     def __init__(self, id):
         self.agent = PSClient(id=id)
 
+    def act(self, state):
+        return 1
+
     def run(self, seed=0):
         state, done = self.agent.connect()
 
         while not done:
-            state, reward, done, info = self.agent.step(1)
+            state, reward, done, info = self.agent.step(self.act(state))
             # print(state, reward)
 
         self.agent.close()
@@ -56,24 +64,28 @@ class move_sine:
         self.agent = PSClient(id=id)
         self.amplitude = amplitude
 
+    def act(self, state):
+        """Returns the action following the sine contour from the current position of the puck"""
+        puck_pos, bar_pos, theta, v_ind = state
+        puck_x, puck_y = puck_pos
+        bar_x, bar_y = bar_pos
+
+        action = (
+            self.amplitude
+            * 2
+            * np.pi
+            / (0.75 + 0.77)
+            * np.cos(2 * np.pi / 1.52 * (puck_x + 0.75))
+        )
+        return max(-1, min(1, action))
+
     def run(self, seed=0):
         state, done = self.agent.connect()
 
         action = 1
         while not done:
             state, reward, done, info = self.agent.step(action)
-            puck_pos, bar_pos, theta, v_ind = state
-            puck_x, puck_y = puck_pos
-            bar_x, bar_y = bar_pos
-
-            action = (
-                self.amplitude
-                * 2
-                * np.pi
-                / (0.75 + 0.77)
-                * np.cos(2 * np.pi / 1.52 * (puck_x + 0.75))
-            )
-            action = max(-1, min(1, action))
+            action = self.act(state)
 
             # print(state, reward)
 
@@ -39,30 +39,27 @@ class GreedyPolicy(BasePolicy):
         Returns:
             np.ndarray: The action array
         """
-        act = np.empty(info_batch.shape[0])
-        for i, (info, obs) in enumerate(zip(info_batch, obs_batch)):
-            if self.disc_k is not None:
-                # Normalised action directed towards the puck
-                act[i] = ((obs[1] - obs[3]) + 2) * (self.disc_k - 1) / 4
-                assert act[i] >= 0 and act[i] <= self.disc_k - 1
+        obs = np.asarray(obs_batch)
+        # Vertical offset of the puck from the bar, in [-2, 2] as the positions are kept in [-1, 1]
+        gap = obs[:, 1] - obs[:, 3]
+        if self.disc_k is not None:
+            if self.agent != "bar":
+                raise NotImplementedError
 
-                if self.agent != "bar":
-                    raise NotImplementedError
-            else:
-                # The bar moves towards the puck depending on which side it is on
-                act[i] = np.sign(obs[1] - obs[3])
-                assert act[i] >= -1 and act[i] <= 1
+            # Normalised action directed towards the puck
+            return (gap + 2) * (self.disc_k - 1) / 4
 
-                if self.agent != "bar":
-                    # Greedy action for the puck depending on
-                    # where is more open area away from bar
-                    if np.abs(obs[1] - obs[3]) < 0.005:
-                        if np.abs(obs[i]) < 0.1:
-                            act[i] = np.sign(obs[1])
-                        else:
-                            act[i] = -np.sign(obs[1])
-                        if act[i] == 0:
-                            act[i] = 2 * np.random.randint(2) - 1
+        # The bar moves towards the puck depending on which side it is on
+        act = np.sign(gap)
+
+        if self.agent != "bar":
+            # Greedy action for the puck depending on
+            # where is more open area away from bar
+            # The observation of the i-th env of the batch is indexed by i (obs[i] in the per-env loop)
+            close = np.flatnonzero(np.abs(gap) < 0.005)
+            act[close] = np.where(np.abs(obs[close, close]) < 0.1, 1, -1) * np.sign(obs[close, 1])
+            tie = close[act[close] == 0]
+            act[tie] = 2 * np.random.randint(2, size=len(tie)) - 1
         return act
 
     def forward(self, batch: Batch, state=None, **kwargs):
@@ -19,6 +19,18 @@ class RandomPolicy(BasePolicy):
         self.actions = 2 * self.rng.random((max_steps // self.csteps + 1)) - 1
         self.max_steps = max_steps
 
+    def sample_actions(self, n: int):
+        """Actions of n whole episodes, for use with gym_env.envs.open_loop_rollout
+
+        Args:
+            n (int): Number of episodes
+
+        Returns:
+            np.ndarray: Actions of shape (n, max_steps), indexed by the number of steps taken
+        """
+        actions = self.actions[np.arange(self.max_steps) // self.csteps]
+        return np.tile(actions, (n, 1))
+
     def forward(self, batch: Batch, state=None, **kwargs):
         """Calculates and forwards the action to the environment
 
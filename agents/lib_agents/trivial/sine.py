@@ -25,30 +25,57 @@ class SinePolicy(BasePolicy):
         )
         self.max_cycles = max_cycles  # Maximum number of cycles
         self.min_magnitude = min_magnitude  # Minimum magnitude of the action
-        self.param = {}
+        # Parameters of every environment, indexed by env_id
+        self.magnitude = np.empty(0)
+        self.cycles = np.empty(0)
+        self.sampled = np.zeros(0, dtype=bool)
+
+    def _resize(self, n: int):
+        """Makes room for the parameters of environments with an env_id below n"""
+        if n > len(self.sampled):
+            pad = n - len(self.sampled)
+            self.magnitude = np.concatenate((self.magnitude, np.empty(pad)))
+            self.cycles = np.concatenate((self.cycles, np.empty(pad)))
+            self.sampled = np.concatenate((self.sampled, np.zeros(pad, dtype=bool)))
 
     def _get_action(self, info_batch: Batch, done_batch: Batch):
         """Calculates the action given the observation batch and information batch according to sine policy.
 
         Args:
-            obs_batch (Batch): Observation Batch
             info_batch (Batch): Information Batch
+            done_batch (Batch): Done flags of the batch
 
         Returns:
             np.ndarray: The action array
         """
-        act = np.empty(info_batch.shape[0])
-        for i, (info, done) in enumerate(zip(info_batch, done_batch)):
-            if info.env_id not in self.param or done:
-                self.param[info.env_id] = (
-                    self.min_magnitude + self.rng.random() * (1 - self.min_magnitude),
-                    (2 * self.rng.random() - 1) * self.max_cycles,
-                )
-            act[i] = self.param[info.env_id][0] * np.sin(
-                np.pi * self.param[info.env_id][1] * info.steps / self.max_steps
-            )
-
-        return act
+        env_id = np.asarray(info_batch.env_id, dtype=int)
+        self._resize(env_id.max() + 1)
+
+        # New parameters for the environments starting an episode, drawn in the order of the batch
+        resample = env_id[~self.sampled[env_id] | np.asarray(done_batch, dtype=bool)]
+        param = self.rng.random((len(resample), 2))
+        self.magnitude[resample] = self.min_magnitude + param[:, 0] * (1 - self.min_magnitude)
+        self.cycles[resample] = (2 * param[:, 1] - 1) * self.max_cycles
+        self.sampled[resample] = True
+
+        return self.magnitude[env_id] * np.sin(
+            np.pi * self.cycles[env_id] * np.asarray(info_batch.steps) / self.max_steps
+        )
+
+    def sample_actions(self, n: int):
+        """Samples the actions of n whole episodes, for use with gym_env.envs.open_loop_rollout
+
+        Args:
+            n (int): Number of episodes
+
+        Returns:
+            np.ndarray: Actions of shape (n, max_steps), indexed by the number of steps taken
+        """
+        param = self.rng.random((n, 2))
+        magnitude = self.min_magnitude + param[:, :1] * (1 - self.min_magnitude)
+        cycles = (2 * param[:, 1:] - 1) * self.max_cycles
+        steps = np.arange(self.max_steps)
+        return magnitude * np.sin(np.pi * cycles * steps / self.max_steps)
 
     def forward(self, batch: Batch, state=None, **kwargs):
         """Calculates and forwards the action to the environment
@@ -4,6 +4,31 @@ import numpy as np
 from smurves import surgebinder
 
 
+def smurve_actions(n: int):
+    """Generates the actions of n trajectories with surgebinder, which draws from the random and np.random modules
+
+    Args:
+        n (int): Number of trajectories
+
+    Returns:
+        np.ndarray: Actions of shape (n, 91) to take to obtain the trajectories
+    """
+    curves = surgebinder(
+        n_curves=n,
+        x_interval=[0.0, 91.0],
+        y_interval=[0.0, 2.0],
+        n_measure=92,
+        direction_maximum=50,
+        convergence_point=[0.0, 1.0],
+    )
+    traj = np.array(curves)
+    traj[:, :, 1] -= 1
+    actions = np.diff(traj[:, :, 1], axis=1)
+    v_p = (0.77 + 0.75) / 90
+    actions /= v_p
+    return actions
+
+
 class SmurvePolicy(BasePolicy):
     """Implementation of the Smurve Policy
 
@@ -11,31 +36,65 @@ class SmurvePolicy(BasePolicy):
         BasePolicy (): The base policy class.
     """
 
-    def __init__(self, seed: int = 0, max_steps: int = 90, **kwargs):
+    def __init__(self, seed: int = 0, max_steps: int = 90, bank: str = None, **kwargs):
+        """Smurve policy
+
+        Args:
+            seed (int, optional): Seed of the policy. Defaults to 0.
+            max_steps (int, optional): Maximum number of steps taken by the agent in an episode. Defaults to 90.
+            bank (str, optional): Bank of trajectories made by utils/smurve_bank.py to sample from instead of
+                generating them, the rows being picked by the seeded generator so that runs with the same seed get
+                the same trajectories. Defaults to None.
+
+        Raises:
+            Exception: If the trajectories of the bank are shorter than the episodes
+        """
         super().__init__(**kwargs)
         self.rng = np.random.default_rng(seed)
         self.max_steps = (
             max_steps  # Maximum number of steps taken by the agent in an episode
         )
-        self.param = {}  # Dictionary to store generated trajectories
+        self.bank = None
+        if bank is not None:
+            # Memory-mapped, only the sampled rows are read
+            self.bank = np.load(bank, mmap_mode="r")
+            if self.bank.shape[1] <= max_steps:
+                raise Exception(
+                    "Trajectories of {} have {} steps, {} needed".format(
+                        bank, self.bank.shape[1], max_steps + 1
+                    )
+                )
+        self.traj = None  # Generated trajectory of every environment, indexed by env_id
+        self.sampled = np.zeros(0, dtype=bool)
 
     def _get_action(self, info_batch: Batch, done_batch: Batch):
         """Calculates the action given the observation batch and information batch according to smurve policy.
 
         Args:
-            obs_batch (Batch): Observation Batch
             info_batch (Batch): Information Batch
+            done_batch (Batch): Done flags of the batch
 
         Returns:
             np.ndarray: The action array
         """
-        act = np.empty(info_batch.shape[0])
-        for i, (info, done) in enumerate(zip(info_batch, done_batch)):
-            if info.env_id not in self.param or done:
-                self.param[info.env_id] = self.gen_traj()
-            act[i] = self.param[info.env_id][info.steps]
+        env_id = np.asarray(info_batch.env_id, dtype=int)
+        if env_id.max() >= len(self.sampled):
+            pad = env_id.max() + 1 - len(self.sampled)
+            self.sampled = np.concatenate((self.sampled, np.zeros(pad, dtype=bool)))
+
+        # New trajectories for the environments starting an episode, generated in the order of the batch
+        resample = env_id[~self.sampled[env_id] | np.asarray(done_batch, dtype=bool)]
+        if len(resample):
+            traj = self.gen_trajs(len(resample))
+            if self.traj is None or len(self.traj) < len(self.sampled):
+                grown = np.empty((len(self.sampled), traj.shape[1]))
+                if self.traj is not None:
+                    grown[: len(self.traj)] = self.traj
+                self.traj = grown
+            self.traj[resample] = traj
+            self.sampled[resample] = True
 
-        return act
+        return self.traj[env_id, np.asarray(info_batch.steps, dtype=int)]
 
     def forward(self, batch: Batch, state=None, **kwargs):
         """Calculates and forwards the action to the environment
@@ -53,6 +112,17 @@ class SmurvePolicy(BasePolicy):
             act = np.zeros(batch.obs.shape[0])
         return Batch(act=act, state=None)
 
+    def sample_actions(self, n: int):
+        """Samples the actions of n whole episodes, for use with gym_env.envs.open_loop_rollout
+
+        Args:
+            n (int): Number of episodes
+
+        Returns:
+            np.ndarray: Actions of shape (n, max_steps), indexed by the number of steps taken
+        """
+        return self.gen_trajs(n)[:, : self.max_steps]
+
     def learn(self, batch: Batch, **kwargs):
         return {}
 
@@ -62,17 +132,17 @@ class SmurvePolicy(BasePolicy):
         Returns:
             List[Float]: List of actions to take to obtain the trajectory
         """
-        curves = surgebinder(
-            n_curves=1,
-            x_interval=[0.0, 91.0],
-            y_interval=[0.0, 2.0],
-            n_measure=92,
-            direction_maximum=50,
-            convergence_point=[0.0, 1.0],
-        )
-        traj = np.array(curves)[0]
-        traj[:, 1] -= 1
-        actions = np.diff(traj[:, 1])
-        v_p = (0.77 + 0.75) / 90
-        actions /= v_p
-        return actions
+        return smurve_actions(1)[0]
+
+    def gen_trajs(self, n: int):
+        """Generates n trajectories, or samples them from the bank
+
+        Args:
+            n (int): Number of trajectories
+
+        Returns:
+            np.ndarray: Actions of shape (n, steps) to take to obtain the trajectories
+        """
+        if self.bank is not None:
+            return self.bank[self.rng.integers(len(self.bank), size=n)].astype(np.float64)
+        return np.stack([self.gen_traj() for _ in range(n)])
@@ -1,9 +1,18 @@
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from tianshou.data import Batch
 from tianshou.data.buffer.base import ReplayBuffer
 from tianshou.policy import BasePolicy
 import numpy as np
-from copy import deepcopy
+import torch
+
+
+def _view(batch: Batch) -> Batch:
+    """Copies the structure of a batch without copying its arrays, so that keys can be set on the copy alone"""
+    view = Batch()
+    for key, value in batch.items():
+        view.__dict__[key] = _view(value) if isinstance(value, Batch) else value
+    return view
 
 
 class TwoAgentPolicy(BasePolicy):
@@ -13,26 +22,80 @@ class TwoAgentPolicy(BasePolicy):
         BasePolicy (Any): The base policy class
     """
 
-    def __init__(self, policies: Tuple[BasePolicy, BasePolicy], **kwargs):
+    def __init__(
+        self,
+        policies: Tuple[BasePolicy, BasePolicy],
+        trainable: Tuple[bool, bool] = (True, True),
+        concurrent_learn: bool = False,
+        **kwargs,
+    ):
+        """Two agent policy
+
+        Args:
+            policies (Tuple[BasePolicy, BasePolicy]): Policies of the puck and the bar
+            trainable (Tuple[bool, bool], optional): Whether the policies of the puck and the bar are trained. A
+                frozen policy only acts, in eval mode and without gradients, and its batches are neither partitioned
+                nor processed nor learnt from. Defaults to (True, True).
+            concurrent_learn (bool, optional): Whether the puck and the bar learn at the same time on two threads,
+                with the process-wide number of torch intra-op threads halved while they learn. The order in which
+                they draw random numbers then varies, so runs are no longer exactly reproducible. Defaults to False.
+        """
         super().__init__(**kwargs)
         (self.puck_policy, self.bar_policy) = policies
+        self.trainable = {"puck": trainable[0], "bar": trainable[1]}
+        self.concurrent_learn = concurrent_learn
+        self._executor = None  # Threads of the concurrent learners, started with the first update
+        for agent in self._frozen_agents():
+            self._policy(agent).requires_grad_(False)
+            self._policy(agent).eval()
 
-    def _partition_batch(self, batch: Batch):
-        """Partitions the batch into two batches, one for puck and one for bar."""
-        puck_batch = batch
-        bar_batch = deepcopy(batch)
+    def _policy(self, agent: str) -> BasePolicy:
+        return self.puck_policy if agent == "puck" else self.bar_policy
 
-        if not batch["act"].is_empty():
-            puck_batch["act"] = puck_batch["act"]["puck"]
-            bar_batch["act"] = bar_batch["act"]["bar"]
+    def _frozen_agents(self) -> List[str]:
+        return [agent for agent in ("puck", "bar") if not self.trainable[agent]]
+
+    def train(self, mode: bool = True):
+        """Sets the training mode, frozen policies stay in eval mode"""
+        super().train(mode)
+        for agent in self._frozen_agents():
+            self._policy(agent).eval()
+        return self
 
-        if isinstance(batch["rew"], np.ndarray) or (
-            isinstance(batch["rew"], Batch) and not batch["rew"].is_empty()
+    def _partition_batch(self, batch: Batch, agents: Tuple[str, ...] = ("puck", "bar")):
+        """Partitions the batch into two batches, one for puck and one for bar.
+
+        The batches are views of the batch sharing its arrays, only their act and rew keys are set on their own: the
+        action of the agent and for the puck the negated reward. The batch itself is left unchanged.
+
+        Args:
+            batch (Batch): Batch to partition
+            agents (Tuple[str, ...], optional): Agents to make a batch for, the others get None. Defaults to both.
+        """
+        puck_batch = _view(batch) if "puck" in agents else None
+        bar_batch = _view(batch) if "bar" in agents else None
+
+        if not batch["act"].is_empty():
+            if puck_batch is not None:
+                puck_batch["act"] = batch["act"]["puck"]
+            if bar_batch is not None:
+                bar_batch["act"] = batch["act"]["bar"]
+
+        if puck_batch is not None and (
+            isinstance(batch["rew"], np.ndarray)
+            or (isinstance(batch["rew"], Batch) and not batch["rew"].is_empty())
         ):
-            puck_batch["rew"] = -1.0 * puck_batch["rew"]
+            puck_batch["rew"] = -1.0 * batch["rew"]
 
         return (puck_batch, bar_batch)
 
+    def _forward(self, agent: str, batch: Batch, state, params: dict) -> Batch:
+        """Forwards the batch of an agent to its policy, without gradients if it is frozen"""
+        if self.trainable[agent]:
+            return self._policy(agent).forward(batch, state, **params)
+        with torch.no_grad():
+            return self._policy(agent).forward(batch, state, **params)
+
     """
         This function is called by collector.
     """
@@ -56,11 +119,11 @@ class TwoAgentPolicy(BasePolicy):
         """
         (puck_batch, bar_batch) = self._partition_batch(batch)
 
-        puck_out = self.puck_policy.forward(
-            puck_batch, state, **(other_params.get("bar", {}))
+        puck_out = self._forward(
+            "puck", puck_batch, state, other_params.get("bar", {})
         )
-        bar_out = self.bar_policy.forward(
-            bar_batch, state, **(other_params.get("puck", {}))
+        bar_out = self._forward(
+            "bar", bar_batch, state, other_params.get("puck", {})
         )
         out = Batch(
             act=Batch(puck=puck_out.act, bar=bar_out.act),
@@ -113,29 +176,71 @@ class TwoAgentPolicy(BasePolicy):
         These three functions are called in update function of BasePolicy in the order process_fn -> learn -> post_process_fn one after another.
     """
 
+    def update(
+        self, sample_size: int, buffer: Optional[ReplayBuffer], **kwargs: Any
+    ) -> Dict[str, Any]:
+        if not any(self.trainable.values()):
+            # Nothing to learn, not even the buffer needs sampling
+            return {}
+        return super().update(sample_size, buffer, **kwargs)
+
     def process_fn(
         self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray
     ) -> Batch:
-        (puck_batch, bar_batch) = self._partition_batch(batch)
+        agents = tuple(agent for agent in ("puck", "bar") if self.trainable[agent])
+        (puck_batch, bar_batch) = self._partition_batch(batch, agents)
 
         puck_out = (
             self.puck_policy.process_fn(puck_batch, buffer, indices)
-            if self.puck_policy.process_fn
-            else puck_batch
+            if self.trainable["puck"]
+            else None
         )
         bar_out = (
             self.bar_policy.process_fn(bar_batch, buffer, indices)
-            if self.bar_policy.process_fn
-            else bar_batch
+            if self.trainable["bar"]
+            else None
         )
 
         return (puck_out, bar_out)
 
     def learn(self, batch: Batch, **kwargs):
+        """Updates the trainable policies with their processed batches
+
+        Returns:
+            Dict[str, Any]: Stats of the updates, prefixed with "puck/" and "bar/"
+        """
         (puck_batch, bar_batch) = batch
-        puck_out = self.puck_policy.learn(puck_batch, **kwargs)
-        bar_out = self.bar_policy.learn(bar_batch, **kwargs)
-        return bar_out
+        batches = {"puck": puck_batch, "bar": bar_batch}
+        agents = [agent for agent in ("puck", "bar") if self.trainable[agent]]
+
+        if self.concurrent_learn and len(agents) == 2:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2)
+            # The number of intra-op threads is process-wide, so it is split once here for both learners rather
+            # than by the learner threads, and restored when both are done
+            num_threads = torch.get_num_threads()
+            torch.set_num_threads(max(1, num_threads // 2))
+            try:
+                futures = {
+                    agent: self._executor.submit(
+                        self._policy(agent).learn, batches[agent], **kwargs
+                    )
+                    for agent in agents
+                }
+                outs = {agent: future.result() for agent, future in futures.items()}
+            finally:
+                torch.set_num_threads(num_threads)
+        else:
+            outs = {
+                agent: self._policy(agent).learn(batches[agent], **kwargs)
+                for agent in agents
+            }
+
+        return {
+            "{}/{}".format(agent, key): value
+            for agent, out in outs.items()
+            for key, value in out.items()
+        }
 
     def post_process_fn(
         self, batch: Batch, buffer: ReplayBuffer, indices: np.ndarray
@@ -1,2 +1,4 @@
 from .server import PSServer
 from .client import PSClient
+from .spectator import PSSpectator
+from .inference import InferenceService, PolicyChannel
@@ -0,0 +1,83 @@
+import asyncio
+from collections import deque
+
+from .protocol import encode_spectate
+
+
+class Subscriber:
+    """Spectator connection with a bounded queue of frames, the oldest being dropped when it is full
+
+    A task per subscriber writes the queued frames, so that a slow spectator only holds up its own task and never the
+    match.
+    """
+
+    def __init__(self, writer, max_queue=64):
+        """Spectator connection
+
+        Args:
+            writer (asyncio.StreamWriter): Connection of the spectator
+            max_queue (int, optional): Maximum number of frames waiting to be sent. Defaults to 64.
+        """
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername") or "local"  # No address for Unix sockets
+        self.queue = deque(maxlen=max_queue)
+        self.ready = asyncio.Event()
+        self.closing = False
+        self.closed = False
+        self.dropped = 0  # Frames dropped as the queue was full
+        self.task = asyncio.ensure_future(self.run())
+
+    def push(self, frame):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(frame)
+        self.ready.set()
+
+    async def run(self):
+        try:
+            while not (self.closing and not self.queue):
+                await self.ready.wait()
+                self.ready.clear()
+                while self.queue:
+                    self.writer.write(self.queue.popleft())
+                    await self.writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    def close(self):
+        """Closes the connection once the queued frames are sent"""
+        self.closing = True
+        self.ready.set()
+
+
+class Broadcast:
+    """Fans out the ticks of a match to its spectators"""
+
+    def __init__(self, match_id):
+        self.match_id = match_id
+        self.config = None  # Config of the environment of the match, once it started
+        self.subscribers = []
+
+    def add(self, subscriber):
+        if self.config is not None:
+            subscriber.push(encode_spectate(self.match_id, self.config))
+        self.subscribers.append(subscriber)
+
+    def start(self, config):
+        """Tells the spectators that the match started, with the config of its environment"""
+        self.config = config
+        self.publish(encode_spectate(self.match_id, config))
+
+    def publish(self, frame):
+        if any(subscriber.closed for subscriber in self.subscribers):
+            self.subscribers = [subscriber for subscriber in self.subscribers if not subscriber.closed]
+        for subscriber in self.subscribers:
+            subscriber.push(frame)
+
+    def close(self):
+        for subscriber in self.subscribers:
+            subscriber.close()
+        self.subscribers = []
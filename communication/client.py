@@ -1,6 +1,7 @@
-import socket, pickle, json
+import socket, json, os
 from _thread import *
 from importlib.resources import open_text
+from .protocol import PROTOCOL, BinaryChannel, PickleChannel, handshake, is_local, local_path
 
 with open_text("communication", "config.json") as f:
     config = json.load(f)
@@ -9,39 +10,123 @@ with open_text("communication", "config.json") as f:
     msg_length = config["msg length"]
 
 
+def connect_socket(sock, host, port, local=None):
+    """Connects to a server, through its Unix socket if it is on the same machine
+
+    Args:
+        sock (socket.socket): Unconnected TCP socket, replaced by a Unix socket if the server is local
+        host (str): Host of the server
+        port (int): Port of the server
+        local (bool, optional): Whether to connect through the Unix socket. Defaults to None, to do so whenever the
+            server is local and has one.
+
+    Returns:
+        socket.socket: Connected socket
+    """
+    use_local = local
+    if use_local is None:
+        use_local = hasattr(socket, "AF_UNIX") and is_local(host) and os.path.exists(local_path(port))
+    if use_local:
+        sock.close()
+        sock = socket.socket(socket.AF_UNIX)
+        try:
+            sock.connect(local_path(port))
+            return sock
+        except OSError:
+            if local:
+                raise
+            # Socket left by a server which did not exit cleanly
+            sock.close()
+            sock = socket.socket()
+    sock.connect((host, port))
+    return sock
+
+
 class PSClient:
-    def __init__(self, id):
+    def __init__(self, id, binary=True, local=None):
+        """Client playing as puck or bar on a PSServer
+
+        Args:
+            id (str): "P" to play as puck or "B" to play as bar
+            binary (bool, optional): Whether to use the framed binary protocol instead of pickle. Defaults to True.
+            local (bool, optional): Whether to connect through the Unix socket of a server on the same machine
+                instead of TCP. Defaults to None, to do so whenever the server is local and has one.
+        """
         self.id = id
+        self.binary = binary
+        self.local = local
+        self.channel = None
+        self.episode = None  # Index of the current episode in the session
+        self.seed = None  # Seed of the current episode, given by the server with the binary protocol
 
         self.sock = socket.socket()
         print("created socket successfully")
 
     def connect(self, host=host, port=port):
-        self.sock.connect((host, port))
-        self.sock.send(str.encode(self.id))
+        self.sock = connect_socket(self.sock, host, port, self.local)
+        self.sock.send(str.encode(handshake(self.id, self.binary)))
 
         msg = self.sock.recv(msg_length)
-        if msg.decode() != "connected":
+        if msg.decode() == "connected|" + PROTOCOL:
+            self.channel = BinaryChannel(self.sock)
+        elif msg.decode() == "connected":
+            self.channel = PickleChannel(self.sock, msg_length)
+        else:
             print("disconnected")
             return None
 
-        self.sock.send(str.encode("start"))
+        return self.reset()
 
-        msg = self.sock.recv(msg_length)
-        if not msg:
+    def reset(self):
+        """Asks for the next episode of the session, on the same connection
+
+        Returns:
+            Tuple: Initial (state, done) of the episode, None if the server closed the connection
+        """
+        self.channel.send_start()
+
+        res = self.channel.recv_state()
+        if res is None:
             print("disconnected")
             return None
 
-        return pickle.loads(msg)
+        self.episode = 0 if self.episode is None else self.episode + 1
+        if isinstance(self.channel, BinaryChannel):
+            self.episode, self.seed = self.channel.episode, self.channel.seed
+        return res
+
+    def episodes(self, n, host=host, port=port):
+        """Plays n episodes over a single connection, closed at the end
+
+        Yields the initial (state, done) of every episode, step is then called until the episode is done before
+        asking for the next one::
+
+            for state, done in client.episodes(100):
+                while not done:
+                    state, reward, done, info = client.step(action)
+
+        Args:
+            n (int): Number of episodes
+            host (str, optional): Host of the server. Defaults to the host of config.json.
+            port (int, optional): Port of the server. Defaults to the port of config.json.
+        """
+        for i in range(n):
+            if self.channel is None:
+                res = self.connect(host, port)
+            else:
+                res = self.reset()
+            if res is None:
+                break
+            yield res
+        self.close()
 
     def step(self, action):
-        self.sock.send(pickle.dumps(action))
+        self.channel.send_action(action)
 
-        msg = self.sock.recv(msg_length)
-        if not msg:
+        res = self.channel.recv_result()
+        if res is None:
             print("disconnected")
             return None
-        res = pickle.loads(msg)
 
         return res
 
@@ -0,0 +1,214 @@
+import asyncio, heapq, os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class InferenceService:
+    """Serves the actions of a saved policy to many matches, micro-batching their requests
+
+    Requests made by the matches of a server are gathered until max_batch_size of them are waiting or max_wait
+    seconds passed since the first one, and are then answered with a single forward pass of the policy. The forward
+    pass runs on a worker thread, so the event loop keeps serving the matches meanwhile.
+    """
+
+    def __init__(
+        self,
+        agent,
+        algo,
+        run_id=None,
+        max_batch_size=64,
+        max_wait=0.001,
+        save_folder="saved_policies",
+    ):
+        """Inference service
+
+        Args:
+            agent (str): "puck" or "bar"
+            algo (str): Algorithm of the policy, a key of utils.train.algo_mapping
+            run_id (str, optional): Run whose checkpoint ``<save_folder>/<run_id>/<agent>_<algo>.pth`` is loaded.
+                Defaults to None, for policies without a checkpoint (e.g. sine).
+            max_batch_size (int, optional): Maximum number of requests in a forward pass. Defaults to 64.
+            max_wait (float, optional): Maximum seconds a request waits for others to batch with. Defaults to 0.001.
+            save_folder (str, optional): Folder of the saved policies. Defaults to "saved_policies".
+        """
+        # The training stack is only loaded by the servers serving policies, not by the clients of communication
+        import torch
+        from utils.envs import MakeEnv
+        from utils.train import make_policy
+
+        if agent not in ("puck", "bar"):
+            raise Exception("Unidentified agent {}".format(agent))
+        self.agent = agent
+        self.algo = algo
+        self.run_id = run_id
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.policy = make_policy(agent, algo)
+        if run_id is not None:
+            path = os.path.join(save_folder, run_id, "{}_{}.pth".format(agent, algo))
+            print("Loading {} policy from {}".format(agent, path))
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.policy.load_state_dict(torch.load(path, map_location=torch.device(device)))
+        self.policy.eval()
+
+        # Observations are flattened as FlattenObservation does for the policies trained with utils.train
+        env = MakeEnv().create_env()
+        state_space = env.unwrapped.state_space
+        self.theta_n = state_space[2].n
+        self.obs_size = env.observation_space.shape[0]
+        env.close()
+
+        # Ids of the agents, the env_id of their requests. The ids of the agents which left are handed out again,
+        # smallest first, so that the per-env state of the policies stays bounded by the number of matches
+        self.key_count = 0
+        self.free_keys = []
+        self.requests = []  # Waiting (key, state, steps, new_episode, future) requests
+        self.has_requests = None
+        self.full = None
+        self.task = None
+        # A single worker, as policies keep state between calls (e.g. the trajectories of sine)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.stats = {"requests": 0, "batches": 0, "max_batch_size": 0, "mean_batch_size": 0.0}
+
+    def new_key(self):
+        """Returns the id of a new agent, the smallest one not used by an agent in a match"""
+        if self.free_keys:
+            return heapq.heappop(self.free_keys)
+        self.key_count += 1
+        return self.key_count - 1
+
+    def release_key(self, key):
+        """Hands the id of an agent which left its match out to the next new agent"""
+        heapq.heappush(self.free_keys, key)
+
+    def _observations(self, states):
+        """Flattens states into the observations of the policy"""
+        obs = np.zeros((len(states), self.obs_size), dtype=np.float32)
+        rows = np.arange(len(states))
+        obs[:, :4] = [(puck_x, puck_y, bar_x, bar_y) for (puck_x, puck_y), (bar_x, bar_y), _, _ in states]
+        obs[rows, 4 + np.array([state[2] for state in states])] = 1
+        obs[rows, 4 + self.theta_n + np.array([state[3] for state in states])] = 1
+        return obs
+
+    def _forward(self, requests):
+        """Computes the actions of a batch of requests with one forward pass"""
+        import torch
+        from tianshou.data import Batch
+
+        keys, states, steps, new_episodes, _ = zip(*requests)
+        batch = Batch(
+            obs=self._observations(states),
+            info=Batch(env_id=np.array(keys), steps=np.array(steps)),
+            done=np.array(new_episodes),
+        )
+        with torch.no_grad():
+            act = self.policy(batch).act
+        if isinstance(act, torch.Tensor):
+            act = act.cpu().numpy()
+        act = self.policy.map_action(np.asarray(act))
+        return np.asarray(act, dtype=np.float64).reshape(len(requests), -1)[:, 0].tolist()
+
+    async def act(self, key, state, steps, new_episode=False):
+        """Requests the action of an agent, batched with the requests of other matches
+
+        Args:
+            key (int): Id of the agent, from new_key
+            state (Tuple): State of the environment
+            steps (int): Steps taken in the episode
+            new_episode (bool, optional): Whether the episode just started. Defaults to False.
+
+        Returns:
+            float: Action of the agent
+        """
+        if self.task is None:
+            self.has_requests = asyncio.Event()
+            self.full = asyncio.Event()
+            self.task = asyncio.ensure_future(self.run())
+
+        future = asyncio.get_running_loop().create_future()
+        self.requests.append((key, state, steps, new_episode, future))
+        self.has_requests.set()
+        if len(self.requests) >= self.max_batch_size:
+            self.full.set()
+        return await future
+
+    async def run(self):
+        """Answers the waiting requests batch by batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.has_requests.wait()
+            if len(self.requests) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            requests = self.requests[: self.max_batch_size]
+            self.requests = self.requests[self.max_batch_size :]
+            if len(self.requests) < self.max_batch_size:
+                self.full.clear()
+            if not self.requests:
+                self.has_requests.clear()
+
+            try:
+                actions = await loop.run_in_executor(self.executor, self._forward, requests)
+            except Exception as e:
+                for request in requests:
+                    if not request[-1].done():
+                        request[-1].set_exception(e)
+                continue
+            for request, action in zip(requests, actions):
+                if not request[-1].done():
+                    request[-1].set_result(action)
+
+            self.stats["requests"] += len(requests)
+            self.stats["batches"] += 1
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(requests))
+            self.stats["mean_batch_size"] = self.stats["requests"] / self.stats["batches"]
+
+
+class PolicyChannel:
+    """Server side agent playing the actions of an InferenceService, paired in the lobby like a connected client"""
+
+    def __init__(self, service):
+        self.service = service
+        self.key = service.new_key()
+        self.peer = "{} policy {}".format(service.algo, service.run_id or "")
+        self.state = None
+        self.steps = 0
+        self.new_episode = False
+
+    async def recv_start(self):
+        # A policy plays as many episodes as its opponent wants
+        return True
+
+    def send_state(self, state, done, episode=0, seed=0):
+        self.state = state
+        self.steps = 0
+        self.new_episode = True
+
+    async def recv_action(self):
+        new_episode, self.new_episode = self.new_episode, False
+        return await self.service.act(self.key, self.state, self.steps, new_episode)
+
+    def encode_result(self, result):
+        # Nothing is serialized for a policy, the result is written as is
+        return result
+
+    def write(self, result):
+        self.state = result[0]
+        self.steps = result[3]["steps"]
+
+    def send_result(self, result):
+        self.write(result)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        # The match is over, its id can be given to the agent of another match
+        if self.key is not None:
+            self.service.release_key(self.key)
+            self.key = None
@@ -0,0 +1,78 @@
+import bisect, math
+
+# Upper bounds in seconds of the buckets of the histograms, two per octave from 1us to about 2 minutes
+BUCKETS = [1e-6 * 2 ** (i / 2) for i in range(55)]
+
+
+class Histogram:
+    """Histogram of durations with fixed logarithmic buckets, cheap to add to from the game loop"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last bucket for durations over the largest bound
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value):
+        """Adds a duration in seconds"""
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds the durations of another histogram"""
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Returns the upper bound of the bucket holding the q-th percentile, None if empty
+
+        Args:
+            q (float): Percentile, between 0 and 100
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        total = 0
+        for i, count in enumerate(self.counts):
+            total += count
+            if count and total >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        """Returns the summary and non empty buckets of the histogram, in seconds"""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            # [upper bound, count] of every non empty bucket, null bound for the overflow bucket
+            "buckets": [
+                [BUCKETS[i] if i < len(BUCKETS) else None, count]
+                for i, count in enumerate(self.counts)
+                if count
+            ],
+        }
+
+
+# Timings of a match: waits for the action of every client (from the start of the tick), steps of the environment,
+# rendering, serialization and sending of the results, processing time of the ticks and lateness of their start
+METRICS = ["recv_puck", "recv_bar", "step", "render", "serialize", "send", "tick", "tick_jitter"]
+
+
+def make_metrics():
+    return {name: Histogram() for name in METRICS}
@@ -0,0 +1,402 @@
+import asyncio
+import ipaddress
+import json
+import os
+import pickle
+import socket
+import struct
+import tempfile
+
+# Name of the binary protocol, sent after the agent id in the handshake (e.g. "P|PSB/2")
+PROTOCOL = "PSB/2"
+
+## Message kinds
+START = 1
+STATE = 2
+ACTION = 3
+RESULT = 4
+# Sent to spectators, the match followed by the state of every tick
+SPECTATE = 5
+TICK = 6
+
+# Every binary message is framed by its kind and the length of its payload
+FRAME_HEADER = struct.Struct("<BH")
+
+# State tuple ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind) followed by done, the index of the episode in the
+# session and its seed
+STATE_LAYOUT = struct.Struct("<4dii?Iq")
+ACTION_LAYOUT = struct.Struct("<d")
+# State tuple followed by reward, done and the step count of info
+RESULT_LAYOUT = struct.Struct("<4diid?I")
+# Episode, step, positions as float32, theta, v_ind, outcome (reward of the bar once done, 0 before) and done
+TICK_LAYOUT = struct.Struct("<IH4fHBb?")
+
+
+def _frame(layout=None):
+    """Layout of a whole frame, header followed by payload, so that frames are packed and unpacked in one call"""
+    return struct.Struct(FRAME_HEADER.format + (layout.format[1:] if layout else ""))
+
+
+FRAMES = {
+    START: _frame(),
+    STATE: _frame(STATE_LAYOUT),
+    ACTION: _frame(ACTION_LAYOUT),
+    RESULT: _frame(RESULT_LAYOUT),
+    TICK: _frame(TICK_LAYOUT),
+}
+
+
+def _flatten_state(state):
+    (puck_x, puck_y), (bar_x, bar_y), theta, v_ind = state
+    return float(puck_x), float(puck_y), float(bar_x), float(bar_y), int(theta), int(v_ind)
+
+
+def _unflatten_state(values):
+    puck_x, puck_y, bar_x, bar_y, theta, v_ind = values
+    return ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind)
+
+
+## Binary frames
+def encode_start():
+    return FRAMES[START].pack(START, 0)
+
+
+def encode_state(state, done, episode=0, seed=0):
+    frame = FRAMES[STATE]
+    return frame.pack(
+        STATE, frame.size - FRAME_HEADER.size, *_flatten_state(state), bool(done), episode, seed
+    )
+
+
+def encode_action(action):
+    frame = FRAMES[ACTION]
+    return frame.pack(ACTION, frame.size - FRAME_HEADER.size, float(action))
+
+
+def encode_result(result):
+    # Sent every step, so the state is unpacked inline
+    ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind), reward, done, info = result
+    frame = FRAMES[RESULT]
+    return frame.pack(
+        RESULT,
+        frame.size - FRAME_HEADER.size,
+        float(puck_x),
+        float(puck_y),
+        float(bar_x),
+        float(bar_y),
+        int(theta),
+        int(v_ind),
+        float(reward),
+        bool(done),
+        info["steps"],
+    )
+
+
+def encode_tick(episode, step, state, outcome, done):
+    ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind) = state
+    frame = FRAMES[TICK]
+    return frame.pack(
+        TICK,
+        frame.size - FRAME_HEADER.size,
+        episode,
+        step,
+        puck_x,
+        puck_y,
+        bar_x,
+        bar_y,
+        theta,
+        v_ind,
+        int(outcome),
+        bool(done),
+    )
+
+
+def encode_spectate(match_id, config):
+    """Frame of variable length telling spectators the match they follow and the config of its environment"""
+    payload = json.dumps({"match": match_id, "config": config}).encode()
+    return FRAME_HEADER.pack(SPECTATE, len(payload)) + payload
+
+
+def decode_spectate(payload):
+    """Returns the match id and config of a SPECTATE payload, lists of the config as tuples as PSE expects"""
+    message = json.loads(payload.decode())
+    config = {
+        key: tuple(value) if isinstance(value, list) else value for key, value in message["config"].items()
+    }
+    return message["match"], config
+
+
+def decode(kind, data):
+    """Unpacks a whole frame which must be of the given kind
+
+    Args:
+        kind (int): Expected kind of message
+        data (bytes | bytearray): Frame of FRAMES[kind].size bytes
+
+    Raises:
+        Exception: If the frame is of another kind
+
+    Returns:
+        Any: True for START, (state, done, episode, seed) for STATE, the action for ACTION and
+            (state, reward, done, info) for RESULT and (episode, step, state, outcome, done) for TICK
+    """
+    frame = FRAMES[kind]
+    values = frame.unpack_from(data)
+    if values[0] != kind or values[1] != frame.size - FRAME_HEADER.size:
+        raise Exception("Unexpected message of kind {} and length {}".format(values[0], values[1]))
+    if kind == RESULT:
+        _, _, puck_x, puck_y, bar_x, bar_y, theta, v_ind, reward, done, steps = values
+        return ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind), reward, done, {"steps": steps}
+    if kind == ACTION:
+        return values[2]
+    if kind == TICK:
+        return values[2], values[3], _unflatten_state(values[4:10]), values[10], values[11]
+    if kind == STATE:
+        return (_unflatten_state(values[2:8]),) + values[8:]
+    return True
+
+
+def local_path(port):
+    """Path of the Unix socket a server listening on port also listens on, for the clients on the same machine"""
+    return os.path.join(tempfile.gettempdir(), "psserver_{}.sock".format(port))
+
+
+def is_local(host):
+    """Whether a host is this machine, reached through the loopback interface"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def handshake(agent_id, binary=True):
+    """Returns the first message sent by a client
+
+    Args:
+        agent_id (str): "P" to play as puck or "B" to play as bar
+        binary (bool, optional): Whether to ask for the binary protocol. Defaults to True.
+    """
+    return agent_id + "|" + PROTOCOL if binary else agent_id
+
+
+def parse_handshake(msg):
+    """Splits the first message of a client into its agent id and protocol ("" for the pickle protocol)"""
+    agent_id, _, protocol = msg.decode().partition("|")
+    return agent_id, protocol
+
+
+class PickleChannel:
+    """Original protocol, pickled messages read with a single recv of msg_length bytes"""
+
+    def __init__(self, sock, msg_length=2048):
+        self.sock = sock
+        self.msg_length = msg_length
+
+    def _recv(self):
+        msg = self.sock.recv(self.msg_length)
+        return pickle.loads(msg) if msg else None
+
+    def send_start(self):
+        self.sock.send(str.encode("start"))
+
+    def recv_start(self):
+        return self.sock.recv(self.msg_length).decode() == "start"
+
+    def send_state(self, state, done, episode=0, seed=0):
+        # Episode and seed are not part of the pickle protocol
+        self.sock.send(pickle.dumps((state, done)))
+
+    def recv_state(self):
+        return self._recv()
+
+    def send_action(self, action):
+        self.sock.send(pickle.dumps(action))
+
+    def recv_action(self):
+        return self._recv()
+
+    def send_result(self, result):
+        self.sock.send(pickle.dumps(result))
+
+    def recv_result(self):
+        return self._recv()
+
+    def close(self):
+        self.sock.close()
+
+
+class BinaryChannel:
+    """Framed binary protocol with fixed struct layouts for states, actions and step results
+
+    Messages are read whole whatever way TCP splits or coalesces them, and nothing received is unpickled. Receiving
+    methods return None when the peer disconnected.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            # Send the small messages right away instead of waiting to coalesce them
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.buffer = bytearray(max(frame.size for frame in FRAMES.values()))
+        self.view = memoryview(self.buffer)
+        self.episode = None  # Index and seed of the current episode, given by the server
+        self.seed = None
+
+    def _recv(self, kind):
+        # Payloads have a fixed size for every kind, so the whole frame is read at once
+        size = FRAMES[kind].size
+        received = self.sock.recv_into(self.buffer, size)
+        while received < size:
+            if received == 0:
+                return None
+            count = self.sock.recv_into(self.view[received:], size - received)
+            if count == 0:
+                return None
+            received += count
+        return decode(kind, self.buffer)
+
+    def send_start(self):
+        self.sock.sendall(encode_start())
+
+    def recv_start(self):
+        return self._recv(START) is not None
+
+    def send_state(self, state, done, episode=0, seed=0):
+        self.sock.sendall(encode_state(state, done, episode, seed))
+
+    def recv_state(self):
+        """Receives the initial state of an episode, its index and seed are kept in episode and seed
+
+        Returns:
+            Tuple: (state, done), None if the connection was closed
+        """
+        res = self._recv(STATE)
+        if res is None:
+            return None
+        state, done, self.episode, self.seed = res
+        return state, done
+
+    def send_action(self, action):
+        self.sock.sendall(encode_action(action))
+
+    def recv_action(self):
+        return self._recv(ACTION)
+
+    def send_result(self, result):
+        self.sock.sendall(encode_result(result))
+
+    def recv_result(self):
+        return self._recv(RESULT)
+
+    def close(self):
+        self.sock.close()
+
+
+class AsyncPickleChannel:
+    """Server side of the pickle protocol over asyncio streams"""
+
+    def __init__(self, reader, writer, msg_length=2048):
+        self.reader = reader
+        self.writer = writer
+        self.msg_length = msg_length
+        self.peer = writer.get_extra_info("peername") or "local"  # No address for Unix sockets
+
+    async def _read(self):
+        try:
+            return await self.reader.read(self.msg_length)
+        except ConnectionError:
+            return b""
+
+    async def _recv(self):
+        msg = await self._read()
+        return pickle.loads(msg) if msg else None
+
+    async def recv_start(self):
+        return (await self._read()).decode() == "start"
+
+    def send_state(self, state, done, episode=0, seed=0):
+        # Episode and seed are not part of the pickle protocol
+        self.writer.write(pickle.dumps((state, done)))
+
+    async def recv_action(self):
+        return await self._recv()
+
+    def encode_result(self, result):
+        return pickle.dumps(result)
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def send_result(self, result):
+        self.writer.write(self.encode_result(result))
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncBinaryChannel:
+    """Binary protocol over asyncio streams, used by the server and by asyncio clients"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername") or "local"  # No address for Unix sockets
+        self.episode = None  # Index and seed of the current episode, on the client side
+        self.seed = None
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    async def _recv(self, kind):
+        try:
+            data = await self.reader.readexactly(FRAMES[kind].size)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        return decode(kind, data)
+
+    ## Server side
+    async def recv_start(self):
+        return await self._recv(START) is not None
+
+    def send_state(self, state, done, episode=0, seed=0):
+        self.writer.write(encode_state(state, done, episode, seed))
+
+    async def recv_action(self):
+        return await self._recv(ACTION)
+
+    def encode_result(self, result):
+        return encode_result(result)
+
+    def write(self, data):
+        self.writer.write(data)
+
+    def send_result(self, result):
+        self.writer.write(encode_result(result))
+
+    ## Client side
+    def send_start(self):
+        self.writer.write(encode_start())
+
+    async def recv_state(self):
+        res = await self._recv(STATE)
+        if res is None:
+            return None
+        state, done, self.episode, self.seed = res
+        return state, done
+
+    def send_action(self, action):
+        self.writer.write(encode_action(action))
+
+    async def recv_result(self):
+        return await self._recv(RESULT)
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
@@ -1,11 +1,17 @@
-import socket, pickle, json, time
-from queue import Queue
-from _thread import *
-from threading import Event
+import asyncio, copy, json, os, socket, time
+from collections import deque
 from importlib.resources import open_text
-from matplotlib import animation
-import matplotlib.pyplot as plt
-import os
+from .broadcast import Broadcast, Subscriber
+from .inference import PolicyChannel
+from .metrics import make_metrics
+from .protocol import (
+    PROTOCOL,
+    AsyncBinaryChannel,
+    AsyncPickleChannel,
+    encode_tick,
+    local_path,
+    parse_handshake,
+)
 
 with open_text("communication", "config.json") as f:
     config = json.load(f)
@@ -18,153 +24,599 @@ with open_text("communication", "config.json") as f:
 
 
 class PSServer:
-    def __init__(self, env, port=port, save_run=False, save_path="./"):
+    """Game server pairing puck and bar clients into matches
+
+    Clients wait in a lobby until a client of the other role connects, then the pair plays a match on its own
+    environment. Matches run concurrently on an asyncio event loop and the server keeps accepting clients after
+    matches finish.
+    """
+
+    def __init__(
+        self,
+        env,
+        port=port,
+        save_run=False,
+        save_path="./",
+        log_path=None,
+        tick=None,
+        deadline=None,
+        default_action="hold",
+        headless=False,
+        seed=0,
+        policies=None,
+        stats_port=None,
+        stats_path=None,
+        stats_interval=1.0,
+        local=True,
+        spectator_queue=64,
+    ):
+        """Game server
+
+        Args:
+            env (gym.Env | Callable): Environment copied for every match, or a function creating one
+            port (int, optional): Port to listen on. Defaults to the port of config.json.
+            save_run (bool, optional): Whether to save recordings of the matches, the states of every episode are
+                rendered and encoded by a separate process once it is over. Defaults to False.
+            save_path (str, optional): Path of the recordings, suffixed with the match and episode ids. Defaults to
+                "./".
+            log_path (str, optional): Binary episode log the matches are appended to, see utils.episode_log.
+                Defaults to None.
+            tick (float, optional): Seconds between the steps of a match. Defaults to the frame time lapse of
+                config.json, or 0 when headless.
+            deadline (float, optional): Seconds after the start of a tick within which actions must arrive, late
+                clients get the default action for the step. Defaults to tick, no deadline if tick is 0.
+            default_action (str, optional): Action of late clients, "hold" to repeat their last action or "zero".
+                Defaults to "hold".
+            headless (bool, optional): Whether to run matches without rendering or pausing, as fast as the clients
+                respond. Defaults to False.
+            seed (int, optional): Seed of the first episode, every episode played on the server gets the next one.
+                Defaults to 0.
+            policies (Dict[str, InferenceService], optional): Services playing as "P" or "B" against the clients
+                waiting for an opponent of that role, see communication.inference. Defaults to None.
+            stats_port (int, optional): Local port serving the stats and timing histograms as JSON over HTTP.
+                Defaults to None.
+            stats_path (str, optional): JSON file the stats and timing histograms are written to every
+                stats_interval seconds. Defaults to None.
+            stats_interval (float, optional): Seconds between the writes of stats_path. Defaults to 1.0.
+            local (bool, optional): Whether to also listen on a Unix socket, which clients on the same machine
+                connect to instead of TCP (see protocol.local_path). Defaults to True.
+            spectator_queue (int, optional): Maximum number of ticks waiting to be sent to a spectator, the oldest
+                being dropped for slow spectators. Defaults to 64.
+        """
+        if default_action not in ("hold", "zero"):
+            raise Exception("Unidentified default action {}".format(default_action))
         self.env = env
         self.port = port
-        self.bar = None
-        self.puck = None
         self.save_run = save_run
         self.save_path = save_path
-
-        self.agents_ready = Event()
+        self.renderer = None
+        if save_run:
+            # Imported here as the utils package loads the training stack, which clients of the server do not need
+            from utils.recorder import RenderWorker
+
+            self.renderer = RenderWorker()
+        self.log_path = log_path
+        self.headless = headless
+        self.seed = seed
+        self.policies = policies or {}
+        self.stats_port = stats_port
+        self.stats_path = stats_path
+        self.stats_interval = stats_interval
+        self.local = local and hasattr(socket, "AF_UNIX")
+        self.spectator_queue = spectator_queue
+        if tick is None:
+            tick = 0 if headless else frame_time_lapse
+        self.tick = tick
+        # Pauses before and after every match, so that players can follow the rendered game
+        self.initial_time_lapse = 0 if headless else initial_time_lapse
+        self.final_time_lapse = 0 if headless else final_time_lapse
+        self.deadline = deadline if deadline is not None else (tick or None)
+        self.default_action = default_action
+
+        # Lobby of connected agents waiting for an opponent
+        self.waiting = {"P": deque(), "B": deque()}
+        self.match_count = 0
+        self.matches = {}  # Stats of every match by id
+        self.broadcasts = {}  # Spectators of the running and upcoming matches by id
+        self.stats = {
+            "connections": 0,
+            "running": 0,
+            "finished": 0,
+            "aborted": 0,
+            "puck_wins": 0,
+            "bar_wins": 0,
+            "episodes": 0,
+            "steps": 0,
+            "missed_deadlines": 0,
+            "stale_actions": 0,
+            "steps_per_second": 0.0,
+        }
+        # Timing histograms of the finished matches, those of running matches are in their stats
+        self.metrics = make_metrics()
+        self.tasks = set()
+        self.start_time = None
+
+    def make_env(self):
+        # Every match gets its own copy of the environment, or a new one from the function given
+        if hasattr(self.env, "step"):
+            return copy.deepcopy(self.env)
+        return self.env()
 
     def start(self):
-        start_new_thread(self.run_server, ())
-
-        while True:
-            self.agents_ready.wait()
-            self.play()
-            self.agents_ready.clear()
-
-    def run_server(self):
-        server_sock = socket.socket()
+        try:
+            asyncio.run(self.run_server())
+        finally:
+            if self.renderer is not None:
+                print("saving the remaining runs ...")
+                self.renderer.close()
+
+    async def run_server(self):
+        self.start_time = time.perf_counter()
+        server = await asyncio.start_server(self.add_agent, "", self.port)
         print("server socket created successfully")
-
-        server_sock.bind(("", self.port))
-        print("socket binded to port {}".format(server_sock.getsockname()[1]))
-
-        server_sock.listen(2)
+        print("socket binded to port {}".format(self.port))
         print("socket is listening")
 
-        while True:
-            sock, addr = server_sock.accept()
-            print("got connection from {}".format(addr))
-
-            start_new_thread(self.add_agent, (sock,))
-
-    def add_agent(self, agent):
-        agent_id = agent.recv(msg_length)
-        if not agent_id:
-            print("{} closed connection".format(agent.getsockname()[1]))
-
-        print(
-            "{} requested to play as {}".format(
-                agent.getsockname()[1], agent_id.decode()
-            )
-        )
-        if agent_id.decode() == "P":
-            if self.puck is not None:
-                print("puck is already assigned closing connection")
-                agent.close()
-            else:
-                self.puck = agent
-                agent.send(str.encode("connected"))
-                print("{} playing as puck".format(agent.getsockname()[1]))
-
-        elif agent_id.decode() == "B":
-            if self.bar is not None:
-                print("bar is already assigned closing connection")
-                agent.close()
-            else:
-                self.bar = agent
-                agent.send(str.encode("connected"))
-                print("{} playing as bar".format(agent.getsockname()[1]))
-
-        if self.puck is not None and self.bar is not None:
-            self.agents_ready.set()
-
-    def play(self):
-        msg_puck = self.puck.recv(msg_length)
-        msg_bar = self.bar.recv(msg_length)
-
-        if msg_puck.decode() != "start" or msg_bar.decode() != "start":
-            print("agents not starting game")
+        local_server = None
+        if self.local:
+            path = local_path(self.port)
+            # The port is ours, so a socket left at its path is from a server which did not exit cleanly
+            if os.path.exists(path):
+                os.unlink(path)
+            local_server = await asyncio.start_unix_server(self.add_agent, path)
+            print("local socket listening on {}".format(path))
+
+        if self.stats_port is not None:
+            await asyncio.start_server(self.serve_stats, "127.0.0.1", self.stats_port)
+            print("serving stats on port {}".format(self.stats_port))
+        if self.stats_path is not None:
+            task = asyncio.create_task(self.dump_stats())
+            self.tasks.add(task)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if local_server is not None:
+                local_server.close()
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    async def add_agent(self, reader, writer):
+        peer = writer.get_extra_info("peername") or "local"  # No address for Unix sockets
+        print("got connection from {}".format(peer))
+        self.stats["connections"] += 1
+
+        msg = await reader.read(msg_length)
+        if not msg:
+            print("{} closed connection".format(peer))
+            writer.close()
             return
 
-        print("starting the game")
-
-        done = False
-        state = self.env.reset()
+        # The agent id may be followed by the protocol the agent speaks, pickle is used otherwise
+        agent_id, protocol = parse_handshake(msg)
+        if agent_id.startswith("S"):
+            self.add_spectator(agent_id[1:], protocol, reader, writer, peer)
+            return
 
-        self.puck.send(pickle.dumps((state, done)))
-        self.bar.send(pickle.dumps((state, done)))
+        if protocol == PROTOCOL:
+            channel, reply = AsyncBinaryChannel(reader, writer), "connected|" + PROTOCOL
+        elif protocol == "":
+            channel, reply = AsyncPickleChannel(reader, writer, msg_length), "connected"
+        else:
+            print("unsupported protocol {} closing connection".format(protocol))
+            writer.close()
+            return
 
-        time.sleep(initial_time_lapse)
+        if agent_id not in self.waiting:
+            print("{} requested unknown role {} closing connection".format(peer, agent_id))
+            writer.close()
+            return
 
-        frames = []
-        self.env.render()
-        time.sleep(frame_time_lapse)
-        while not done:
-            msg = self.puck.recv(msg_length)
-            if not msg:
-                print("agent puck disconnected")
-                break
-            puck_action = pickle.loads(msg)
+        print("{} requested to play as {}".format(peer, agent_id))
+        writer.write(str.encode(reply))
+        self.waiting[agent_id].append(channel)
+        self.pair_agents()
+
+    def add_spectator(self, match, protocol, reader, writer, peer):
+        """Subscribes a spectator to the ticks of a match
+
+        Args:
+            match (str): Id of a running match or of the next one, or "" for the latest running match (the next one if
+                none is running)
+            protocol (str): Protocol of the spectator, which must be the binary protocol
+        """
+        if protocol != PROTOCOL:
+            print("{} spectators must use the binary protocol closing connection".format(peer))
+            writer.close()
+            return
 
-            msg = self.bar.recv(msg_length)
-            if not msg:
-                print("agent bar disconnected")
-                break
-            bar_action = pickle.loads(msg)
-            action = {"puck": puck_action, "bar": bar_action}
-            res = self.env.step(action)
-            self.puck.send(pickle.dumps(res))
-            self.bar.send(pickle.dumps(res))
+        running = [match_id for match_id in self.broadcasts if match_id < self.match_count]
+        if not match.isdigit():
+            if match:
+                print("{} requested unknown match {} closing connection".format(peer, match))
+                writer.close()
+                return
+            match_id = max(running) if running else self.match_count
+        else:
+            match_id = int(match)
+            if match_id < self.match_count and match_id not in running:
+                print("{} requested match {} which is over closing connection".format(peer, match_id))
+                writer.close()
+                return
+            if match_id > self.match_count:
+                # Only the next match may be waited for, later ones would keep a broadcast until they are played
+                print("{} requested match {} which is not the next one closing connection".format(peer, match_id))
+                writer.close()
+                return
+
+        print("{} is spectating match {}".format(peer, match_id))
+        writer.write(str.encode("connected|" + PROTOCOL))
+        broadcast = self.broadcasts.setdefault(match_id, Broadcast(match_id))
+        broadcast.add(Subscriber(writer, self.spectator_queue))
+
+    def pair_agents(self):
+        """Starts a match for every waiting pair of puck and bar, agents of the policies filling in for a missing role"""
+        for agent_id, opponent_id in (("P", "B"), ("B", "P")):
+            if agent_id in self.policies:
+                while len(self.waiting[agent_id]) < len(self.waiting[opponent_id]):
+                    self.waiting[agent_id].append(PolicyChannel(self.policies[agent_id]))
+
+        while self.waiting["P"] and self.waiting["B"]:
+            puck, bar = self.waiting["P"].popleft(), self.waiting["B"].popleft()
+            match_id = self.match_count
+            self.match_count += 1
+
+            task = asyncio.create_task(self.play(match_id, puck, bar))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def wait_start(self, channel):
+        """Waits for an agent to ask for the next episode, returns False if it left"""
+        if getattr(channel, "ready", False):
+            # Asked already, in the match it was in before
+            channel.ready = False
+            return True
+        return await channel.recv_start()
+
+    async def play(self, match_id, puck, bar):
+        """Plays episodes between a puck and a bar for as long as both ask for more
+
+        An agent which asks for another episode after its opponent left goes back to the lobby.
+        """
+        stats = {
+            "puck": puck.peer,
+            "bar": bar.peer,
+            "status": "starting",
+            "episodes": 0,
+            "puck_wins": 0,
+            "bar_wins": 0,
+            "steps": 0,
+            "duration": None,
+            "steps_per_second": None,
+            "missed_deadlines": {"puck": 0, "bar": 0},
+            "stale_actions": {"puck": 0, "bar": 0},  # Late actions dropped as their tick had passed
+            "overruns": 0,  # Ticks which took longer than tick
+            "metrics": make_metrics(),  # Timing histograms, see communication.metrics
+        }
+        self.matches[match_id] = stats
+        self.stats["running"] += 1
+        broadcast = self.broadcasts.setdefault(match_id, Broadcast(match_id))
+        start_time = time.perf_counter()
+
+        env = None
+        episode_log = None
+        agents = {"puck": puck, "bar": bar}
+        requeued = []
+        aborted = False
+        try:
+            while True:
+                start_puck, start_bar = await asyncio.gather(
+                    self.wait_start(puck), self.wait_start(bar)
+                )
+                if not start_puck or not start_bar:
+                    for agent_id, channel, start in (("P", puck, start_puck), ("B", bar, start_bar)):
+                        # Policies are only created for waiting clients, they do not go back to the lobby
+                        if start and not isinstance(channel, PolicyChannel):
+                            channel.ready = True
+                            requeued.append((agent_id, channel))
+                    break
+
+                if env is None:
+                    env = self.make_env()
+                    if self.log_path:
+                        # Imported here for the same reason as RenderWorker
+                        from utils.episode_log import EpisodeWriter
+
+                        episode_log = EpisodeWriter(self.log_path)
+                    print("match {}: starting the game".format(match_id))
+                    stats["status"] = "running"
+                    broadcast.start(getattr(env.unwrapped, "config", {}))
+
+                outcome = await self.play_episode(match_id, stats, env, agents, episode_log, broadcast)
+                if outcome is None:
+                    aborted = True
+                    break
+        except Exception as e:
+            aborted = True
+            print("match {}: {}".format(match_id, e))
+        finally:
+            if env is not None:
+                env.close()
+            if episode_log is not None:
+                episode_log.close()
+            broadcast.close()
+            del self.broadcasts[match_id]
+            requeued_channels = [channel for _, channel in requeued]
+            for channel in (puck, bar):
+                if channel not in requeued_channels:
+                    channel.close()
+            self.end_match(match_id, time.perf_counter() - start_time, aborted)
+
+            for agent_id, channel in requeued:
+                self.waiting[agent_id].append(channel)
+            self.pair_agents()
+
+    async def play_episode(self, match_id, stats, env, agents, episode_log=None, broadcast=None):
+        """Plays one episode of a match, publishing its ticks to the spectators of broadcast
+
+        Returns:
+            int: Reward of the bar at the end of the episode, None if an agent disconnected
+        """
+        puck, bar = agents["puck"], agents["bar"]
+        metrics = stats["metrics"]
+        pending = {"puck": None, "bar": None}  # Actions being received from every agent
+        episode = stats["episodes"]
+        seed = self.seed + self.stats["episodes"]
+        stats["episodes"] += 1
+        self.stats["episodes"] += 1
+
+        states = None  # States of the episode to save, rendered by self.renderer once it is over
+        try:
+            done = False
+            env.seed(seed)
+            state = env.reset()
+            if episode_log is not None:
+                episode_log.begin(env.unwrapped)
+
+            puck.send_state(state, done, episode, seed)
+            bar.send_state(state, done, episode, seed)
+            if broadcast is not None and broadcast.subscribers:
+                broadcast.publish(encode_tick(episode, 0, state, 0, done))
+
+            await asyncio.sleep(self.initial_time_lapse)
 
             if self.save_run:
-                frames.append(self.env.render(mode="rgb_array"))
+                states = [env.unwrapped.state]
+            if not self.headless:
+                env.render()
+            last_action = {"puck": 0.0, "bar": 0.0}
+            received = {"puck": 0, "bar": 0}  # Actions received from every agent during the episode
+            step = 0
+            tick_start = time.perf_counter()
+            while not done:
+                # Gather the actions of both agents concurrently until the deadline of the tick
+                deadline = None if self.deadline is None else tick_start + self.deadline
+                action = {}
+                disconnected = None
+                while len(action) < len(agents) and disconnected is None:
+                    for agent, channel in agents.items():
+                        if agent not in action and pending[agent] is None:
+                            pending[agent] = asyncio.ensure_future(self.recv_action(channel, tick_start))
+                    timeout = None if deadline is None else max(0, deadline - time.perf_counter())
+                    waiting = [pending[agent] for agent in agents if agent not in action]
+                    await asyncio.wait(waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                    stale = False
+                    for agent in agents:
+                        task = pending[agent]
+                        if agent in action or not task.done():
+                            continue
+                        pending[agent] = None
+                        received_action, wait = task.result()
+                        if received_action is None:
+                            disconnected = agent
+                            break
+                        # Clients send one action per state they receive, the nth action of the episode is for step n
+                        index = received[agent]
+                        received[agent] += 1
+                        if index < step:
+                            # Late action of a missed tick, the action for this tick follows it
+                            stats["stale_actions"][agent] += 1
+                            self.stats["stale_actions"] += 1
+                            stale = True
+                            continue
+                        action[agent] = received_action
+                        last_action[agent] = received_action
+                        metrics["recv_" + agent].add(wait)
+
+                    # Past the deadline, only keep reading while stale actions are being skipped
+                    if deadline is not None and not stale and time.perf_counter() >= deadline:
+                        break
+
+                for agent in agents:
+                    if agent not in action:
+                        # The late action is dropped once it arrives, on a later tick
+                        stats["missed_deadlines"][agent] += 1
+                        self.stats["missed_deadlines"] += 1
+                        action[agent] = last_action[agent] if self.default_action == "hold" else 0.0
+
+                if disconnected is not None:
+                    print("match {}: agent {} disconnected".format(match_id, disconnected))
+                    return None
+
+                if episode_log is not None:
+                    action = episode_log.record(action)
+                start = time.perf_counter()
+                res = env.step(action)
+                serialize_start = time.perf_counter()
+                data = [channel.encode_result(res) for channel in (puck, bar)]
+                send_start = time.perf_counter()
+                puck.write(data[0])
+                bar.write(data[1])
+                await asyncio.gather(puck.drain(), bar.drain())
+                render_start = time.perf_counter()
+                metrics["step"].add(serialize_start - start)
+                metrics["serialize"].add(send_start - serialize_start)
+                metrics["send"].add(render_start - send_start)
+                if broadcast is not None and broadcast.subscribers:
+                    # Encoded once for all the spectators
+                    broadcast.publish(
+                        encode_tick(episode, res[3]["steps"], res[0], res[1] if res[2] else 0, res[2])
+                    )
+
+                if self.save_run:
+                    states.append(env.unwrapped.state)
+                    metrics["render"].add(time.perf_counter() - render_start)
+                elif not self.headless:
+                    env.render()
+                    metrics["render"].add(time.perf_counter() - render_start)
+
+                done = res[2]
+                step += 1
+                stats["steps"] += 1
+                self.stats["steps"] += 1
+
+                # Sleep until the next tick, less the time taken by this one
+                metrics["tick"].add(time.perf_counter() - tick_start)
+                tick_start += self.tick
+                delay = tick_start - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    # Lateness of the wake up
+                    metrics["tick_jitter"].add(time.perf_counter() - tick_start)
+                else:
+                    if self.tick:
+                        stats["overruns"] += 1
+                    tick_start = time.perf_counter()
+
+            # A late agent still sends its action for the last step, read and drop it before the next episode
+            for agent, task in pending.items():
+                if task is not None:
+                    pending[agent] = None
+                    if (await task)[0] is None:
+                        return None
+                    stats["stale_actions"][agent] += 1
+                    self.stats["stale_actions"] += 1
+
+            outcome = res[1]
+            if episode_log is not None:
+                episode_log.end(outcome)
+            if outcome > 0:
+                stats["bar_wins"] += 1
+                self.stats["bar_wins"] += 1
             else:
-                self.env.render()
-
-            time.sleep(frame_time_lapse)
-
-            done = res[2]
-
-        print("quitting game")
-
-        time.sleep(final_time_lapse)
-
-        self.env.close()
-        self.puck.close()
-        self.bar.close()
-        self.puck = None
-        self.bar = None
-        if self.save_run:
-            print("Saving run ...")
-            self.save_render(frames)
-        exit()
-
-    def save_render(self, frames):
-        plt.figure(
-            figsize=(frames[0].shape[1] / 150.0, frames[0].shape[0] / 150.0), dpi=150
-        )
-
-        plt.axis("off")
-        patch = plt.imshow(frames[0])
-
-        def animate(i):
-            patch.set_data(frames[i])
-
-        anim = animation.FuncAnimation(
-            plt.gcf(), animate, frames=len(frames), interval=60
+                stats["puck_wins"] += 1
+                self.stats["puck_wins"] += 1
+
+            print("match {}: episode {} over".format(match_id, episode))
+            if states is not None:
+                root, ext = os.path.splitext(self.save_path)
+                path = "{}_{}_{}{}".format(root, match_id, episode, ext)
+                print("match {}: saving run to {} in the background".format(match_id, path))
+                self.renderer.submit(states, getattr(env.unwrapped, "config", {}), path)
+            await asyncio.sleep(self.final_time_lapse)
+            return outcome
+        finally:
+            for task in pending.values():
+                if task is not None:
+                    task.cancel()
+
+    async def recv_action(self, channel, tick_start):
+        """Receives the action of an agent, with the seconds waited for it since the start of the tick"""
+        action = await channel.recv_action()
+        return action, time.perf_counter() - tick_start
+
+    def end_match(self, match_id, duration, aborted):
+        """Updates the stats of a match which is over, finished or aborted"""
+        stats = self.matches[match_id]
+        for name, histogram in stats["metrics"].items():
+            self.metrics[name].merge(histogram)
+        stats["duration"] = duration
+        stats["steps_per_second"] = stats["steps"] / duration if duration else 0.0
+        self.stats["running"] -= 1
+        # Steps of all the matches per second since the server started
+        self.stats["steps_per_second"] = self.stats["steps"] / (time.perf_counter() - self.start_time)
+        if aborted or not stats["episodes"]:
+            stats["status"] = "aborted"
+            self.stats["aborted"] += 1
+        else:
+            stats["status"] = "finished"
+            self.stats["finished"] += 1
+        print(
+            "match {} {} after {} episodes and {} steps in {:.2f}s ({:.0f} steps/s), missed deadlines {}, "
+            "stale actions {}, server stats {}".format(
+                match_id,
+                stats["status"],
+                stats["episodes"],
+                stats["steps"],
+                duration,
+                stats["steps_per_second"],
+                stats["missed_deadlines"],
+                stats["stale_actions"],
+                self.stats,
+            )
         )
-        writergif = animation.PillowWriter(fps=60)
 
-        # check if folder exists
-        index = self.save_path.rfind("/")
-        folder_name = self.save_path[: index + 1]
-        if not os.path.isdir(folder_name):
-            print("Made folder {}".format(folder_name))
-            os.mkdir(folder_name)
-
-        anim.save(self.save_path, writer=writergif)
+    def snapshot(self):
+        """Returns the stats of the server and of the running matches with their timing histograms
+
+        Histograms of the server include the running matches, all durations are in seconds.
+        """
+        metrics = make_metrics()
+        matches = {}
+        for match_id, stats in self.matches.items():
+            if stats["status"] in ("starting", "running"):
+                for name, histogram in stats["metrics"].items():
+                    metrics[name].merge(histogram)
+                matches[match_id] = {
+                    key: dict(value) if isinstance(value, dict) else value
+                    for key, value in stats.items()
+                    if key != "metrics"
+                }
+                matches[match_id]["metrics"] = {
+                    name: histogram.to_dict() for name, histogram in stats["metrics"].items()
+                }
+        for name, histogram in self.metrics.items():
+            metrics[name].merge(histogram)
+
+        return {
+            "uptime": time.perf_counter() - self.start_time,
+            "stats": dict(self.stats),
+            "metrics": {name: histogram.to_dict() for name, histogram in metrics.items()},
+            "matches": matches,
+        }
+
+    async def serve_stats(self, reader, writer):
+        """Answers any HTTP request with the snapshot of the stats as JSON"""
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            # Serialized on a worker thread, the snapshot being a copy, so that matches are not held up
+            body = await asyncio.get_running_loop().run_in_executor(
+                None, lambda snapshot: json.dumps(snapshot).encode(), self.snapshot()
+            )
+            writer.write(
+                b"HTTP/1.0 200 OK\r\nContent-Type: application/json\r\nContent-Length: "
+                + str(len(body)).encode()
+                + b"\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dump_stats(self):
+        """Writes the snapshot of the stats to stats_path every stats_interval seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            await loop.run_in_executor(None, self._write_stats, self.snapshot())
+
+    def _write_stats(self, snapshot):
+        # Written to a temporary file first, so that readers never see a partial file
+        temp_path = self.stats_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, self.stats_path)
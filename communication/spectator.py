@@ -0,0 +1,104 @@
+import socket
+from .client import connect_socket, host, port
+from .protocol import (
+    FRAME_HEADER,
+    PROTOCOL,
+    SPECTATE,
+    TICK,
+    decode,
+    decode_spectate,
+    handshake,
+)
+
+
+class PSSpectator:
+    """Spectator following the ticks of a match played on a PSServer"""
+
+    def __init__(self, match_id=None, local=None):
+        """Spectator
+
+        Args:
+            match_id (int, optional): Id of the match to follow. Defaults to None, for the latest running match or
+                the next one if none is running.
+            local (bool, optional): Whether to connect through the Unix socket of a server on the same machine.
+                Defaults to None, to do so whenever the server is local and has one.
+        """
+        self.match_id = match_id
+        self.local = local
+        self.config = None  # Config of the environment of the match, to recreate it for rendering
+        self.sock = None
+
+    def _recv_exactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return bytes(data)
+
+    def _recv_frame(self):
+        """Returns the kind and whole frame of the next message, None if the server closed the connection"""
+        header = self._recv_exactly(FRAME_HEADER.size)
+        if header is None:
+            return None
+        kind, length = FRAME_HEADER.unpack(header)
+        payload = self._recv_exactly(length)
+        if payload is None:
+            return None
+        return kind, header + payload
+
+    def connect(self, host=host, port=port):
+        """Subscribes to the match, waiting for it to start
+
+        Returns:
+            dict: Config of the environment of the match, None if the server refused the spectator
+        """
+        self.sock = connect_socket(socket.socket(), host, port, self.local)
+        match = "" if self.match_id is None else str(self.match_id)
+        self.sock.send(str.encode(handshake("S" + match)))
+
+        # Read exactly the reply, the frames of a running match may follow right away
+        reply = "connected|" + PROTOCOL
+        msg = self._recv_exactly(len(reply))
+        if msg is None or msg.decode() != reply:
+            print("disconnected")
+            self.sock.close()
+            return None
+
+        res = self._recv_frame()
+        if res is None or res[0] != SPECTATE:
+            print("disconnected")
+            self.sock.close()
+            return None
+        self.match_id, self.config = decode_spectate(res[1][FRAME_HEADER.size :])
+        return self.config
+
+    def recv(self):
+        """Receives the next tick of the match
+
+        Ticks may be skipped if the spectator is too slow to keep up with the match.
+
+        Returns:
+            Tuple: (episode, step, state, outcome, done), outcome being the reward of the bar once done, None once
+                the match is over
+        """
+        while True:
+            res = self._recv_frame()
+            if res is None:
+                return None
+            kind, frame = res
+            if kind == TICK:
+                return decode(TICK, frame)
+
+    def ticks(self):
+        """Yields the ticks of the match until it is over"""
+        while True:
+            tick = self.recv()
+            if tick is None:
+                break
+            yield tick
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
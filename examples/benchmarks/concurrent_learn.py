@@ -0,0 +1,81 @@
+"""Measures the wall-clock time of an update of TwoAgentPolicy with the puck and the bar learning one after the other and
+concurrently (concurrent_learn=True), on a buffer filled by collecting with the policies as the trainers do. The
+updates are those of the on-policy trainer (the whole buffer, in minibatches, repeat times) or of the off-policy
+trainer (one minibatch).
+
+python ./examples/benchmarks/concurrent_learn.py --puck ppo --bar ppo --updates 20
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+from tianshou.data import Collector, VectorReplayBuffer
+
+from agents import TwoAgentPolicy
+from utils.config import env_params
+from utils.envs import MakeEnv
+from utils.train import make_policy
+from utils.vector_envs import make_vector_env
+
+
+def measure(policy, buffer, args):
+    """Returns the seconds taken by every update"""
+    times = []
+    for _ in range(args.updates):
+        start = time.perf_counter()
+        if args.trainer == "on":
+            policy.update(0, buffer, batch_size=args.batch_size, repeat=args.repeat)
+        else:
+            policy.update(args.batch_size, buffer)
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--puck", type=str, default="ppo")
+    parser.add_argument("--bar", type=str, default="ppo")
+    parser.add_argument("--trainer", type=str, default="on", choices=["off", "on"])
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=2000, help="transitions collected in the buffer")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the buffer of on-policy updates")
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads, defaults to torch's")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    env = MakeEnv(**env_params["train"]).create_env()
+    envs = make_vector_env(args.envs, "dummy", render_env_count=0, **env_params["train"])
+    envs.seed(args.seed)
+    policy = TwoAgentPolicy(
+        (make_policy("puck", args.puck), make_policy("bar", args.bar)),
+        observation_space=env.observation_space,
+        action_space=env.action_space,
+    )
+    buffer = VectorReplayBuffer(args.steps, args.envs)
+    Collector(policy, envs, buffer, exploration_noise=True).collect(n_step=args.steps)
+    print(
+        "{} puck, {} bar, {} transitions, {} cores, {} torch threads".format(
+            args.puck, args.bar, len(buffer), os.cpu_count(), torch.get_num_threads()
+        )
+    )
+
+    policy.train()
+    results = {}
+    for mode in ("serial", "concurrent"):
+        policy.concurrent_learn = mode == "concurrent"
+        measure(policy, buffer, args)  # Warm up
+        results[mode] = measure(policy, buffer, args) * 1000
+        print(
+            "{:10s} {:8.2f} ms per update (p50 {:8.2f} ms)".format(
+                mode, results[mode].mean(), np.percentile(results[mode], 50)
+            )
+        )
+    print("speedup {:.2f}x".format(results["serial"].mean() / results["concurrent"].mean()))
@@ -0,0 +1,60 @@
+"""Measures the round trip time of an action and its step result over a loopback TCP connection with the pickle
+protocol and the framed binary protocol of PSServer/PSClient.
+
+python ./examples/benchmarks/protocol_latency.py --steps 20000
+"""
+import argparse
+import socket
+import threading
+import time
+
+from communication.protocol import BinaryChannel, PickleChannel
+
+RESULT = (((-0.1, 0.25), (0.75, -0.5), 2, 5), -1, False, {"steps": 42})
+
+
+def serve(channel, steps):
+    """Answers every action with a step result, as PSServer.play does"""
+    for _ in range(steps):
+        channel.recv_action()
+        channel.send_result(RESULT)
+
+
+def connected_pair():
+    """Returns both ends of a loopback TCP connection"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    client_sock = socket.create_connection(listener.getsockname())
+    server_sock, _ = listener.accept()
+    listener.close()
+    return server_sock, client_sock
+
+
+def run(make_channel, steps):
+    """Returns the seconds taken per action and result round trip"""
+    server_sock, client_sock = connected_pair()
+    server, client = make_channel(server_sock), make_channel(client_sock)
+    thread = threading.Thread(target=serve, args=(server, steps))
+    thread.start()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        client.send_action(0.5)
+        client.recv_result()
+    seconds = (time.perf_counter() - start) / steps
+
+    thread.join()
+    server.close()
+    client.close()
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, make_channel in [("pickle", PickleChannel), ("binary", BinaryChannel)]:
+        seconds = run(make_channel, args.steps)
+        print("{:8s} {:8.2f} us per round trip".format(name, seconds * 1e6))
@@ -0,0 +1,52 @@
+"""Measures the peak memory allocated and the time taken per step by EnvWrapper over PSE with tuple states (flattened by
+FlattenObservation) and with flat observations (flat_obs=True).
+
+python ./examples/benchmarks/pse_allocations.py --steps 20000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from gym_env.envs import PSE
+from utils.envs import EnvWrapper
+
+
+def run(env, steps, rng):
+    """Steps env with random actions, returning the peak bytes allocated and the seconds taken per step"""
+    actions = 2 * rng.random((steps, 2)) - 1
+    env.reset()
+
+    allocated = 0
+    tracemalloc.start()
+    for puck_action, bar_action in actions[: steps // 10]:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        _, _, done, _ = env.step({"puck": puck_action, "bar": bar_action})
+        allocated += tracemalloc.get_traced_memory()[1] - current
+        if done:
+            env.reset()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for puck_action, bar_action in actions:
+        _, _, done, _ = env.step({"puck": puck_action, "bar": bar_action})
+        if done:
+            env.reset()
+    return allocated / (steps // 10), (time.perf_counter() - start) / steps
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name, flat_obs in [("tuple state", False), ("flat_obs", True)]:
+        env = EnvWrapper(PSE(flat_obs=flat_obs), modified_reward="exp")
+        allocated, seconds = run(env, args.steps, np.random.default_rng(args.seed))
+        print(
+            "{:12s} {:8.0f} peak bytes allocated per step {:8.2f} us per step".format(
+                name, allocated, seconds * 1e6
+            )
+        )
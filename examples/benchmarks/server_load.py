@@ -0,0 +1,209 @@
+"""Load test of PSServer: simulated puck and bar clients playing concurrent matches against a local headless server.
+
+All the clients run in this process on an asyncio event loop, with the action logic of the networked agents of
+agents/comm_agents, and the server runs in a child process. Reports the steps per second, the p50/p99 latency of a
+step (from sending an action to receiving its result), the dropped connections and the CPU usage of the server and
+of the clients, and writes them as JSON with --output.
+
+python ./examples/benchmarks/server_load.py --matches 100 --episodes 5 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import agents.comm_agents as comm_agents
+from communication import PSServer
+from communication.protocol import PROTOCOL, AsyncBinaryChannel, handshake
+
+
+def serve(port, backlog, tick, deadline, verbose, ready, stop, results):
+    """Runs a headless server until stop is set, then puts its stats and CPU time in results"""
+    import gym
+
+    if not verbose:
+        # The server logs every connection and match
+        sys.stdout = open(os.devnull, "w")
+
+    server = PSServer(
+        gym.make("gym_env:penalty-shot-v0"), port=port, headless=True, tick=tick, deadline=deadline
+    )
+
+    async def run():
+        listener = await asyncio.start_server(server.add_agent, "", port, backlog=backlog)
+        server.start_time = time.perf_counter()
+        cpu_start = time.process_time()
+        ready.set()
+        while not stop.is_set():
+            await asyncio.sleep(0.05)
+        listener.close()
+        results.put(
+            {
+                "stats": server.stats,
+                "metrics": server.snapshot()["metrics"],
+                "cpu_seconds": time.process_time() - cpu_start,
+            }
+        )
+
+    asyncio.run(run())
+
+
+async def play(agent_id, agent, host, port, episodes, delay, latencies, counts):
+    """Plays episodes as a client of the binary protocol, with the actions of a networked agent"""
+    await asyncio.sleep(delay)
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        counts["dropped"] += 1
+        return
+
+    writer.write(str.encode(handshake(agent_id)))
+    reply = await reader.read(2048)
+    if reply.decode() != "connected|" + PROTOCOL:
+        counts["dropped"] += 1
+        writer.close()
+        return
+
+    channel = AsyncBinaryChannel(reader, writer)
+    for _ in range(episodes):
+        channel.send_start()
+        res = await channel.recv_state()
+        if res is None:
+            counts["dropped"] += 1
+            break
+
+        state, done = res
+        while not done:
+            start = time.perf_counter()
+            channel.send_action(agent.act(state))
+            res = await channel.recv_result()
+            if res is None:
+                break
+            latencies.append(time.perf_counter() - start)
+            state, reward, done, info = res
+
+        if res is None:
+            counts["dropped"] += 1
+            break
+        counts["episodes"] += 1
+    channel.close()
+
+
+def make_agent(name, agent_id):
+    agent = getattr(comm_agents, name)(id=agent_id)
+    # Only the action logic of the agent is used, the asyncio client connects instead of its PSClient
+    agent.agent.close()
+    return agent
+
+
+async def load(args):
+    """Runs the clients of all the matches, returning their step latencies and counts"""
+    latencies = []
+    counts = {"episodes": 0, "dropped": 0}
+    clients = []
+    for i in range(args.matches):
+        delay = args.ramp * i / args.matches
+        for agent_id, name in [("P", args.puck), ("B", args.bar)]:
+            clients.append(
+                play(
+                    agent_id,
+                    make_agent(name, agent_id),
+                    args.host,
+                    args.port,
+                    args.episodes,
+                    delay,
+                    latencies,
+                    counts,
+                )
+            )
+    await asyncio.gather(*clients)
+    return latencies, counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--matches", type=int, default=100, help="concurrent matches, two clients each")
+    parser.add_argument("--episodes", type=int, default=5, help="episodes played by every client")
+    parser.add_argument("--puck", type=str, default="move_sine")
+    parser.add_argument("--bar", type=str, default="Hardcoded_Baseline")
+    parser.add_argument("--tick", type=float, default=0, help="tick of the server, 0 to step as fast as possible")
+    parser.add_argument("--deadline", type=float, default=None)
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which the matches connect")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5556)
+    parser.add_argument("--output", type=str, default=None, help="JSON file to write the results to")
+    parser.add_argument("--verbose", action="store_true", default=False, help="show the logs of the server")
+    args = parser.parse_args()
+
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    results = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(args.port, max(100, 2 * args.matches), args.tick, args.deadline, args.verbose, ready, stop, results),
+    )
+    server.start()
+    if not ready.wait(60):
+        raise Exception("Server did not start")
+
+    start, cpu_start = time.perf_counter(), time.process_time()
+    latencies, counts = asyncio.run(load(args))
+    duration, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+
+    stop.set()
+    server_results = results.get()
+    server.join()
+
+    latencies = np.array(latencies) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (None, None)
+    steps = server_results["stats"]["steps"]
+    report = {
+        "config": vars(args),
+        "platform": {"python": platform.python_version(), "cpus": os.cpu_count()},
+        "clients": 2 * args.matches,
+        "duration": duration,
+        "episodes": server_results["stats"]["episodes"],
+        "steps": steps,
+        "steps_per_second": steps / duration,
+        "latency_ms": {
+            "p50": p50,
+            "p99": p99,
+            "mean": float(latencies.mean()) if len(latencies) else None,
+            "max": float(latencies.max()) if len(latencies) else None,
+        },
+        "dropped_connections": counts["dropped"],
+        "aborted_matches": server_results["stats"]["aborted"],
+        "missed_deadlines": server_results["stats"]["missed_deadlines"],
+        "stale_actions": server_results["stats"]["stale_actions"],
+        "cpu_percent": {
+            "server": 100 * server_results["cpu_seconds"] / duration,
+            "clients": 100 * cpu_seconds / duration,
+        },
+        "server": server_results["stats"],
+        # Timing histograms of the server, see communication.metrics
+        "server_metrics": server_results["metrics"],
+    }
+
+    print(
+        "{} matches, {} steps in {:.2f}s: {:.0f} steps/s, step latency p50 {:.3f} ms p99 {:.3f} ms, "
+        "{} dropped connections, CPU server {:.0f}% clients {:.0f}%".format(
+            args.matches,
+            steps,
+            duration,
+            report["steps_per_second"],
+            p50 or 0,
+            p99 or 0,
+            counts["dropped"],
+            report["cpu_percent"]["server"],
+            report["cpu_percent"]["clients"],
+        )
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4, default=float)
+        print("results written to {}".format(args.output))
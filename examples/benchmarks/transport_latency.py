@@ -0,0 +1,74 @@
+"""Measures the round trip time of PSClient.step against a local headless PSServer with the pickle protocol and the
+binary protocol over TCP, and with the binary protocol over the Unix socket local clients connect through. The
+server and the opponent run in their own processes, and the timings include the step of the environment on the
+server.
+
+python ./examples/benchmarks/transport_latency.py --episodes 50
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from communication import PSClient, PSServer
+
+TRANSPORTS = {
+    "pickle tcp": {"binary": False, "local": False},
+    "binary tcp": {"binary": True, "local": False},
+    "binary unix": {"binary": True, "local": True},
+}
+
+
+def serve(port):
+    import gym
+
+    sys.stdout = open(os.devnull, "w")
+    PSServer(gym.make("gym_env:penalty-shot-v0"), port=port, headless=True).start()
+
+
+def play(agent_id, port, episodes, options, latencies=None):
+    """Plays episodes, appending the seconds taken by every step to latencies"""
+    client = PSClient(agent_id, **options)
+    for state, done in client.episodes(episodes, port=port):
+        while not done:
+            start = time.perf_counter()
+            state, reward, done, info = client.step(0.5)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - start)
+
+
+def opponent(port, episodes, options):
+    sys.stdout = open(os.devnull, "w")
+    play("B", port, episodes, options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=50)
+    parser.add_argument("--port", type=int, default=5557)
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=serve, args=(args.port,), daemon=True)
+    server.start()
+    time.sleep(1)  # Wait for the server to listen
+
+    stdout = sys.stdout
+    for name, options in TRANSPORTS.items():
+        bar = multiprocessing.Process(target=opponent, args=(args.port, args.episodes, options))
+        bar.start()
+        latencies = []
+        sys.stdout = open(os.devnull, "w")
+        play("P", args.port, args.episodes, options, latencies)
+        sys.stdout = stdout
+        bar.join()
+
+        latencies = np.array(latencies) * 1e6
+        print(
+            "{:12s} p50 {:8.2f} us p99 {:8.2f} us per step".format(
+                name, np.percentile(latencies, 50), np.percentile(latencies, 99)
+            )
+        )
+    server.terminate()
@@ -0,0 +1,100 @@
+"""Measures the time taken by TwoAgentPolicy to partition a batch between the puck and the bar, and by its forward and
+process_fn which partition the batch they are given, with the previous partition deep copying the batch for the bar
+and with the current one making views sharing its arrays. The batches are sampled from a replay buffer filled by
+collecting episodes with the policies, as the trainers do.
+
+python ./examples/benchmarks/two_agent_partition.py --puck ddpg --bar ddpg --repeat 50
+"""
+import argparse
+import time
+from copy import deepcopy
+
+import numpy as np
+import torch
+from tianshou.data import Batch, Collector, VectorReplayBuffer
+
+from agents import TwoAgentPolicy
+from utils.config import env_params
+from utils.envs import MakeEnv
+from utils.train import make_policy
+from utils.vector_envs import make_vector_env
+
+BATCH_SIZES = [64, 256, 1024, 4096]
+
+
+def copy_partition(batch, agents=("puck", "bar")):
+    """Previous partition of TwoAgentPolicy, deep copying the batch for the bar (and always partitioning for both)"""
+    puck_batch = batch
+    bar_batch = deepcopy(batch)
+
+    if not batch["act"].is_empty():
+        puck_batch["act"] = puck_batch["act"]["puck"]
+        bar_batch["act"] = bar_batch["act"]["bar"]
+
+    if isinstance(batch["rew"], np.ndarray) or (
+        isinstance(batch["rew"], Batch) and not batch["rew"].is_empty()
+    ):
+        puck_batch["rew"] = -1.0 * puck_batch["rew"]
+
+    return (puck_batch, bar_batch)
+
+
+def measure(fn, buffer, indices, repeat):
+    """Returns the median seconds taken by fn on the batch of the buffer at indices
+
+    The partitions used to modify the batch they are given, so every call gets a fresh batch.
+    """
+    times = []
+    for _ in range(repeat):
+        batch = buffer[indices]
+        start = time.perf_counter()
+        fn(batch)
+        times.append(time.perf_counter() - start)
+    return np.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--puck", type=str, default="ddpg")
+    parser.add_argument("--bar", type=str, default="ddpg")
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--buffer-size", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    env = MakeEnv(**env_params["train"]).create_env()
+    envs = make_vector_env(args.envs, "dummy", render_env_count=0, **env_params["train"])
+    envs.seed(args.seed)
+    policy = TwoAgentPolicy(
+        (make_policy("puck", args.puck), make_policy("bar", args.bar)),
+        observation_space=env.observation_space,
+        action_space=env.action_space,
+    )
+    buffer = VectorReplayBuffer(args.buffer_size, args.envs)
+    Collector(policy, envs, buffer, exploration_noise=True).collect(n_step=args.buffer_size)
+    print("{} transitions collected with {} puck and {} bar".format(len(buffer), args.puck, args.bar))
+
+    partitions = {"copy": copy_partition, "view": policy._partition_batch}
+    operations = {
+        "partition": lambda batch: policy._partition_batch(batch),
+        "forward": lambda batch: policy(batch),
+        "process_fn": lambda batch: policy.process_fn(batch, buffer, indices),
+    }
+    print("{:>6s} {:>10s} {:>12s} {:>12s} {:>8s}".format("size", "operation", "copy us", "view us", "speedup"))
+    for size in BATCH_SIZES:
+        _, indices = buffer.sample(size)
+        for name, operation in operations.items():
+            times = {}
+            for mode, partition in partitions.items():
+                policy._partition_batch = partition
+                with torch.no_grad():
+                    times[mode] = measure(operation, buffer, indices, args.repeat)
+            del policy._partition_batch
+            print(
+                "{:6d} {:>10s} {:12.1f} {:12.1f} {:7.2f}x".format(
+                    size, name, times["copy"] * 1e6, times["view"] * 1e6, times["copy"] / times["view"]
+                )
+            )
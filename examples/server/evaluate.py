@@ -0,0 +1,49 @@
+"""Plays networked agents against each other on a headless server, as fast as they respond, and reports the outcomes
+and the steps per second.
+
+python ./examples/server/evaluate.py --puck move_sine --bar Hardcoded_Baseline --matches 100
+"""
+import argparse
+import threading
+import time
+
+import gym
+
+import agents.comm_agents as comm_agents
+from communication import PSServer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--puck", type=str, default="move_sine")
+    parser.add_argument("--bar", type=str, default="Hardcoded_Baseline")
+    parser.add_argument("--matches", type=int, default=100)
+    args = parser.parse_args()
+
+    server = PSServer(gym.make("gym_env:penalty-shot-v0"), headless=True)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.5)  # Wait for the server to listen
+
+    start = time.perf_counter()
+    for _ in range(args.matches):
+        players = [
+            threading.Thread(target=getattr(comm_agents, args.puck)(id="P").run),
+            threading.Thread(target=getattr(comm_agents, args.bar)(id="B").run),
+        ]
+        for player in players:
+            player.start()
+        for player in players:
+            player.join()
+    seconds = time.perf_counter() - start
+
+    # Let the server close the last match
+    while server.stats["running"]:
+        time.sleep(0.01)
+    print(
+        "{} matches: puck won {}, bar won {}, aborted {}".format(
+            args.matches,
+            server.stats["puck_wins"],
+            server.stats["bar_wins"],
+            server.stats["aborted"],
+        )
+    )
+    print("{:.0f} steps/s".format(server.stats["steps"] / seconds))
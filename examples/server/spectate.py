@@ -0,0 +1,45 @@
+"""Follows a match played on a PSServer and renders it locally, in a window or to a recording.
+
+python ./examples/server/spectate.py --match 0
+python ./examples/server/spectate.py --record match.gif
+"""
+import argparse
+
+from communication import PSSpectator
+from communication.client import host, port
+from gym_env.envs import PSE
+from utils.recorder import FrameRecorder
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--match", type=int, default=None, help="id of the match, the latest running one by default"
+    )
+    parser.add_argument("--host", type=str, default=host)
+    parser.add_argument("--port", type=int, default=port)
+    parser.add_argument("--record", type=str, default=None, help="save a recording instead of showing a window")
+    parser.add_argument("--scale", type=int, default=1, help="downscaling factor of the recording")
+    args = parser.parse_args()
+
+    spectator = PSSpectator(args.match)
+    config = spectator.connect(args.host, args.port)
+    if config is None:
+        raise SystemExit("match not available")
+    print("spectating match {}".format(spectator.match_id))
+
+    env = PSE(render_scale=args.scale, **config)
+    recorder = FrameRecorder(args.record) if args.record else None
+    for episode, step, state, outcome, done in spectator.ticks():
+        env.state = state
+        if recorder is not None:
+            recorder.add(env.render(mode="rgb_array"))
+        else:
+            env.render()
+        if done:
+            print("episode {} over, {} won".format(episode, "bar" if outcome > 0 else "puck"))
+
+    print("match over")
+    spectator.close()
+    env.close()
+    if recorder is not None:
+        recorder.close()
@@ -1,10 +1,43 @@
+import argparse
 import gym
 
-from communication import PSServer
+from communication import InferenceService, PSServer
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--headless",
+    action="store_true",
+    default=False,
+    help="run matches without rendering or pauses, as fast as the agents respond",
+)
+for agent in ["puck", "bar"]:
+    parser.add_argument(
+        "--{}-policy".format(agent),
+        nargs="+",
+        metavar=("ALGO", "RUN_ID"),
+        default=None,
+        help="play as {} against waiting clients with a saved policy, e.g. ppo sine_vs_ppo".format(agent),
+    )
+parser.add_argument("--max-batch-size", type=int, default=64)
+parser.add_argument("--max-wait", type=float, default=0.001)
+args = parser.parse_args()
+
+policies = {}
+for agent, agent_id in [("puck", "P"), ("bar", "B")]:
+    policy = getattr(args, "{}_policy".format(agent))
+    if policy is not None:
+        policies[agent_id] = InferenceService(
+            agent,
+            *policy,
+            max_batch_size=args.max_batch_size,
+            max_wait=args.max_wait,
+        )
 
 env = gym.make("gym_env:penalty-shot-v0")
 server = PSServer(
     env,
+    headless=args.headless,
+    policies=policies,
 )
 
 server.start()
@@ -2,3 +2,8 @@
 import their specific python files (bandit_walk.py in this case).
 """
 from gym_env.envs.penalty_shot import PSE
+from gym_env.envs.batched_penalty_shot import BatchedPSE
+from gym_env.envs.rollout import open_loop_rollout
+from gym_env.envs.rasterizer import Rasterizer
+
+# TorchBatchedPSE is imported from gym_env.envs.torch_penalty_shot so that torch is only loaded when it is used
@@ -0,0 +1,244 @@
+import numpy as np
+
+
+def bar_dynamics(v_p, bar_y, theta, v_ind, bar_action):
+    """Moves a batch of bars by one time step, following PSE.step
+
+    Args:
+        v_p (float): Horizontal speed of the puck
+        bar_y (np.ndarray): Vertical positions of the bars
+        theta (np.ndarray): Number of steps for which the bars have been accelerating
+        v_ind (np.ndarray): Indicator variables, in [-3, 3]
+        bar_action (np.ndarray): Clamped actions of the bars
+
+    Returns:
+        Tuple[np.ndarray]: New bar_y, theta and v_ind
+    """
+    # Speed depends on theta of the previous step
+    v_w = 2 * v_p * (1.0 + 0.85 * theta) / 3
+    bar_y = np.clip(bar_y + v_w * bar_action, -1, 1)
+
+    # Updating indicator variable
+    v_ind = np.where(
+        (bar_action >= 0.8) & (v_ind >= 0),
+        np.minimum(3, v_ind + 1),
+        np.where((bar_action <= -0.8) & (v_ind <= 0), np.maximum(-3, v_ind - 1), 0),
+    )
+    v_ind[(bar_y == 1.0) | (bar_y == -1.0)] = 0
+
+    # Updating theta
+    theta = np.where(np.abs(v_ind) == 3, theta + 1, 0)
+    return bar_y, theta, v_ind
+
+
+class BatchedPSE:
+    """Batched Penalty Shot Environment
+
+    Steps ``num_envs`` independent penalty shot games at once. The state of every game is kept as a structure of
+    arrays (one array per field) and is advanced with vectorised NumPy operations which follow the exact order of
+    floating point operations of ``PSE.step``, so that for the same (float64) actions the trajectories are bit
+    identical to the ones produced by stepping ``num_envs`` separate ``PSE`` instances.
+    """
+
+    # Initializing environment with defaults and a seed value for random operations
+    def __init__(
+        self,
+        num_envs=1,
+        main_seed=0,
+        max_episodes=90,
+        puck_start=(-0.75, 0),
+        bar_start=(0.75, 0),
+        screen_size=(480, 640),
+        goal_nrm=0.77,
+        bar_size=(1 / 6, 1 / 128),
+        puck_diameter=1 / 64,
+        auto_reset=False,
+        render_scale=1,
+    ):
+        """Batched Penalty Shot Environment
+
+        Args:
+            num_envs (int, optional): Number of games stepped together. Defaults to 1.
+            main_seed (int, optional): main seed for RNG Defaults to 0.
+            max_episodes (int, optional): Maximum number of episodes. Defaults to 90.
+            puck_start (tuple, optional): Normalised start (x, y) coordinates for the puck. Defaults to (-0.75, 0).
+            bar_start (tuple, optional): Normalised start (x, y) coordinates for the bar. Defaults to (0.75, 0).
+            screen_size (tuple, optional): Actual screen size (height, width). Defaults to (480, 640).
+            goal_nrm (float, optional): Normalised x-coordinate defining the goal line. Defaults to 0.77.
+            bar_size (tuple, optional): Normalised values for size of the bar (length, width). Defaults to (1/6, 1/128).
+            puck_diameter (float, optional): Normalised diameter of the puck. Defaults to 1/64.
+            auto_reset (bool, optional): Whether games are reset as soon as they are over. Defaults to False.
+            render_scale (int, optional): Downscaling factor of the rendered frames. Defaults to 1.
+        """
+        # setting environment parameters, mirroring PSE
+        self.num_envs = num_envs
+        self.seed(main_seed)
+        self.max_episodes = max_episodes
+        self.puck_start = puck_start
+        self.bar_start = bar_start
+        self.screen_height, self.screen_width = screen_size
+        self.goal_nrm = goal_nrm
+        self.bar_length, self.bar_width = bar_size
+        self.bar_length, self.bar_width = (
+            2 * self.bar_length,
+            2 * self.bar_width,
+        )  # Scale factor due to normalisation
+        self.puck_diameter = puck_diameter * 2  # Scale factor due to normalisation
+        self.v_p = (self.goal_nrm - self.puck_start[0]) / self.max_episodes
+        self.auto_reset = auto_reset
+        self.render_scale = render_scale
+        self.rasterizer = None  # Headless rendering object
+
+        # Structure of arrays holding the state of every game
+        self.puck_x = np.empty(num_envs, dtype=np.float64)
+        self.puck_y = np.empty(num_envs, dtype=np.float64)
+        self.bar_x = np.empty(num_envs, dtype=np.float64)
+        self.bar_y = np.empty(num_envs, dtype=np.float64)
+        self.theta = np.empty(num_envs, dtype=np.int64)
+        self.v_ind = np.empty(num_envs, dtype=np.int64)  # Kept in [-3, 3] as in PSE
+        self.step_count = np.empty(num_envs, dtype=np.int64)
+        self.reset()
+
+    @property
+    def state(self):
+        """State of all the games laid out like ``PSE.state``
+
+        Returns:
+            Tuple[np.ndarray]: Puck positions (N, 2), bar positions (N, 2), theta (N,) and v_ind (N,)
+        """
+        return (
+            np.column_stack((self.puck_x, self.puck_y)),
+            np.column_stack((self.bar_x, self.bar_y)),
+            self.theta.copy(),
+            self.v_ind + 3,
+        )
+
+    def env_state(self, i):
+        """State of a single game as the nested tuple used by ``PSE``
+
+        Args:
+            i (int): Index of the game
+
+        Returns:
+            Tuple: ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind)
+        """
+        return (
+            (float(self.puck_x[i]), float(self.puck_y[i])),
+            (float(self.bar_x[i]), float(self.bar_y[i])),
+            int(self.theta[i]),
+            int(self.v_ind[i]) + 3,
+        )
+
+    def _actions(self, action, n):
+        """Broadcasts and clamps the actions of one agent to an array of shape (n,)"""
+        action = np.asarray(action, dtype=np.float64).reshape(-1)
+        action = np.broadcast_to(action, (n,))
+        return np.clip(action, -1, 1)
+
+    # Moves the games forward by 1 time step
+    def step(self, puck_action, bar_action, ids=None):
+        """Take one step in the games
+
+        Args:
+            puck_action (np.ndarray): Actions for the puck, one per game (or a scalar shared by all games)
+            bar_action (np.ndarray): Actions for the bar, one per game (or a scalar shared by all games)
+            ids (np.ndarray, optional): Indices of the games to step. Defaults to None (all games).
+
+        Returns:
+            State: Current state of the stepped games (see ``state``), before any auto reset
+            Reward: Reward for the bar in every stepped game, negative of the reward of the puck
+            Done: Mask of the stepped games which are over
+            Info: Dictionary with the step count of every stepped game
+        """
+        ids = slice(None) if ids is None else np.asarray(ids)
+        puck_x, puck_y = self.puck_x[ids], self.puck_y[ids]
+        bar_x, bar_y = self.bar_x[ids], self.bar_y[ids]
+        theta, v_ind = self.theta[ids], self.v_ind[ids]
+
+        puck_action = self._actions(puck_action, len(puck_x))
+        bar_action = self._actions(bar_action, len(puck_x))
+
+        ## Update puck position
+        puck_x = puck_x + self.v_p
+        puck_y = np.clip(puck_y + self.v_p * puck_action, -1, 1)
+
+        ## Update bar position, indicator variable and theta
+        bar_y, theta, v_ind = bar_dynamics(self.v_p, bar_y, theta, v_ind, bar_action)
+
+        # Termination Condition
+        goal = self.goal_nrm - (puck_x + self.puck_diameter / 2) < 0.001
+        caught = (
+            ~goal
+            & (np.abs(bar_x - puck_x) < (self.puck_diameter + self.bar_width) / 2)
+            & (np.abs(bar_y - puck_y) < (self.puck_diameter + self.bar_length) / 2)
+        )
+        reward = caught.astype(np.int64) - goal.astype(np.int64)
+        done = goal | caught
+
+        self.puck_x[ids], self.puck_y[ids] = puck_x, puck_y
+        self.bar_y[ids] = bar_y
+        self.theta[ids], self.v_ind[ids] = theta, v_ind
+        self.step_count[ids] += 1
+
+        state = (
+            np.column_stack((puck_x, puck_y)),
+            np.column_stack((bar_x, bar_y)),
+            theta,
+            v_ind + 3,
+        )
+        info = {"steps": self.step_count[ids].copy()}
+
+        if self.auto_reset and done.any():
+            self.reset(np.arange(self.num_envs)[ids][done])
+
+        return state, reward, done, info
+
+    def reset(self, ids=None):
+        """Resets the games to their initial state
+
+        Args:
+            ids (np.ndarray, optional): Indices of the games to reset. Defaults to None (all games).
+
+        Returns:
+            State: Initial state of the games which were reset
+        """
+        if ids is None:
+            ids = slice(None)
+        self.puck_x[ids], self.puck_y[ids] = self.puck_start
+        self.bar_x[ids], self.bar_y[ids] = self.bar_start
+        self.theta[ids] = 0
+        self.v_ind[ids] = 0
+        self.step_count[ids] = 0
+
+        puck_pos, bar_pos, theta, v_ind = self.state
+        return (puck_pos[ids], bar_pos[ids], theta[ids], v_ind[ids])
+
+    def render(self, out=None):
+        """Renders all the games into one array, without needing a display
+
+        Args:
+            out (np.ndarray, optional): Array of shape (N, height, width, 3) to draw into. Defaults to a buffer
+                which is overwritten by the next call.
+
+        Returns:
+            np.ndarray: RGB frames of shape (N, height, width, 3)
+        """
+        if self.rasterizer is None:
+            from gym_env.envs.rasterizer import Rasterizer
+
+            self.rasterizer = Rasterizer(self, self.render_scale)
+        return self.rasterizer.render_batch(self.state, out)
+
+    # Creates seeds and random generator for environment
+    def seed(self, mainSeed):
+        """Seeds the random number generator of the environment
+
+        Args:
+            mainSeed (int): Main seed for the environment
+        """
+        self.mainSeed = mainSeed  # Main seed
+        self.rng = np.random.default_rng(seed=self.mainSeed)
+
+    def close(self):
+        """Closes the environment."""
+        pass
@@ -1,4 +1,5 @@
 import gym
+from gym.spaces.utils import flatten_space
 import numpy as np
 from numpy.core.fromnumeric import shape
 
@@ -19,6 +20,8 @@ class PSE(gym.Env):
         goal_nrm=0.77,
         bar_size=(1 / 6, 1 / 128),
         puck_diameter=1 / 64,
+        flat_obs=False,
+        render_scale=1,
     ):
         """Penalty Shot Environment
 
@@ -31,6 +34,9 @@ class PSE(gym.Env):
             goal_nrm (float, optional): Normalised x-coordinate defining the goal line. Defaults to 0.77.
             bar_size (tuple, optional): Normalised values for size of the bar (length, width). Defaults to (1/6, 1/128).
             puck_diameter (float, optional): Normalised diameter of the puck. Defaults to 1/64.
+            flat_obs (bool, optional): Whether observations are flat arrays, written into a preallocated buffer, in
+                place of state tuples. Defaults to False.
+            render_scale (int, optional): Downscaling factor of the frames rendered in rgb_array mode. Defaults to 1.
         """
         # setting environment parameters
         self.seed(main_seed)  # Sets up seed and random value generators
@@ -47,8 +53,21 @@ class PSE(gym.Env):
         self.puck_diameter = puck_diameter * 2  # Scale factor due to normalisation
         self.step_count = 0
 
+        # Parameters defining the dynamics, enough to recreate the environment (e.g. to replay logged episodes)
+        self.config = {
+            "max_episodes": max_episodes,
+            "puck_start": tuple(puck_start),
+            "bar_start": tuple(bar_start),
+            "screen_size": tuple(screen_size),
+            "goal_nrm": goal_nrm,
+            "bar_size": tuple(bar_size),
+            "puck_diameter": puck_diameter,
+        }
+
         self.state = None
         self.viewer = None  # Rendering object
+        self.render_scale = render_scale
+        self.rasterizer = None  # Headless rendering object for rgb_array mode
 
         self.v_ind = 0  # Indicator variable used to check whether the bar can accelerate in next step
         self.theta = 0
@@ -61,7 +80,7 @@ class PSE(gym.Env):
             low=np.array([-1.0]), high=np.array([1.0]), dtype=np.float32
         )
 
-        self.observation_space = gym.spaces.Tuple(
+        self.state_space = gym.spaces.Tuple(
             (
                 gym.spaces.Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32),
                 gym.spaces.Box(low=-1.0, high=1.0, shape=(2,), dtype=np.float32),
@@ -69,6 +88,15 @@ class PSE(gym.Env):
                 gym.spaces.Discrete(7),
             )
         )
+        self.flat_obs = flat_obs
+        if flat_obs:
+            # Same layout as gym's FlattenObservation, so that wrappers need not flatten each state
+            self.observation_space = flatten_space(self.state_space)
+            self._obs = np.zeros(self.observation_space.shape, dtype=self.observation_space.dtype)
+            self._pos = np.zeros(4, dtype=np.float32)
+            self._onehot = (4, 4)
+        else:
+            self.observation_space = self.state_space
         self.action_space = gym.spaces.Dict(
             {
                 "puck": gym.spaces.Box(
@@ -99,8 +127,9 @@ class PSE(gym.Env):
         # puck_action (float): Action for the puck. u_t_p in [-1, 1]
         # bar_action (float): Action for the bar. u_t_b in [-1, 1]
         # Clamp puck and bar actions between [-1, 1]
-        puck_action = np.clip(action["puck"], -1, 1)
-        bar_action = np.clip(action["bar"], -1, 1)
+        # Actions are stepped in float64 whatever their dtype (policies output float32 arrays), as in BatchedPSE
+        puck_action = float(np.clip(np.asarray(action["puck"], dtype=np.float64).reshape(-1)[0], -1, 1))
+        bar_action = float(np.clip(np.asarray(action["bar"], dtype=np.float64).reshape(-1)[0], -1, 1))
 
         if (
             puck_action < -1.0
@@ -161,12 +190,35 @@ class PSE(gym.Env):
         info = {"steps": self.step_count}
 
         return (
-            self.state,
+            self.observation(),
             reward,
             done,
             info,
         )  # returns result tuple after action is taken
 
+    def observation(self):
+        """Returns the observation of the current state
+
+        Returns:
+            Tuple | np.ndarray: The state, or with flat_obs the flattened state. The flattened state is a view of a
+                buffer which is overwritten by the next step or reset.
+        """
+        if not self.flat_obs:
+            return self.state
+
+        (puck_x, puck_y), (bar_x, bar_y), theta, v_ind = self.state
+        obs, pos = self._obs, self._pos
+        pos[0], pos[1], pos[2], pos[3] = puck_x, puck_y, bar_x, bar_y  # Rounded as in FlattenObservation
+        obs[0:4] = pos
+
+        # Move the one hot encodings of theta and v_ind
+        obs[self._onehot[0]] = 0
+        obs[self._onehot[1]] = 0
+        self._onehot = (4 + theta, 4 + self.state_space[2].n + v_ind)
+        obs[self._onehot[0]] = 1
+        obs[self._onehot[1]] = 1
+        return obs
+
     def reset(self, fullReset=False):
         """Resets the environment to its initial state
 
@@ -184,7 +236,7 @@ class PSE(gym.Env):
 
         if fullReset:
             self.rng = np.random.default_rng(seed=self.mainSeed)
-        return self.state
+        return self.observation()
 
     # Creates seeds and random generator for environment
     def seed(self, mainSeed):
@@ -228,9 +280,20 @@ class PSE(gym.Env):
     def render(self, mode="human"):
         """Renders a view of the current state of the environment.
 
+        The rgb_array mode draws the frame with numpy and works without a display.
+
         Args:
             mode (str, optional): Mode of rendering environment. Defaults to 'human'.
         """
+        if mode == "rgb_array":
+            if self.rasterizer is None:
+                from gym_env.envs.rasterizer import Rasterizer
+
+                self.rasterizer = Rasterizer(self, self.render_scale)
+
+            if self.state is None:
+                return None
+            return self.rasterizer.render(self.state).copy()
 
         if self.viewer is None:
             from gym.envs.classic_control import rendering
@@ -0,0 +1,114 @@
+import numpy as np
+from gym_env.envs.penalty_shot import PSE
+
+# Colors of the geometries drawn by PSE.render with the pyglet viewer
+BACKGROUND_COLOR = 255
+BAR_COLOR = np.round(255 * np.array([0.93, 0.2, 0.13])).astype(np.uint8)
+PUCK_COLOR = np.round(255 * np.array([0.5, 0.5, 0.8])).astype(np.uint8)
+GOAL_COLOR = 0
+
+
+class Rasterizer:
+    """Headless renderer drawing penalty shot states into numpy RGB arrays
+
+    Draws the bar, the puck and the goal line like ``PSE.render`` does with the pyglet viewer, without needing an
+    OpenGL context. Frames are drawn into preallocated buffers which are reused (and overwritten) by the next call.
+    """
+
+    def __init__(self, env, scale=1):
+        """Headless renderer
+
+        Args:
+            env (PSE | BatchedPSE): Environment giving the screen size and the geometry of the bar and the puck
+            scale (int, optional): Downscaling factor of the frames. Defaults to 1.
+        """
+        self.env = env
+        self.scale = scale
+        self.height = env.screen_height // scale
+        self.width = env.screen_width // scale
+
+        # Screen coordinates of the pixel centres, the screen origin is at the bottom left as in the pyglet viewer
+        self.xs = (np.arange(self.width) + 0.5) * scale
+        self.ys = env.screen_height - (np.arange(self.height) + 0.5) * scale
+
+        self.radius = env.puck_diameter * env.screen_width / 2
+        goal_x = (env.goal_nrm + 1) * env.screen_width / 2
+        self.goal_col = min(int(goal_x // scale), self.width - 1)
+
+        self.buffer = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.batch_buffer = None
+
+    @staticmethod
+    def _span(coords, lo, hi):
+        """Slice of the (monotonic) pixel centre coordinates lying in [lo, hi]"""
+        index = np.flatnonzero((coords >= lo) & (coords <= hi))
+        return slice(index[0], index[-1] + 1) if len(index) else slice(0, 0)
+
+    def render(self, state, out=None):
+        """Draws a single state
+
+        Args:
+            state (Tuple): State of PSE, ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind)
+            out (np.ndarray, optional): Array of shape (height, width, 3) to draw into. Defaults to the internal buffer.
+
+        Returns:
+            np.ndarray: RGB frame of shape (height, width, 3)
+        """
+        out = self.buffer if out is None else out
+        puck_pos, bar_pos, theta, v_ind = state
+        out.fill(BACKGROUND_COLOR)
+
+        ## Draw bar
+        (l, b), _, (r, t), _ = PSE.bar_vertices(self.env, bar_pos)
+        out[self._span(self.ys, t, b), self._span(self.xs, l, r)] = BAR_COLOR
+
+        ## Draw puck
+        puck_x, puck_y = puck_pos
+        cx = (puck_x + 1) * self.env.screen_width / 2
+        cy = (puck_y + 1) * self.env.screen_height / 2
+        rows = self._span(self.ys, cy - self.radius, cy + self.radius)
+        cols = self._span(self.xs, cx - self.radius, cx + self.radius)
+        disc = (self.ys[rows, None] - cy) ** 2 + (self.xs[None, cols] - cx) ** 2
+        out[rows, cols][disc <= self.radius ** 2] = PUCK_COLOR
+
+        ## Draw goal line
+        out[:, self.goal_col] = GOAL_COLOR
+        return out
+
+    def render_batch(self, state, out=None):
+        """Draws a batch of states
+
+        Args:
+            state (Tuple[np.ndarray]): States laid out like BatchedPSE.state
+            out (np.ndarray, optional): Array of shape (N, height, width, 3) to draw into. Defaults to an internal
+                buffer.
+
+        Returns:
+            np.ndarray: RGB frames of shape (N, height, width, 3)
+        """
+        puck_pos, bar_pos, theta, v_ind = state
+        n = len(puck_pos)
+        if out is None:
+            if self.batch_buffer is None or len(self.batch_buffer) != n:
+                self.batch_buffer = np.empty(
+                    (n, self.height, self.width, 3), dtype=np.uint8
+                )
+            out = self.batch_buffer
+        out.fill(BACKGROUND_COLOR)
+
+        ## Draw bars
+        (l, b), _, (r, t), _ = PSE.bar_vertices(self.env, (bar_pos[:, 0], bar_pos[:, 1]))
+        rows = (self.ys >= t[:, None]) & (self.ys <= b[:, None])
+        cols = (self.xs >= l[:, None]) & (self.xs <= r[:, None])
+        out[rows[:, :, None] & cols[:, None, :]] = BAR_COLOR
+
+        ## Draw pucks
+        cx = (puck_pos[:, 0] + 1) * self.env.screen_width / 2
+        cy = (puck_pos[:, 1] + 1) * self.env.screen_height / 2
+        dy = (self.ys - cy[:, None]) ** 2
+        dx = (self.xs - cx[:, None]) ** 2
+        out[dy[:, :, None] + dx[:, None, :] <= self.radius ** 2] = PUCK_COLOR
+
+        ## Draw goal lines
+        out[:, :, self.goal_col] = GOAL_COLOR
+        return out
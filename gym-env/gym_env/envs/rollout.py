@@ -0,0 +1,103 @@
+import numpy as np
+from gym_env.envs.batched_penalty_shot import BatchedPSE, bar_dynamics
+
+
+def open_loop_rollout(puck_actions, bar_actions, return_trajectories=False, **kwargs):
+    """Plays whole episodes of open loop puck action sequences against a bar in one vectorised pass
+
+    The puck path does not depend on the bar, so it is computed for all the games and steps at once with a
+    cumulative sum (games whose puck reaches a wall are replayed step by step to apply the clipping). The bar is
+    then moved step by step for all the games together and the first goal or catch of every game is recorded.
+    The results are the same as stepping a ``PSE`` per game with the same (float64) actions.
+
+    Args:
+        puck_actions (np.ndarray): Actions of the puck, of shape (N, T)
+        bar_actions (np.ndarray | Callable): Actions of the bar of shape (N, T), or a function called as
+            ``bar_actions(t, state)`` with the number of steps taken and the state of the games laid out like
+            ``BatchedPSE.state``, returning the next (N,) actions of the bar
+        return_trajectories (bool, optional): Whether to also return the trajectories. Defaults to False.
+        **kwargs: Environment parameters, as accepted by ``BatchedPSE``
+
+    Returns:
+        dict: ``outcome`` (N,) reward of the bar (1 for a catch, -1 for a goal, 0 if not over after T steps) and
+            ``done_step`` (N,) steps taken when the game was over (-1 if not over). With ``return_trajectories``,
+            also ``puck_pos`` and ``bar_pos`` (N, T + 1, 2), ``theta`` and ``v_ind`` (N, T + 1), frozen after
+            the end of every game.
+    """
+    puck_actions = np.clip(np.asarray(puck_actions, dtype=np.float64), -1, 1)
+    n, T = puck_actions.shape
+    env = BatchedPSE(n, **kwargs)
+    v_p = env.v_p
+
+    ## Puck path
+    puck_x = np.cumsum(np.concatenate(([env.puck_start[0]], np.full(T, v_p))))
+    dy = v_p * puck_actions
+    puck_y = np.cumsum(np.column_stack((np.full(n, env.puck_start[1], dtype=np.float64), dy)), axis=1)
+    wall = np.flatnonzero((np.abs(puck_y) > 1).any(axis=1))
+    if len(wall):
+        for t in range(T):
+            puck_y[wall, t + 1] = np.clip(puck_y[wall, t] + dy[wall, t], -1, 1)
+    goal = env.goal_nrm - (puck_x + env.puck_diameter / 2) < 0.001
+
+    ## Bar path
+    bar_x, bar_y = env.bar_x, env.bar_y
+    theta, v_ind = env.theta, env.v_ind
+    outcome = np.zeros(n, dtype=np.int64)
+    done_step = np.full(n, -1, dtype=np.int64)
+    if return_trajectories:
+        bar_ys = np.empty((n, T + 1))
+        thetas = np.empty((n, T + 1), dtype=np.int64)
+        v_inds = np.empty((n, T + 1), dtype=np.int64)
+        bar_ys[:, 0], thetas[:, 0], v_inds[:, 0] = bar_y, theta, v_ind + 3
+
+    steps = T
+    for t in range(T):
+        if callable(bar_actions):
+            state = (
+                np.column_stack((np.full(n, puck_x[t]), puck_y[:, t])),
+                np.column_stack((bar_x, bar_y)),
+                theta,
+                v_ind + 3,
+            )
+            bar_action = bar_actions(t, state)
+        else:
+            bar_action = bar_actions[:, t]
+        bar_action = np.clip(np.asarray(bar_action, dtype=np.float64), -1, 1)
+        bar_y, theta, v_ind = bar_dynamics(v_p, bar_y, theta, v_ind, bar_action)
+
+        if return_trajectories:
+            bar_ys[:, t + 1], thetas[:, t + 1], v_inds[:, t + 1] = bar_y, theta, v_ind + 3
+
+        # Termination Condition, only the first one of every game counts
+        running = done_step < 0
+        if goal[t + 1]:
+            outcome[running] = -1
+            done_step[running] = t + 1
+            steps = t + 1
+            break
+        caught = (
+            running
+            & (np.abs(bar_x - puck_x[t + 1]) < (env.puck_diameter + env.bar_width) / 2)
+            & (np.abs(bar_y - puck_y[:, t + 1]) < (env.puck_diameter + env.bar_length) / 2)
+        )
+        outcome[caught] = 1
+        done_step[caught] = t + 1
+        if (done_step >= 0).all():
+            steps = t + 1
+            break
+
+    result = {"outcome": outcome, "done_step": done_step}
+    if return_trajectories:
+        # Freeze the trajectories after the end of every game
+        last = np.where(done_step < 0, steps, done_step)
+        index = np.minimum(np.arange(T + 1), last[:, None])
+        rows = np.arange(n)[:, None]
+        result["puck_pos"] = np.stack(
+            (np.broadcast_to(puck_x, (n, T + 1))[rows, index], puck_y[rows, index]), axis=-1
+        )
+        result["bar_pos"] = np.stack(
+            (np.broadcast_to(bar_x[:, None], (n, T + 1)), bar_ys[rows, index]), axis=-1
+        )
+        result["theta"] = thetas[rows, index]
+        result["v_ind"] = v_inds[rows, index]
+    return result
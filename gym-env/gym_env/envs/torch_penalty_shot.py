@@ -0,0 +1,188 @@
+import numpy as np
+import torch
+
+
+class TorchBatchedPSE:
+    """Batched Penalty Shot Environment on torch tensors
+
+    Same dynamics as ``PSE.step`` (and ``BatchedPSE``) for ``num_envs`` games, with the state kept in preallocated
+    tensors on ``device`` and updated in place. Actions are read from tensors and observations are written into a
+    preallocated tensor laid out like the flattened observations of ``EnvWrapper``, so that a rollout with a torch
+    policy never converts between numpy arrays and tensors.
+    """
+
+    def __init__(
+        self,
+        num_envs=1,
+        max_episodes=90,
+        puck_start=(-0.75, 0),
+        bar_start=(0.75, 0),
+        goal_nrm=0.77,
+        bar_size=(1 / 6, 1 / 128),
+        puck_diameter=1 / 64,
+        auto_reset=False,
+        device="cpu",
+        dtype=torch.float64,
+    ):
+        """Batched Penalty Shot Environment on torch tensors
+
+        Args:
+            num_envs (int, optional): Number of games stepped together. Defaults to 1.
+            max_episodes (int, optional): Maximum number of episodes. Defaults to 90.
+            puck_start (tuple, optional): Normalised start (x, y) coordinates for the puck. Defaults to (-0.75, 0).
+            bar_start (tuple, optional): Normalised start (x, y) coordinates for the bar. Defaults to (0.75, 0).
+            goal_nrm (float, optional): Normalised x-coordinate defining the goal line. Defaults to 0.77.
+            bar_size (tuple, optional): Normalised values for size of the bar (length, width). Defaults to (1/6, 1/128).
+            puck_diameter (float, optional): Normalised diameter of the puck. Defaults to 1/64.
+            auto_reset (bool, optional): Whether games are reset as soon as they are over. Defaults to False.
+            device (str, optional): Device holding the tensors. Defaults to "cpu".
+            dtype (torch.dtype, optional): Floating point type of the positions. Defaults to torch.float64.
+        """
+        self.num_envs = num_envs
+        self.max_episodes = max_episodes
+        self.puck_start = puck_start
+        self.bar_start = bar_start
+        self.goal_nrm = goal_nrm
+        self.bar_length, self.bar_width = bar_size
+        self.bar_length, self.bar_width = (
+            2 * self.bar_length,
+            2 * self.bar_width,
+        )  # Scale factor due to normalisation
+        self.puck_diameter = puck_diameter * 2  # Scale factor due to normalisation
+        self.v_p = (self.goal_nrm - self.puck_start[0]) / self.max_episodes
+        self.auto_reset = auto_reset
+        self.device = device
+        self.dtype = dtype
+
+        # Sizes of the one hot encodings of theta and v_ind, as in PSE.observation_space
+        self.theta_n = 4 * int(np.int32(np.sqrt(max_episodes)))
+        self.v_ind_n = 7
+
+        def zeros(dtype):
+            return torch.zeros(num_envs, dtype=dtype, device=device)
+
+        self.puck_x, self.puck_y = zeros(dtype), zeros(dtype)
+        self.bar_x, self.bar_y = zeros(dtype), zeros(dtype)
+        self.theta = zeros(torch.int64)
+        self.v_ind = zeros(torch.int64)  # Kept in [-3, 3] as in PSE
+        self.step_count = zeros(torch.int64)
+        self.reward = zeros(dtype)
+        self.done = zeros(torch.bool)
+        self.obs = torch.zeros(
+            (num_envs, 4 + self.theta_n + self.v_ind_n),
+            dtype=torch.float32,
+            device=device,
+        )
+        self._zero = zeros(torch.int64)
+        self._rows = torch.arange(num_envs, device=device)
+        self.reset()
+
+    def observation(self):
+        """Writes the flattened observation of every game into the preallocated observation tensor
+
+        Returns:
+            torch.Tensor: Observations of shape (num_envs, 4 + theta_n + v_ind_n), overwritten by the next call
+        """
+        self.obs.zero_()
+        self.obs[:, 0] = self.puck_x
+        self.obs[:, 1] = self.puck_y
+        self.obs[:, 2] = self.bar_x
+        self.obs[:, 3] = self.bar_y
+        self.obs[self._rows, 4 + self.theta] = 1
+        self.obs[self._rows, 4 + self.theta_n + self.v_ind + 3] = 1
+        return self.obs
+
+    # Moves all the games forward by 1 time step
+    def step(self, puck_action, bar_action, ids=None):
+        """Take one step in the games in ids
+
+        With ``auto_reset`` the observations of the games which are over are already those of their next episode,
+        as in gym's vector environments, while rewards, dones and step counts are the ones of the finished episode.
+
+        Args:
+            puck_action (torch.Tensor): Actions for the puck, one per game stepped
+            bar_action (torch.Tensor): Actions for the bar, one per game stepped
+            ids (torch.Tensor, optional): Indices of the games to step. Defaults to None (all games).
+
+        Returns:
+            Observation: Flattened observations of the games stepped (see ``observation``)
+            Reward: Reward for the bar in every game stepped, negative of the reward of the puck
+            Done: Mask of the games stepped which are over
+            Info: Dictionary with the step count of every game stepped
+        """
+        # Without ids the games are views of the state and updated in place
+        ids = slice(None) if ids is None else torch.as_tensor(ids, device=self.device)
+        puck_x, puck_y = self.puck_x[ids], self.puck_y[ids]
+        bar_x, bar_y = self.bar_x[ids], self.bar_y[ids]
+        theta, v_ind = self.theta[ids], self.v_ind[ids]
+        n = len(theta)
+        zero = self._zero[:n]
+
+        # Actions are stepped in the dtype of the positions (float64 as in PSE and BatchedPSE) whatever their dtype
+        puck_action = puck_action.to(self.device, self.dtype).reshape(n).clamp(-1, 1)
+        bar_action = bar_action.to(self.device, self.dtype).reshape(n).clamp(-1, 1)
+
+        ## Update puck position
+        puck_x += self.v_p
+        puck_y += self.v_p * puck_action
+        puck_y.clamp_(-1, 1)
+
+        ## Update bar position, speed depends on theta of the previous step
+        v_w = 2 * self.v_p * (1.0 + 0.85 * theta.to(self.dtype)) / 3
+        bar_y += v_w * bar_action
+        bar_y.clamp_(-1, 1)
+
+        # Updating indicator variable
+        v_ind = torch.where(
+            (bar_action >= 0.8) & (v_ind >= 0),
+            (v_ind + 1).clamp_(max=3),
+            torch.where(
+                (bar_action <= -0.8) & (v_ind <= 0),
+                (v_ind - 1).clamp_(min=-3),
+                zero,
+            ),
+        )
+        v_ind.masked_fill_((bar_y == 1.0) | (bar_y == -1.0), 0)
+
+        # Updating theta
+        theta = torch.where(v_ind.abs() == 3, theta + 1, zero)
+
+        # Termination Condition
+        goal = self.goal_nrm - (puck_x + self.puck_diameter / 2) < 0.001
+        caught = (
+            ~goal
+            & ((bar_x - puck_x).abs() < (self.puck_diameter + self.bar_width) / 2)
+            & ((bar_y - puck_y).abs() < (self.puck_diameter + self.bar_length) / 2)
+        )
+        done = torch.bitwise_or(goal, caught, out=self.done[:n])
+        reward = self.reward[:n]
+        reward.zero_()
+        reward.masked_fill_(caught, 1)
+        reward.masked_fill_(goal, -1)
+
+        self.puck_x[ids], self.puck_y[ids] = puck_x, puck_y
+        self.bar_y[ids] = bar_y
+        self.theta[ids], self.v_ind[ids] = theta, v_ind
+        self.step_count[ids] += 1
+        info = {"steps": self.step_count[ids].clone()}
+
+        if self.auto_reset:
+            self.reset(self._rows[ids][done])
+        return self.observation()[ids], reward, done, info
+
+    def reset(self, ids=None):
+        """Resets the games to their initial state
+
+        Args:
+            ids (torch.Tensor, optional): Indices or boolean mask of the games to reset. Defaults to None (all games).
+
+        Returns:
+            torch.Tensor: Flattened observations of the games reset
+        """
+        ids = slice(None) if ids is None else torch.as_tensor(ids, device=self.device)
+        self.puck_x[ids], self.puck_y[ids] = self.puck_start
+        self.bar_x[ids], self.bar_y[ids] = self.bar_start
+        self.theta[ids] = 0
+        self.v_ind[ids] = 0
+        self.step_count[ids] = 0
+        return self.observation()[ids]
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+
+def test_import_does_not_load_training_stack():
+    """Clients importing communication do not load torch, tianshou or the utils package"""
+    modules = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, communication, communication.client, communication.spectator; print(*sys.modules)",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.split()
+    for module in ("torch", "tianshou", "utils"):
+        assert module not in modules
+
+
+def test_policy_channels_recycle_keys():
+    """The agents of a policy reuse the ids of the agents which left, so per-env state stays bounded"""
+    from communication import InferenceService, PolicyChannel
+
+    service = InferenceService("puck", "sine")
+    channels = [PolicyChannel(service) for _ in range(3)]
+    assert [channel.key for channel in channels] == [0, 1, 2]
+
+    channels[2].close()
+    channels[0].close()
+    channels[0].close()
+    assert [PolicyChannel(service).key for _ in range(3)] == [0, 2, 3]
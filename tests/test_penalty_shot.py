@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+from gym.wrappers import FlattenObservation
+import torch
+from gym_env.envs import PSE, BatchedPSE, open_loop_rollout
+from gym_env.envs.rasterizer import BAR_COLOR, PUCK_COLOR
+from gym_env.envs.torch_penalty_shot import TorchBatchedPSE
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_batched_pse_matches_pse(dtype):
+    """BatchedPSE steps the same games as PSE, including with the float32 actions of the policies"""
+    n, steps = 16, 300
+    rng = np.random.default_rng(0)
+    envs = [PSE() for _ in range(n)]
+    for env in envs:
+        env.reset()
+    batched = BatchedPSE(num_envs=n, auto_reset=True)
+    batched.reset()
+
+    for _ in range(steps):
+        actions = (2 * rng.random((n, 2)) - 1).astype(dtype)
+        state, reward, done, info = batched.step(actions[:, 0], actions[:, 1])
+        for i, env in enumerate(envs):
+            # Policies send arrays of shape (1,)
+            (puck_pos, bar_pos, theta, v_ind), env_reward, env_done, _ = env.step(
+                {"puck": actions[i, :1], "bar": actions[i, 1:]}
+            )
+            assert (tuple(state[0][i]), tuple(state[1][i]), state[2][i], state[3][i]) == (
+                puck_pos,
+                bar_pos,
+                theta,
+                v_ind,
+            )
+            assert (reward[i], done[i]) == (env_reward, env_done)
+            if env_done:
+                env.reset()
+
+
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+def test_torch_batched_pse_matches_pse(dtype):
+    """TorchBatchedPSE steps the same games as PSE, including with float32 action tensors"""
+    n, steps = 16, 300
+    rng = np.random.default_rng(0)
+    envs = [PSE() for _ in range(n)]
+    for env in envs:
+        env.reset()
+    batched = TorchBatchedPSE(num_envs=n, auto_reset=True)
+
+    for _ in range(steps):
+        actions = torch.as_tensor(2 * rng.random((n, 2)) - 1, dtype=dtype)
+        # Step a random subset of the games, as tianshou's collectors do
+        ids = np.flatnonzero(rng.random(n) < 0.75)
+        _, reward, done, _ = batched.step(actions[ids, 0], actions[ids, 1], ids=ids)
+        for j, i in enumerate(ids):
+            _, env_reward, env_done, _ = envs[i].step(
+                {"puck": actions[i, :1].numpy(), "bar": actions[i, 1:].numpy()}
+            )
+            assert (reward[j].item(), done[j].item()) == (env_reward, env_done)
+            if env_done:
+                envs[i].reset()
+        for i, env in enumerate(envs):
+            (puck_x, puck_y), (bar_x, bar_y), _, _ = env.state
+            assert (
+                batched.puck_x[i].item(),
+                batched.puck_y[i].item(),
+                batched.bar_x[i].item(),
+                batched.bar_y[i].item(),
+                batched.theta[i].item(),
+                batched.v_ind[i].item(),
+            ) == (puck_x, puck_y, bar_x, bar_y, env.theta, env.v_ind)
+
+
+def chase(puck_y, bar_y):
+    """Bar moving towards the puck, fast enough to accelerate"""
+    return np.clip(8 * (puck_y - bar_y), -1, 1)
+
+
+@pytest.mark.parametrize("closed_loop", [False, True])
+def test_open_loop_rollout_matches_pse(closed_loop):
+    """open_loop_rollout plays the same games as PSE, for bar actions given up front or computed from the states"""
+    n, T = 200, 100
+    rng = np.random.default_rng(0)
+    puck_actions = 2 * rng.random((n, T)) - 1
+    # Puck actions pushing some pucks into the walls, and bar actions long enough to accelerate
+    puck_actions[::4] = np.sign(puck_actions[::4, :1])
+    bar_actions = np.repeat(2 * rng.random((n, T // 10)) - 1, 10, axis=1)
+    if closed_loop:
+        result = open_loop_rollout(
+            puck_actions, lambda t, state: chase(state[0][:, 1], state[1][:, 1]), return_trajectories=True
+        )
+    else:
+        result = open_loop_rollout(puck_actions, bar_actions, return_trajectories=True)
+
+    for i in range(n):
+        env = PSE()
+        states = [env.reset()]
+        reward, done = 0, False
+        while not done and len(states) <= T:
+            t = len(states) - 1
+            (_, puck_y), (_, bar_y), _, _ = states[-1]
+            bar_action = chase(puck_y, bar_y) if closed_loop else bar_actions[i, t]
+            state, reward, done, _ = env.step({"puck": puck_actions[i, t], "bar": bar_action})
+            states.append(state)
+
+        assert (result["outcome"][i], result["done_step"][i]) == (reward, len(states) - 1 if done else -1)
+        for t, (puck_pos, bar_pos, theta, v_ind) in enumerate(states):
+            assert tuple(result["puck_pos"][i, t]) == puck_pos
+            assert tuple(result["bar_pos"][i, t]) == bar_pos
+            assert (result["theta"][i, t], result["v_ind"][i, t]) == (theta, v_ind)
+        # Frozen after the end of the game
+        assert (result["puck_pos"][i, len(states) - 1 :] == result["puck_pos"][i, len(states) - 1]).all()
+
+
+def test_flat_obs_matches_flatten_observation():
+    """PSE(flat_obs=True) gives the observations of FlattenObservation(PSE()) across steps and resets"""
+    rng = np.random.default_rng(0)
+    flat, wrapped = PSE(flat_obs=True), FlattenObservation(PSE())
+    episodes, thetas = 0, set()
+    while episodes < 20:
+        np.testing.assert_array_equal(flat.reset(), wrapped.reset())
+        # Bar actions held for a few steps so that it accelerates, changing theta and v_ind
+        bar_action = 0.0
+        done = False
+        while not done:
+            if rng.random() < 0.2:
+                bar_action = rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0])
+            action = {"puck": 2 * rng.random() - 1, "bar": bar_action}
+            obs, reward, done, _ = flat.step(dict(action))
+            # The observation buffer is reused, compare it before the next step
+            expected, expected_reward, expected_done, _ = wrapped.step(dict(action))
+            np.testing.assert_array_equal(obs, expected)
+            assert obs.dtype == expected.dtype
+            assert (reward, done) == (expected_reward, expected_done)
+            thetas.add(flat.theta)
+        episodes += 1
+    assert max(thetas) > 0
+
+
+@pytest.mark.parametrize("scale", [1, 2, 3])
+def test_render_batch_matches_render(scale):
+    """BatchedPSE draws the frames PSE draws for every game, at every render_scale"""
+    n = 8
+    rng = np.random.default_rng(0)
+    envs = [PSE(render_scale=scale) for _ in range(n)]
+    for env in envs:
+        env.reset()
+    batched = BatchedPSE(num_envs=n, render_scale=scale)
+
+    for step in range(60):
+        actions = 2 * rng.random((n, 2)) - 1
+        batched.step(actions[:, 0], actions[:, 1])
+        for i, env in enumerate(envs):
+            env.step({"puck": actions[i, 0], "bar": actions[i, 1]})
+        if step % 20 == 0 or step == 59:
+            frames = batched.render()
+            assert frames.shape == (n, 480 // scale, 640 // scale, 3)
+            for frame, env in zip(frames, envs):
+                expected = env.render("rgb_array")
+                np.testing.assert_array_equal(frame, expected)
+                # The bar and the puck are drawn
+                for color in (BAR_COLOR, PUCK_COLOR):
+                    assert (expected == color).all(axis=-1).any()
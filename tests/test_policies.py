@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from tianshou.data import Batch
+
+from agents.lib_agents.trivial.greedy import GreedyPolicy
+
+
+def greedy_loop(obs_batch, agent):
+    """Greedy continuous actions computed one env at a time"""
+    act = np.empty(len(obs_batch))
+    for i, obs in enumerate(obs_batch):
+        act[i] = np.sign(obs[1] - obs[3])
+        if agent != "bar" and np.abs(obs[1] - obs[3]) < 0.005:
+            act[i] = np.sign(obs[1]) if np.abs(obs[i]) < 0.1 else -np.sign(obs[1])
+    return act
+
+
+@pytest.mark.parametrize("agent", ["puck", "bar"])
+def test_greedy_policy_matches_loop(agent):
+    """The vectorised greedy policy takes the actions of the per-env loop"""
+    rng = np.random.default_rng(0)
+    policy = GreedyPolicy(agent=agent, disc_k=None)
+    obs = rng.uniform(-1, 1, size=(40, 47))
+    # Half of the pucks level with their bar, so that the puck picks a side
+    obs[::2, 3] = obs[::2, 1] + rng.uniform(-0.004, 0.004, size=20)
+
+    act = policy(Batch(obs=obs, info=Batch(env_id=np.arange(40)))).act
+    np.testing.assert_array_equal(act, greedy_loop(obs, agent))
+
+
+def test_greedy_puck_breaks_ties():
+    """A puck level with its bar in the middle of the field moves up or down"""
+    policy = GreedyPolicy(agent="puck", disc_k=None)
+    obs = np.zeros((8, 47))
+    act = policy(Batch(obs=obs, info=Batch(env_id=np.arange(8)))).act
+    assert np.all(np.abs(act) == 1)
@@ -0,0 +1,91 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from communication.protocol import (
+    ACTION,
+    FRAMES,
+    RESULT,
+    START,
+    STATE,
+    TICK,
+    BinaryChannel,
+    decode,
+    encode_action,
+    encode_result,
+    encode_start,
+    encode_state,
+    encode_tick,
+)
+
+STATE_TUPLE = ((-0.7331110835075378, 0.123456789), (0.75, -0.987654321), 2, 5)
+
+
+def test_frames_round_trip():
+    assert decode(START, encode_start()) is True
+    assert decode(STATE, encode_state(STATE_TUPLE, False, 3, 2**40)) == (STATE_TUPLE, False, 3, 2**40)
+    assert decode(ACTION, encode_action(np.float32(0.1))) == float(np.float32(0.1))
+    result = (STATE_TUPLE, -1.0, True, {"steps": 89})
+    assert decode(RESULT, encode_result(result)) == result
+
+    # Spectators get the positions as float32
+    (puck_x, puck_y), (bar_x, bar_y), theta, v_ind = STATE_TUPLE
+    tick = decode(TICK, encode_tick(4, 89, STATE_TUPLE, -1, True))
+    assert tick == (
+        4,
+        89,
+        ((np.float32(puck_x), np.float32(puck_y)), (np.float32(bar_x), np.float32(bar_y)), theta, v_ind),
+        -1,
+        True,
+    )
+
+    # Frames have the size of their layout
+    frames = {
+        START: encode_start(),
+        STATE: encode_state(STATE_TUPLE, False),
+        ACTION: encode_action(0),
+        RESULT: encode_result(result),
+        TICK: encode_tick(0, 0, STATE_TUPLE, 0, False),
+    }
+    for kind, frame in frames.items():
+        assert len(frame) == FRAMES[kind].size
+
+
+def test_decode_rejects_other_kinds():
+    with pytest.raises(Exception):
+        decode(RESULT, encode_state(STATE_TUPLE, False) + bytes(FRAMES[RESULT].size))
+    with pytest.raises(Exception):
+        decode(ACTION, encode_start() + bytes(FRAMES[ACTION].size))
+
+
+def test_binary_channel_reads_split_and_coalesced_frames():
+    client, server = socket.socketpair()
+    channel = BinaryChannel(client)
+    result = (STATE_TUPLE, 1.0, True, {"steps": 12})
+    data = encode_state(STATE_TUPLE, False, 1, 7) + encode_result(result) + encode_result(result)
+
+    # Byte by byte while the channel reads, then two frames in a single send
+    first = FRAMES[STATE].size
+    pieces = [data[i : i + 1] for i in range(first)] + [data[first:]]
+
+    def send():
+        for piece in pieces:
+            server.send(piece)
+            time.sleep(0.001)
+
+    sender = threading.Thread(target=send)
+    sender.start()
+    assert channel.recv_state() == (STATE_TUPLE, False)
+    assert (channel.episode, channel.seed) == (1, 7)
+    assert channel.recv_result() == result
+    assert channel.recv_result() == result
+    sender.join()
+
+    # A frame cut short by the peer leaving
+    server.send(encode_action(0.5)[:5])
+    server.close()
+    assert channel.recv_action() is None
+    channel.close()
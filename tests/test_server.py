@@ -0,0 +1,239 @@
+import asyncio
+import os
+import socket
+import time
+
+import gym
+import numpy as np
+import pytest
+
+from communication import PSClient, PSServer, PSSpectator
+from communication.client import connect_socket
+from communication.protocol import PROTOCOL, AsyncBinaryChannel, handshake, local_path
+from utils import EpisodeLog
+
+
+async def play(agent_id, port, act, stall=None):
+    """Plays an episode as a binary client, sending act(step) and stalling for stall = (step, seconds) once"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(str.encode(handshake(agent_id)))
+    assert (await reader.read(2048)).decode() == "connected|" + PROTOCOL
+
+    channel = AsyncBinaryChannel(reader, writer)
+    channel.send_start()
+    state, done = await channel.recv_state()
+    step = 0
+    while not done:
+        if stall is not None and step == stall[0]:
+            await asyncio.sleep(stall[1])
+        channel.send_action(act(step))
+        state, reward, done, info = await channel.recv_result()
+        step += 1
+    channel.close()
+
+
+def test_stalled_client_catches_up(tmp_path):
+    log_path = str(tmp_path / "episodes.log")
+    server = PSServer(
+        gym.make("gym_env:penalty-shot-v0"),
+        headless=True,
+        tick=0.03,
+        deadline=0.015,
+        log_path=log_path,
+        local=False,
+    )
+
+    async def run():
+        listener = await asyncio.start_server(server.add_agent, "127.0.0.1", 0)
+        server.start_time = time.perf_counter()
+        port = listener.sockets[0].getsockname()[1]
+        await asyncio.gather(
+            play("P", port, lambda step: step / 100, stall=(5, 0.06)),
+            play("B", port, lambda step: 0.0),
+        )
+        # Let the match finish logging
+        while server.stats["finished"] + server.stats["aborted"] == 0:
+            await asyncio.sleep(0.01)
+        listener.close()
+
+    asyncio.run(run())
+
+    applied = EpisodeLog(log_path)[0]["actions"][:, 0]
+    steps = np.arange(len(applied))
+    fresh = applied == np.float32(steps / 100)
+    # The puck gets the held action while it is late, then the action sent for every step
+    assert not fresh[5]
+    for step in np.flatnonzero(~fresh):
+        assert applied[step] == applied[step - 1]
+    assert fresh[np.flatnonzero(~fresh).max() + 1 :].all()
+    assert np.count_nonzero(~fresh) <= 3
+
+    stats = server.matches[0]
+    assert stats["missed_deadlines"]["puck"] == np.count_nonzero(~fresh)
+    assert stats["stale_actions"]["puck"] == stats["missed_deadlines"]["puck"]
+
+
+def watch(port):
+    """Follows the next match as a spectator, returns its id and its ticks"""
+    spectator = PSSpectator(local=False)
+    spectator.connect("127.0.0.1", port)
+    ticks = list(spectator.ticks())
+    spectator.close()
+    return spectator.match_id, ticks
+
+
+def test_spectator_follows_match(tmp_path):
+    log_path = str(tmp_path / "episodes.log")
+    server = PSServer(
+        gym.make("gym_env:penalty-shot-v0"),
+        headless=True,
+        tick=0.002,
+        deadline=0.5,
+        log_path=log_path,
+        local=False,
+    )
+
+    async def run():
+        listener = await asyncio.start_server(server.add_agent, "127.0.0.1", 0)
+        server.start_time = time.perf_counter()
+        port = listener.sockets[0].getsockname()[1]
+        # Matches after the next one cannot be waited for
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(str.encode(handshake("S5")))
+        assert await asyncio.wait_for(reader.read(), 1) == b""
+        writer.close()
+        assert not server.broadcasts
+
+        watching = asyncio.ensure_future(asyncio.to_thread(watch, port))
+        while not server.broadcasts:
+            await asyncio.sleep(0.01)
+        await asyncio.gather(
+            play("P", port, lambda step: step / 100),
+            play("B", port, lambda step: 0.0),
+        )
+        result = await watching
+        listener.close()
+        return result
+
+    match_id, ticks = asyncio.run(run())
+    assert match_id == 0
+
+    log = EpisodeLog(log_path)
+    states = log.replay(0)
+    assert [(episode, step) for episode, step, _, _, _ in ticks] == [(0, step) for step in range(len(states))]
+    for (_, _, state, _, _), expected in zip(ticks, states):
+        (puck_pos, bar_pos, theta, v_ind) = expected
+        assert state == (tuple(np.float32(puck_pos)), tuple(np.float32(bar_pos)), theta, v_ind)
+    assert [done for _, _, _, _, done in ticks] == [False] * (len(ticks) - 1) + [True]
+    assert ticks[-1][3] == log[0]["outcome"]
+
+
+def session(agent_id, port, n):
+    """Plays n episodes on one connection as a PSClient, returns the (episode, seed, steps) of every episode"""
+    client = PSClient(agent_id, local=False)
+    episodes = []
+    for state, done in client.episodes(n, "127.0.0.1", port):
+        steps = 0
+        while not done:
+            state, reward, done, info = client.step(0.0)
+            steps += 1
+        episodes.append((client.episode, client.seed, steps))
+    return episodes
+
+
+def test_sessions():
+    server = PSServer(
+        gym.make("gym_env:penalty-shot-v0"),
+        headless=True,
+        tick=0.001,
+        deadline=0.5,
+        seed=100,
+        local=False,
+    )
+
+    async def run():
+        listener = await asyncio.start_server(server.add_agent, "127.0.0.1", 0)
+        server.start_time = time.perf_counter()
+        port = listener.sockets[0].getsockname()[1]
+        # The bar plays 3 episodes with the first puck, then goes back to the lobby to play 2 with the second one
+        bar = asyncio.ensure_future(asyncio.to_thread(session, "B", port, 5))
+        first_puck = await asyncio.to_thread(session, "P", port, 3)
+        second_puck = await asyncio.to_thread(session, "P", port, 2)
+        result = (first_puck, second_puck, await bar)
+        while server.stats["finished"] + server.stats["aborted"] < 2:
+            await asyncio.sleep(0.01)
+        listener.close()
+        return result
+
+    first_puck, second_puck, bar = asyncio.run(run())
+    # Episodes are numbered within their match, seeds across the server
+    assert [(episode, seed) for episode, seed, _ in first_puck] == [(0, 100), (1, 101), (2, 102)]
+    assert [(episode, seed) for episode, seed, _ in second_puck] == [(0, 103), (1, 104)]
+    assert bar == first_puck + second_puck
+    assert all(steps > 0 for _, _, steps in bar)
+
+    assert [(stats["episodes"], stats["status"]) for stats in server.matches.values()] == [
+        (3, "finished"),
+        (2, "finished"),
+    ]
+    assert (server.stats["episodes"], server.stats["finished"], server.stats["aborted"]) == (5, 2, 0)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+
+def play_local(agent_id, port):
+    """Plays an episode as a PSClient connecting through the Unix socket when it can, returns its socket family"""
+    client = PSClient(agent_id, local=None)
+    state, done = client.connect("127.0.0.1", port)
+    family = client.sock.family
+    while not done:
+        state, reward, done, info = client.step(0.0)
+    client.close()
+    return family
+
+
+def test_local_clients_use_unix_socket():
+    port = free_port()
+    server = PSServer(gym.make("gym_env:penalty-shot-v0"), headless=True, tick=0.001, deadline=0.5, port=port)
+
+    async def run():
+        serving = asyncio.ensure_future(server.run_server())
+        while not os.path.exists(local_path(port)):
+            await asyncio.sleep(0.01)
+        families = await asyncio.gather(
+            asyncio.to_thread(play_local, "P", port), asyncio.to_thread(play_local, "B", port)
+        )
+        serving.cancel()
+        try:
+            await serving
+        except asyncio.CancelledError:
+            pass
+        return families
+
+    assert asyncio.run(run()) == [socket.AF_UNIX, socket.AF_UNIX]
+    assert server.stats["finished"] == 1
+    # The socket is removed when the server stops
+    assert not os.path.exists(local_path(port))
+
+
+def test_stale_unix_socket_falls_back_to_tcp():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        # Socket file left by a server which did not exit cleanly
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(local_path(port))
+        stale.close()
+        try:
+            sock = connect_socket(socket.socket(), "127.0.0.1", port)
+            assert sock.family == socket.AF_INET
+            sock.close()
+            with pytest.raises(OSError):
+                connect_socket(socket.socket(), "127.0.0.1", port, local=True)
+        finally:
+            os.unlink(local_path(port))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from tianshou.data import Batch
+
+from agents.lib_agents.trivial.smurve import SmurvePolicy, smurve_actions
+from utils.smurve_bank import generate_bank
+
+
+@pytest.mark.parametrize("size, chunk_size", [(0, 1000), (10, 0)])
+def test_empty_bank_is_rejected(size, chunk_size, tmp_path):
+    with pytest.raises(Exception, match="empty"):
+        generate_bank(str(tmp_path / "bank.npy"), size, chunk_size=chunk_size)
+
+
+def test_bank_does_not_depend_on_workers_or_chunk_size(tmp_path):
+    """The same seed gives the same bank whatever the number of workers and the chunk size"""
+    try:
+        smurve_actions(1)
+    except ValueError as error:
+        pytest.skip("surgebinder cannot generate smurves here: {}".format(error))
+
+    banks = [
+        np.array(
+            generate_bank(
+                str(tmp_path / "bank_{}_{}.npy".format(workers, chunk_size)),
+                10,
+                seed=3,
+                workers=workers,
+                chunk_size=chunk_size,
+                verbose=False,
+            )
+        )
+        for workers, chunk_size in [(1, 1000), (1, 3), (2, 3), (2, 7)]
+    ]
+    for bank in banks[1:]:
+        np.testing.assert_array_equal(bank, banks[0])
+    assert not np.array_equal(
+        generate_bank(str(tmp_path / "other_seed.npy"), 10, seed=4, workers=1, verbose=False), banks[0]
+    )
+
+
+def test_policies_with_the_same_seed_sample_the_same_rows(tmp_path):
+    """Two policies with the same seed and bank sample the same trajectories, across resets"""
+    path = str(tmp_path / "bank.npy")
+    rows = np.random.default_rng(0).uniform(-1, 1, size=(50, 91)).astype(np.float32)
+    np.save(path, rows)
+
+    policies = [SmurvePolicy(seed=5, bank=path) for _ in range(2)]
+    env_id = np.arange(4)
+    for steps, done in [(0, [False] * 4), (1, [False] * 4), (0, [True, False, True, False]), (2, [False] * 4)]:
+        batch = Batch(obs=np.zeros((4, 47)), info=Batch(env_id=env_id, steps=np.full(4, steps)), done=done)
+        acts = [policy(batch).act for policy in policies]
+        np.testing.assert_array_equal(acts[0], acts[1])
+        # Every action comes from a row of the bank
+        assert all(np.isin(act, rows[:, steps]) for act in acts[0])
+    np.testing.assert_array_equal(policies[0].traj, policies[1].traj)
+    assert not np.array_equal(
+        SmurvePolicy(seed=6, bank=path).gen_trajs(4), SmurvePolicy(seed=5, bank=path).gen_trajs(4)
+    )
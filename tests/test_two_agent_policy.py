@@ -0,0 +1,111 @@
+from copy import deepcopy
+
+import numpy as np
+import pytest
+import torch
+from tianshou.data import Batch, Collector, VectorReplayBuffer
+
+from agents import TwoAgentPolicy
+from agents.lib_agents.trivial.greedy import GreedyPolicy
+from utils.config import env_params
+from utils.envs import MakeEnv
+from utils.train import make_policy
+from utils.vector_envs import make_vector_env
+
+
+def copy_partition(batch):
+    """Previous partition of TwoAgentPolicy, modifying the batch for the puck and deep copying it for the bar"""
+    puck_batch = batch
+    bar_batch = deepcopy(batch)
+    if not batch["act"].is_empty():
+        puck_batch["act"] = puck_batch["act"]["puck"]
+        bar_batch["act"] = bar_batch["act"]["bar"]
+    if isinstance(batch["rew"], np.ndarray) or (isinstance(batch["rew"], Batch) and not batch["rew"].is_empty()):
+        puck_batch["rew"] = -1.0 * puck_batch["rew"]
+    return (puck_batch, bar_batch)
+
+
+def make_batch(n=32, act=True, rew=True):
+    """Batch laid out like the batches sampled from the replay buffers of the trainers"""
+    rng = np.random.default_rng(0)
+    batch = Batch(
+        obs=rng.random((n, 47)),
+        obs_next=rng.random((n, 47)),
+        done=rng.random(n) < 0.1,
+        info=Batch(env_id=np.arange(n), steps=rng.integers(90, size=n)),
+        policy=Batch(puck=Batch(hidden=rng.random((n, 4))), bar=Batch(hidden=rng.random((n, 4)))),
+    )
+    # The collector forwards batches whose act and rew are still empty
+    batch.act = Batch(puck=rng.random((n, 1)), bar=rng.random((n, 1))) if act else Batch()
+    batch.rew = rng.random(n) * 2 - 1 if rew else Batch()
+    return batch
+
+
+def assert_batches_equal(batch, expected):
+    assert sorted(batch.keys()) == sorted(expected.keys())
+    for key, value in expected.items():
+        if isinstance(value, Batch):
+            assert_batches_equal(batch[key], value)
+        else:
+            np.testing.assert_array_equal(batch[key], value)
+
+
+@pytest.mark.parametrize("act, rew", [(True, True), (False, True), (True, False)])
+def test_partition_matches_copy_partition(act, rew):
+    """The views of the partition hold what the deep copies of the previous partition held"""
+    policy = TwoAgentPolicy((GreedyPolicy(agent="puck", disc_k=None), GreedyPolicy(agent="bar", disc_k=None)))
+    batch = make_batch(act=act, rew=rew)
+    original = deepcopy(batch)
+
+    puck_batch, bar_batch = policy._partition_batch(batch)
+    expected_puck, expected_bar = copy_partition(deepcopy(batch))
+    assert_batches_equal(puck_batch, expected_puck)
+    assert_batches_equal(bar_batch, expected_bar)
+    if rew:
+        np.testing.assert_array_equal(puck_batch.rew, -original.rew)
+        np.testing.assert_array_equal(bar_batch.rew, original.rew)
+
+    # The batch is left unchanged and its arrays are shared rather than copied
+    assert_batches_equal(batch, original)
+    for agent_batch in (puck_batch, bar_batch):
+        assert agent_batch.obs is batch.obs
+        assert agent_batch.info.steps is batch.info.steps
+
+    # Only the batches asked for are made
+    puck_batch, bar_batch = policy._partition_batch(batch, ("bar",))
+    assert puck_batch is None
+    assert_batches_equal(bar_batch, expected_bar)
+
+
+@pytest.mark.parametrize("frozen", ["puck", "bar"])
+def test_frozen_policy_is_not_updated(frozen):
+    """A frozen side keeps its parameters through updates and stays in eval mode, the other one learns"""
+    torch.manual_seed(0)
+    trained = "bar" if frozen == "puck" else "puck"
+    env = MakeEnv(**env_params["train"]).create_env()
+    policy = TwoAgentPolicy(
+        (make_policy("puck", "ppo"), make_policy("bar", "ppo")),
+        trainable=(frozen != "puck", frozen != "bar"),
+        observation_space=env.observation_space,
+        action_space=env.action_space,
+    )
+    envs = make_vector_env(4, "dummy", render_env_count=0, **env_params["train"])
+    buffer = VectorReplayBuffer(400, 4)
+    Collector(policy, envs, buffer, exploration_noise=True).collect(n_step=400)
+    envs.close()
+
+    before = {agent: deepcopy(policy._policy(agent).state_dict()) for agent in ("puck", "bar")}
+    policy.train()
+    assert not policy._policy(frozen).training
+    assert policy._policy(trained).training
+
+    stats = policy.update(0, buffer, batch_size=64, repeat=2)
+    assert stats and all(key.startswith(trained + "/") for key in stats)
+    after = {agent: policy._policy(agent).state_dict() for agent in ("puck", "bar")}
+    assert all(torch.equal(before[frozen][key], value) for key, value in after[frozen].items())
+    assert not all(torch.equal(before[trained][key], value) for key, value in after[trained].items())
+    assert not any(parameter.requires_grad for parameter in policy._policy(frozen).parameters())
+
+    # Nothing is learnt when both sides are frozen
+    policy.trainable[trained] = False
+    assert policy.update(0, buffer, batch_size=64, repeat=2) == {}
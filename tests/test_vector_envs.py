@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from tianshou.data import Batch
+
+from utils.config import env_params
+from utils.episode_log import EpisodeLog
+from utils.vector_envs import make_vector_env
+
+
+@pytest.mark.parametrize("modified_reward", [None, "exp", "puck_exp"])
+def test_torch_backend_matches_batched(modified_reward):
+    """The torch backend returns the same observations, rewards and dones as the batched backend"""
+    n, steps = 8, 200
+    rng = np.random.default_rng(0)
+    envs = {
+        backend: make_vector_env(n, backend, modified_reward=modified_reward)
+        for backend in ["batched", "torch"]
+    }
+    obs = {backend: env.reset() for backend, env in envs.items()}
+    np.testing.assert_array_equal(obs["batched"], obs["torch"])
+
+    for _ in range(steps):
+        # Step a random subset of the environments with the float32 actions of the policies
+        id = np.flatnonzero(rng.random(n) < 0.75)
+        act = (2 * rng.random((len(id), 2)) - 1).astype(np.float32)
+        action = {"puck": act[:, :1], "bar": act[:, 1:]}
+        results = {backend: env.step(action, id) for backend, env in envs.items()}
+        for expected, result in zip(results["batched"][:3], results["torch"][:3]):
+            np.testing.assert_array_equal(expected, result)
+        np.testing.assert_array_equal(results["batched"][3].steps, results["torch"][3].steps)
+        done = id[results["batched"][2]]
+        if len(done):
+            np.testing.assert_array_equal(envs["batched"].reset(done), envs["torch"].reset(done))
+
+    for env in envs.values():
+        env.close()
+
+
+@pytest.mark.parametrize("backend", ["batched", "torch"])
+def test_batched_backends_reject_unsupported_parameters(backend, tmp_path):
+    """The in-process backends take the environment parameters of the configs and reject the ones they cannot honour"""
+    for params in env_params.values():
+        env = make_vector_env(2, backend, **params)
+        assert env.reset().shape == (2,) + env.observation_space[0].shape
+        env.close()
+
+    with pytest.raises(ValueError, match="save_render_path"):
+        make_vector_env(2, backend, save_render_path=str(tmp_path / "render.mp4"))
+    with pytest.raises(ValueError, match="render"):
+        make_vector_env(2, backend, render_env_count=1)
+    with pytest.raises(ValueError, match="unknown"):
+        make_vector_env(2, backend, unknown=True)
+
+
+@pytest.mark.parametrize("backend", ["batched", "torch"])
+def test_batched_backends_log_episodes(backend, tmp_path):
+    """The in-process backends log the same episodes as EnvWrapper does"""
+    n, steps = 4, 300
+    rng = np.random.default_rng(0)
+    paths = {name: str(tmp_path / "{}.log".format(name)) for name in ["dummy", backend]}
+    envs = {
+        "dummy": make_vector_env(n, "dummy", render_env_count=0, episode_log_path=paths["dummy"]),
+        backend: make_vector_env(n, backend, episode_log_path=paths[backend]),
+    }
+    for env in envs.values():
+        env.seed(0)
+        env.reset()
+
+    for _ in range(steps):
+        id = np.flatnonzero(rng.random(n) < 0.75)
+        act = (2 * rng.random((len(id), 2)) - 1).astype(np.float32)
+        for env in envs.values():
+            done = id[env.step(Batch(puck=act[:, :1], bar=act[:, 1:]), id)[2]]
+            if len(done):
+                env.reset(done)
+    for env in envs.values():
+        env.close()
+
+    logs = {name: EpisodeLog(path) for name, path in paths.items()}
+    assert len(logs[backend]) == len(logs["dummy"]) > 0
+    for i in range(len(logs["dummy"])):
+        expected, episode = logs["dummy"][i], logs[backend][i]
+        np.testing.assert_array_equal(episode.pop("actions"), expected.pop("actions"))
+        assert episode == expected
+    logs[backend].replay(len(logs[backend]) - 1)
+
+
+def test_shmem_backend_matches_dummy():
+    """The shmem backend returns the same observations, rewards, dones and steps as the dummy backend"""
+    n, steps = 6, 300
+    rng = np.random.default_rng(0)
+    envs = {
+        backend: make_vector_env(n, backend, num_workers=3, render_env_count=0, **env_params["train"])
+        for backend in ["dummy", "shmem"]
+    }
+    obs = {backend: env.reset() for backend, env in envs.items()}
+    np.testing.assert_array_equal(obs["dummy"], obs["shmem"])
+
+    for _ in range(steps):
+        id = np.flatnonzero(rng.random(n) < 0.75)
+        act = (2 * rng.random((len(id), 2)) - 1).astype(np.float32)
+        action = Batch(puck=act[:, :1], bar=act[:, 1:])
+        results = {backend: env.step(action, id) for backend, env in envs.items()}
+        for expected, result in zip(results["dummy"][:3], results["shmem"][:3]):
+            np.testing.assert_array_equal(expected, result)
+        np.testing.assert_array_equal(
+            [info["steps"] for info in results["dummy"][3]], results["shmem"][3].steps
+        )
+        done = id[results["dummy"][2]]
+        if len(done):
+            np.testing.assert_array_equal(envs["dummy"].reset(done), envs["shmem"].reset(done))
+
+    for env in envs.values():
+        env.close()
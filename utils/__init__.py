@@ -1,3 +1,6 @@
 from .train import train, get_args
 
 from .envs import make_envs, MakeEnv, EnvWrapper
+from .vector_envs import make_vector_env, BatchedVectorEnv, TorchVectorEnv
+from .episode_log import EpisodeLog, EpisodeWriter
+from .smurve_bank import generate_bank
@@ -3,10 +3,12 @@ env_params = {
         "discrete": {},
         "modified_reward": "exp",
         "render_skip_ep": 10,
+        "flat_obs": True,
     },
     "test": {
         "discrete": {},
         "modified_reward": None,
         "render_skip_ep": 10,
+        "flat_obs": True,
     },
 }
@@ -13,7 +13,7 @@ puck_params = {
         "agent": "puck",
         "disc_k": None,
     },
-    "smurve": {},
+    "smurve": {"bank": None},  # Path of a bank made by utils/smurve_bank.py to sample from
     "ppo": {
         "init_params": {
             "state_shape": env.observation_space.shape,
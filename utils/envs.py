@@ -3,10 +3,9 @@ from gym.spaces import Tuple, Discrete, Dict
 from gym.spaces.box import Box
 from gym.spaces.utils import flatten_space, unflatten
 from gym.wrappers import FlattenObservation
-import matplotlib.pyplot as plt
-from matplotlib import animation
-import os
 import numpy as np
+from .recorder import FrameRecorder
+from .episode_log import EpisodeWriter
 
 # https://github.com/thu-ml/tianshou/issues/192 to enable rendering wrapper
 class EnvWrapper(gym.Wrapper):
@@ -23,12 +22,18 @@ class EnvWrapper(gym.Wrapper):
         render_skip_ep: int = 100,
         discrete: dict = {},
         modified_reward: str = "exp",
-        save_render_path: str = None
+        save_render_path: str = None,
+        episode_log_path: str = None,
     ):
-        super().__init__(FlattenObservation(env))
+        # Environments created with flat_obs already give flat observations
+        if not isinstance(env.observation_space, Box):
+            env = FlattenObservation(env)
+        super().__init__(env)
         self.render = render
         self.save_render_path = save_render_path
-        self.frames = []
+        self.recorder = None  # Streams the frames to save_render_path, created with the first frame
+        # Appends the seed, config, actions and outcome of every finished episode to episode_log_path
+        self.episode_log = EpisodeWriter(episode_log_path) if episode_log_path else None
         if render:
             self.render_count = 0
             self.render_skip_ep = render_skip_ep
@@ -63,8 +68,14 @@ class EnvWrapper(gym.Wrapper):
             if agent in self.discrete.keys():
                 action[agent] = unflatten(Discrete(self.discrete[agent]), action[agent])
 
+        if self.episode_log is not None:
+            action = self.episode_log.record(action)
+
         obs, rew, done, info = self.env.step(action)
 
+        if done and self.episode_log is not None:
+            self.episode_log.end(rew)
+
         if self.render:
             # Enable rendering
             if not self.save_render_path:
@@ -79,7 +90,9 @@ class EnvWrapper(gym.Wrapper):
                     self.render_count %= self.render_skip_ep
             else:
                 if not done:
-                    self.frames.append(self.env.render(mode="rgb_array"))
+                    if self.recorder is None:
+                        self.recorder = FrameRecorder(self.save_render_path)
+                    self.recorder.add(self.env.render(mode="rgb_array"))
                 else:
                     self.env.close()
 
@@ -103,49 +116,34 @@ class EnvWrapper(gym.Wrapper):
             raise Exception("Unidentified reward type")
 
         return obs, rew, done, info
-    
-    def save_render(self):
-        plt.figure(
-            figsize=(self.frames[0].shape[1] / 150.0, self.frames[0].shape[0] / 150.0), dpi=150
-        )
 
-        plt.axis("off")
-        patch = plt.imshow(self.frames[0])
-
-        def animate(i):
-            patch.set_data(self.frames[i])
-
-        anim = animation.FuncAnimation(
-            plt.gcf(), animate, frames=len(self.frames), interval=1
-        )
-
-        # check if folder exists
-        index = self.save_render_path.rfind("/")
-        folder_name = self.save_render_path[: index + 1]
-        if not os.path.isdir(folder_name):
-            print("Made folder {}".format(folder_name))
-            os.mkdir(folder_name)
-        import matplotlib as mpl
-        mpl.rcParams['animation.ffmpeg_path'] = r'D:\\Downloads1.9\\ffmpeg-2021-11-15-git-9e8cdb24cd-essentials_build\\bin\\ffmpeg.exe'
-        anim.save(self.save_render_path, writer='ffmpeg', fps=60)
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        if self.episode_log is not None:
+            self.episode_log.begin(self.env.unwrapped)
+        return obs
 
     def close(self):
         """Close the environment"""
-        if self.render:
-            if self.save_render_path:
-                self.save_render()
-                self.frames = []
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.episode_log is not None:
+            self.episode_log.close()
         self.env.close()
 
 
 class MakeEnv:
     """Creates enviroment with gym make"""
 
-    def __init__(self, **kwargs):
+    def __init__(self, flat_obs: bool = False, **kwargs):
+        self.flat_obs = flat_obs
         self.args = kwargs
 
     def create_env(self):
-        return EnvWrapper(gym.make("gym_env:penalty-shot-v0"), **self.args)
+        return EnvWrapper(
+            gym.make("gym_env:penalty-shot-v0", flat_obs=self.flat_obs), **self.args
+        )
 
 
 def make_envs(num_envs: int = 1, render_env_count: int = 1, **kwargs):
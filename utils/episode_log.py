@@ -0,0 +1,235 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# Header of every episode record: magic, version, seed, config length, number of steps, outcome
+RECORD_MAGIC = b"PSEP"
+RECORD_VERSION = 1
+RECORD_HEADER = struct.Struct("<4sBqIIb")
+
+
+def _encode_episode(seed, config, actions, outcome):
+    """Packs an episode into one record: header, JSON config and (steps, 2) float32 actions"""
+    config = json.dumps(config, sort_keys=True).encode()
+    actions = np.ascontiguousarray(actions, dtype="<f4")
+    header = RECORD_HEADER.pack(
+        RECORD_MAGIC, RECORD_VERSION, seed, len(config), len(actions), outcome
+    )
+    return header + config + actions.tobytes()
+
+
+class EpisodeWriter:
+    """Appends the episodes played in an environment to a binary episode log
+
+    Every episode is stored as one record holding the seed and configuration of the environment, the puck and bar
+    actions of every step as float32 and the outcome. Records are written with a single append, so several
+    processes (e.g. subprocess vector environments) can log to the same file. Use ``EpisodeLog`` to read and replay
+    them.
+    """
+
+    def __init__(self, path):
+        """Episode log writer
+
+        Args:
+            path (str): Path of the log file, created if missing and appended to otherwise
+        """
+        folder_name = os.path.dirname(path)
+        if folder_name and not os.path.isdir(folder_name):
+            print("Made folder {}".format(folder_name))
+            os.makedirs(folder_name, exist_ok=True)
+
+        self.path = path
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self.fd = os.open(path, flags, 0o644)
+        self.seed = None
+        self.config = None
+        self.actions = []
+
+    def begin(self, env, seed=None):
+        """Starts a new episode, dropping the one in progress if it did not finish
+
+        Args:
+            env (PSE): Environment which was just reset
+            seed (int, optional): Seed of the episode. Defaults to None (the main seed of env).
+        """
+        self.seed = int(env.mainSeed if seed is None else seed)
+        self.config = env.config
+        self.actions = []
+
+    def record(self, action):
+        """Records the actions of a step
+
+        The actions are rounded to float32 as they are stored, the environment must be stepped with the returned
+        actions for replays to reproduce the episode exactly.
+
+        Args:
+            action (Dict[str, float]): Actions of the puck and the bar
+
+        Returns:
+            Dict[str, float]: Actions of the puck and the bar, rounded to float32
+        """
+        action = {
+            agent: float(np.asarray(action[agent], dtype=np.float32).reshape(-1)[0])
+            for agent in ("puck", "bar")
+        }
+        self.actions.append((action["puck"], action["bar"]))
+        return action
+
+    def end(self, outcome):
+        """Writes the episode in progress to the log
+
+        Args:
+            outcome (int): Reward of the bar given by the environment at the last step
+        """
+        if self.config is None:
+            return
+        record = _encode_episode(
+            self.seed,
+            self.config,
+            np.array(self.actions, dtype=np.float32).reshape(-1, 2),
+            int(outcome),
+        )
+        os.write(self.fd, record)
+        self.config = None
+        self.actions = []
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class EpisodeLog:
+    """Reads, replays and renders the episodes of a binary episode log
+
+    The offsets of the records are kept in an index file next to the log (``<path>.idx``), which is extended with
+    the records appended since it was last written.
+    """
+
+    def __init__(self, path):
+        """Episode log reader
+
+        Args:
+            path (str): Path of the log file
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.offsets = self._load_index()
+
+    def _record_end(self, f, offset, size):
+        """Returns the offset after the record at offset, None if there is no complete record there"""
+        if offset + RECORD_HEADER.size > size:
+            return None
+        f.seek(offset)
+        magic, version, _, config_len, steps, _ = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+        if magic != RECORD_MAGIC or version != RECORD_VERSION:
+            raise Exception("Corrupted episode log {} at offset {}".format(self.path, offset))
+        end = offset + RECORD_HEADER.size + config_len + 8 * steps
+        return end if end <= size else None
+
+    def _load_index(self):
+        offsets = []
+        if os.path.isfile(self.index_path):
+            offsets = np.fromfile(self.index_path, dtype="<u8").tolist()
+
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            offset = 0
+            if offsets:
+                try:
+                    offset = self._record_end(f, offsets[-1], size)
+                except Exception:
+                    offset = None
+                if offset is None:
+                    # The log does not match the index, e.g. it was rewritten
+                    offsets, offset = [], 0
+
+            indexed = len(offsets)
+            while True:
+                end = self._record_end(f, offset, size)
+                if end is None:
+                    break
+                offsets.append(offset)
+                offset = end
+
+        if len(offsets) != indexed or not os.path.isfile(self.index_path):
+            np.array(offsets, dtype="<u8").tofile(self.index_path)
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """Reads an episode
+
+        Args:
+            index (int): Index of the episode in the log
+
+        Returns:
+            dict: ``seed``, ``config`` (parameters of PSE), ``actions`` (steps, 2) float32 puck and bar actions and
+                ``outcome`` (reward of the bar at the last step)
+        """
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[index])
+            _, _, seed, config_len, steps, outcome = RECORD_HEADER.unpack(
+                f.read(RECORD_HEADER.size)
+            )
+            config = {
+                key: tuple(value) if isinstance(value, list) else value
+                for key, value in json.loads(f.read(config_len).decode()).items()
+            }
+            actions = np.frombuffer(f.read(8 * steps), dtype="<f4").reshape(steps, 2)
+        return {"seed": seed, "config": config, "actions": actions, "outcome": outcome}
+
+    def replay(self, index):
+        """Reconstructs the states of an episode by stepping PSE with the logged actions
+
+        Args:
+            index (int): Index of the episode in the log
+
+        Raises:
+            Exception: If the replay does not end with the logged outcome
+
+        Returns:
+            List[Tuple]: States of the episode, from the initial state to the last one
+        """
+        from gym_env.envs import PSE
+
+        episode = self[index]
+        env = PSE(main_seed=episode["seed"], **episode["config"])
+        states = [env.reset()]
+        reward, done = 0, False
+        for puck_action, bar_action in episode["actions"]:
+            state, reward, done, _ = env.step(
+                {"puck": float(puck_action), "bar": float(bar_action)}
+            )
+            states.append(state)
+
+        if not done or reward != episode["outcome"]:
+            raise Exception("Replay of episode {} does not match the log".format(index))
+        env.close()
+        return states
+
+    def render(self, index, path=None, scale=1):
+        """Renders an episode from its replay
+
+        Args:
+            index (int): Index of the episode in the log
+            path (str, optional): Path to save the recording to (see ``FrameRecorder``). Defaults to None.
+            scale (int, optional): Downscaling factor of the frames. Defaults to 1.
+
+        Returns:
+            np.ndarray: RGB frames of shape (steps + 1, height, width, 3) if path is None
+        """
+        from gym_env.envs import PSE, Rasterizer
+        from .recorder import render_states
+
+        states = self.replay(index)
+        config = self[index]["config"]
+        if path is None:
+            rasterizer = Rasterizer(PSE(**config), scale)
+            return np.stack([rasterizer.render(state).copy() for state in states])
+
+        render_states(states, config, path, scale)
@@ -0,0 +1,307 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import zipfile
+from queue import Empty, Queue
+
+import numpy as np
+
+
+class GifEncoder:
+    """Writes frames to a looping GIF one at a time with Pillow
+
+    All the frames are quantised to the palette of the first frame, which holds every color drawn by PSE.
+    """
+
+    def __init__(self, path, fps=60):
+        """GIF encoder
+
+        Args:
+            path (str): Path of the GIF file
+            fps (int, optional): Frames per second. Defaults to 60.
+        """
+        from PIL import Image
+
+        self.image = Image
+        self.file = open(path, "wb")
+        self.duration = int(round(1000 / fps))
+        self.palette = None
+
+    def write(self, frame):
+        from PIL import GifImagePlugin
+
+        frame = self.image.fromarray(frame)
+        if self.palette is None:
+            self.palette = frame.quantize(dither=self.image.Dither.NONE)
+            header, _ = GifImagePlugin.getheader(self.palette, info={"loop": 0})
+            self.file.write(b"".join(header))
+        frame = frame.quantize(palette=self.palette, dither=self.image.Dither.NONE)
+        for data in GifImagePlugin.getdata(frame, duration=self.duration):
+            self.file.write(data)
+
+    def close(self):
+        self.file.write(b";")  # GIF trailer
+        self.file.close()
+
+
+class NpzEncoder:
+    """Writes raw frames to an npz archive, one ``frame_<index>`` array per frame
+
+    The frames can be read back with ``np.load(path)`` without loading them all at once.
+    """
+
+    def __init__(self, path, fps=60):
+        """Npz encoder
+
+        Args:
+            path (str): Path of the npz file
+            fps (int, optional): Frames per second, stored in the ``fps`` array. Defaults to 60.
+        """
+        self.archive = zipfile.ZipFile(path, "w", allowZip64=True)
+        self.count = 0
+        self._write_array("fps", np.asarray(fps))
+
+    def _write_array(self, name, array):
+        with self.archive.open(name + ".npy", "w", force_zip64=True) as f:
+            np.lib.format.write_array(f, array, allow_pickle=False)
+
+    def write(self, frame):
+        self._write_array("frame_{:06d}".format(self.count), frame)
+        self.count += 1
+
+    def close(self):
+        self.archive.close()
+
+
+class FfmpegEncoder:
+    """Pipes raw RGB frames into an ffmpeg process, which picks the video codec from the file extension"""
+
+    def __init__(self, path, fps=60, ffmpeg=None):
+        """Ffmpeg encoder
+
+        Args:
+            path (str): Path of the video file
+            fps (int, optional): Frames per second. Defaults to 60.
+            ffmpeg (str, optional): Path of the ffmpeg executable. Defaults to the one found by ``find_ffmpeg``.
+
+        Raises:
+            Exception: If ffmpeg is not found
+        """
+        self.path = path
+        self.fps = fps
+        self.ffmpeg = ffmpeg or find_ffmpeg()
+        if self.ffmpeg is None:
+            raise Exception("ffmpeg not found, set FFMPEG_PATH or add it to PATH")
+        self.process = None
+
+    def write(self, frame):
+        if self.process is None:
+            # The frame size is only known once the first frame arrives
+            height, width, _ = frame.shape
+            self.process = subprocess.Popen(
+                [
+                    self.ffmpeg,
+                    "-y",
+                    "-loglevel", "error",
+                    "-f", "rawvideo",
+                    "-pix_fmt", "rgb24",
+                    "-s", "{}x{}".format(width, height),
+                    "-r", str(self.fps),
+                    "-i", "-",
+                    "-pix_fmt", "yuv420p",
+                    self.path,
+                ],
+                stdin=subprocess.PIPE,
+            )
+        self.process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+def find_ffmpeg():
+    """Finds the ffmpeg executable from the FFMPEG_PATH environment variable or PATH
+
+    Returns:
+        str: Path of ffmpeg, None if it is not found
+    """
+    return shutil.which(os.environ.get("FFMPEG_PATH", "ffmpeg"))
+
+
+def make_encoder(path, fps=60):
+    """Creates the encoder matching the extension of path
+
+    ``.gif`` is written with Pillow and ``.npz`` as raw frames. Other extensions (e.g. ``.mp4``) are encoded by
+    ffmpeg, and fall back to a GIF next to path when ffmpeg is not available.
+
+    Args:
+        path (str): Path of the recording
+        fps (int, optional): Frames per second. Defaults to 60.
+
+    Returns:
+        GifEncoder | NpzEncoder | FfmpegEncoder: Encoder writing to path
+    """
+    root, ext = os.path.splitext(path)
+    ext = ext.lower()
+    if ext == ".gif":
+        return GifEncoder(path, fps)
+    if ext == ".npz":
+        return NpzEncoder(path, fps)
+    if find_ffmpeg() is None:
+        print("ffmpeg not found, saving {}.gif instead of {}".format(root, path))
+        return GifEncoder(root + ".gif", fps)
+    return FfmpegEncoder(path, fps)
+
+
+class FrameRecorder:
+    """Streams frames to an encoder running on a background thread
+
+    Frames are handed over through a bounded queue, so at most ``max_queue`` frames are held in memory however long
+    the recording is. ``add`` only waits if the encoder falls ``max_queue`` frames behind.
+    """
+
+    def __init__(self, path, fps=60, max_queue=32):
+        """Frame recorder
+
+        Args:
+            path (str): Path of the recording, the encoder is picked from its extension (see ``make_encoder``)
+            fps (int, optional): Frames per second. Defaults to 60.
+            max_queue (int, optional): Maximum number of frames waiting to be encoded. Defaults to 32.
+        """
+        # check if folder exists
+        folder_name = os.path.dirname(path)
+        if folder_name and not os.path.isdir(folder_name):
+            print("Made folder {}".format(folder_name))
+            os.makedirs(folder_name)
+
+        self.path = path
+        self.encoder = make_encoder(path, fps)
+        self.queue = Queue(maxsize=max_queue)
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._encode, daemon=True)
+        self.thread.start()
+
+    def _encode(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is None:
+                try:
+                    self.encoder.write(frame)
+                except Exception as e:
+                    # Keep draining the queue so that add never blocks, the error is raised by close
+                    self.error = e
+
+    def add(self, frame):
+        """Queues a frame for encoding, the frame must not be modified afterwards
+
+        Args:
+            frame (np.ndarray): RGB frame of shape (height, width, 3)
+        """
+        if frame is not None:
+            self.queue.put(frame)
+
+    def close(self):
+        """Waits for the queued frames to be encoded and finalises the recording
+
+        Raises:
+            Exception: If encoding failed
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        self.encoder.close()
+        if self.error is not None:
+            raise self.error
+
+
+def render_states(states, config, path, scale=1, fps=60):
+    """Renders states of the penalty shot environment into a recording
+
+    Args:
+        states (List[Tuple]): States of PSE, ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind)
+        config (dict): Config of the environment the states were played in (see ``PSE.config``)
+        path (str): Path of the recording (see ``FrameRecorder``)
+        scale (int, optional): Downscaling factor of the frames. Defaults to 1.
+        fps (int, optional): Frames per second. Defaults to 60.
+    """
+    from gym_env.envs import PSE, Rasterizer
+
+    rasterizer = Rasterizer(PSE(**config), scale)
+    recorder = FrameRecorder(path, fps)
+    for state in states:
+        recorder.add(rasterizer.render(state).copy())
+    recorder.close()
+
+
+def _render_jobs(jobs):
+    parent = multiprocessing.parent_process()
+    while True:
+        try:
+            job = jobs.get(timeout=1)
+        except Empty:
+            # Stop with the parent if it was killed before closing the worker
+            if not parent.is_alive():
+                break
+            continue
+        if job is None:
+            break
+        try:
+            render_states(**job)
+            print("saved run {}".format(job["path"]))
+        except Exception as e:
+            # A failed recording must not stop the ones queued after it
+            print("failed to save run {}: {}".format(job["path"], e))
+
+
+class RenderWorker:
+    """Renders and encodes recordings of state logs in a separate process
+
+    ``submit`` only queues the states, so the caller (e.g. the game loop of a server) never waits for rendering or
+    encoding. The process is started with the first job.
+    """
+
+    def __init__(self, scale=1, fps=60):
+        """Render worker
+
+        Args:
+            scale (int, optional): Downscaling factor of the frames. Defaults to 1.
+            fps (int, optional): Frames per second. Defaults to 60.
+        """
+        self.scale = scale
+        self.fps = fps
+        self.jobs = None
+        self.process = None
+
+    def submit(self, states, config, path):
+        """Queues the rendering of states into a recording
+
+        Args:
+            states (List[Tuple]): States of PSE, ((puck_x, puck_y), (bar_x, bar_y), theta, v_ind)
+            config (dict): Config of the environment the states were played in (see ``PSE.config``)
+            path (str): Path of the recording (see ``FrameRecorder``)
+        """
+        if self.process is None:
+            # Spawned rather than forked, the caller may be running threads (e.g. an event loop and its executors)
+            context = multiprocessing.get_context("spawn")
+            self.jobs = context.Queue()
+            self.process = context.Process(target=_render_jobs, args=(self.jobs,), daemon=True)
+            self.process.start()
+        self.jobs.put({"states": states, "config": config, "path": path, "scale": self.scale, "fps": self.fps})
+
+    def close(self):
+        """Waits for the queued recordings to be saved and stops the process"""
+        if self.process is None:
+            return
+        self.jobs.put(None)
+        self.process.join()
+        self.jobs.close()
+        self.process = None
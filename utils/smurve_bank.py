@@ -0,0 +1,83 @@
+import argparse
+import contextlib
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+
+from agents.lib_agents.trivial.smurve import smurve_actions
+
+
+def _generate_chunk(task):
+    """Generates the rows of a chunk, every row seeded by the seed of the bank and the index of the row"""
+    (seed, chunk, start, size) = task
+    rows = []
+    # surgebinder reports its progress on stdout
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for row in range(start, start + size):
+            row_seed = int(np.random.SeedSequence([seed, row]).generate_state(1)[0])
+            random.seed(row_seed)
+            np.random.seed(row_seed)
+            rows.append(smurve_actions(1)[0])
+    return chunk, np.array(rows, dtype=np.float32)
+
+
+def generate_bank(path, size, seed=0, workers=None, chunk_size=1000, verbose=True):
+    """Generates a bank of smurve trajectories for SmurvePolicy(bank=path)
+
+    The bank is a memory-mapped float32 .npy file of shape (size, 91) holding the actions of a trajectory per row.
+    Rows are generated in chunks of chunk_size, every row seeded by the seed and its index, so a bank only depends on
+    its seed and size and not on the number of workers or the chunk size.
+
+    Args:
+        path (str): Path of the bank
+        size (int): Number of trajectories
+        seed (int, optional): Seed of the bank. Defaults to 0.
+        workers (int, optional): Number of processes generating chunks. Defaults to the number of cores.
+        chunk_size (int, optional): Number of trajectories generated at once. Defaults to 1000.
+        verbose (bool, optional): Whether the progress is printed, every tenth of the bank. Defaults to True.
+
+    Raises:
+        Exception: If the bank or its chunks are empty
+
+    Returns:
+        np.memmap: The bank
+    """
+    if size <= 0 or chunk_size <= 0:
+        raise Exception("Bank of {} trajectories in chunks of {} is empty".format(size, chunk_size))
+
+    folder_name = os.path.dirname(path)
+    if folder_name and not os.path.isdir(folder_name):
+        print("Made folder {}".format(folder_name))
+        os.makedirs(folder_name)
+
+    tasks = [
+        (seed, chunk, start, min(chunk_size, size - start))
+        for chunk, start in enumerate(range(0, size, chunk_size))
+    ]
+    bank = None
+    with Pool(workers) as pool:
+        for done, (chunk, actions) in enumerate(pool.imap_unordered(_generate_chunk, tasks)):
+            if bank is None:
+                bank = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(size, actions.shape[1]))
+            bank[chunk * chunk_size : chunk * chunk_size + len(actions)] = actions
+            if verbose and (done + 1) * 10 // len(tasks) > done * 10 // len(tasks):
+                print("{}/{} trajectories".format(min((done + 1) * chunk_size, size), size))
+    bank.flush()
+    return bank
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--path", type=str, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--quiet", action="store_true", help="do not print the progress")
+    args = parser.parse_args()
+
+    path = args.path or "smurve_banks/smurve_{}.npy".format(args.seed)
+    generate_bank(path, args.size, args.seed, args.workers, args.chunk_size, verbose=not args.quiet)
+    print("bank of {} trajectories saved to {}".format(args.size, path))
@@ -3,13 +3,13 @@ import numpy as np
 import tianshou as ts
 import pprint
 from tianshou.utils import WandbLogger
-from tianshou.env import SubprocVectorEnv
 from tianshou.data import Collector, VectorReplayBuffer
 from tianshou.trainer import offpolicy_trainer, onpolicy_trainer
 from torch.serialization import save
 from agents import TwoAgentPolicy
 from agents.lib_agents import *
 from utils.envs import make_envs, MakeEnv
+from utils.vector_envs import make_vector_env, vector_env_mapping
 from utils.config import puck_params, bar_params, env_params
 import argparse
 import os
@@ -129,6 +129,13 @@ def get_args():
     parser.add_argument("--batch-size", type=int, default=64)
     parser.add_argument("--training-num", type=int, default=10)
     parser.add_argument("--test-num", type=int, default=100)
+    parser.add_argument(
+        "--vector-env",
+        type=str,
+        default="subproc",
+        choices=list(vector_env_mapping.keys()),
+    )
+    parser.add_argument("--vector-env-workers", type=int, default=None)
     parser.add_argument("--logdir", type=str, default="log")
     parser.add_argument("--render", type=float, default=0.0)
     parser.add_argument(
@@ -145,50 +152,38 @@ def get_args():
     parser.add_argument("--save", action="store_true", default=False)
     parser.add_argument("--load-puck-id", type=str, default=None)
     parser.add_argument("--load-bar-id", type=str, default=None)
+    parser.add_argument("--freeze-puck", action="store_true", default=False)
+    parser.add_argument("--freeze-bar", action="store_true", default=False)
+    parser.add_argument("--concurrent-learn", action="store_true", default=False)
     parser.add_argument("--run-id", type=str, default=None)
 
     return parser.parse_args()
 
 
-def init_and_call_policy():
-    """Initialises and calls policies for the agent puck and bar
+def make_policy(agent, algo):
+    """Initialises and calls the policy of an agent with its parameters in utils.config
+
+    Args:
+        agent (str): "puck" or "bar"
+        algo (str): Algorithm of the policy, a key of algo_mapping
 
     Returns:
-        Tuple[Policy, Policy]: Returns the policies for puck and bar
+        Policy: Policy of the agent
     """
-    if "call_params" in puck_params[args.puck]:
-        puck_params_init = (
-            puck_params[args.puck]["init_params"]
-            if "init_params" in puck_params[args.puck]
-            else {}
-        )
-        puck_params_call = (
-            puck_params[args.puck]["call_params"]
-            if "call_params" in puck_params[args.puck]
-            else {}
-        )
-
-        policy_puck = algo_mapping[args.puck](**puck_params_init)(**puck_params_call)
-    else:
-        policy_puck = algo_mapping[args.puck](**puck_params[args.puck])
+    params = (puck_params if agent == "puck" else bar_params)[algo]
+    if "call_params" in params:
+        params_init = params["init_params"] if "init_params" in params else {}
+        return algo_mapping[algo](**params_init)(**params["call_params"])
+    return algo_mapping[algo](**params)
 
-    if "call_params" in bar_params[args.bar]:
-        bar_params_init = (
-            bar_params[args.bar]["init_params"]
-            if "init_params" in bar_params[args.bar]
-            else {}
-        )
-        bar_params_call = (
-            bar_params[args.bar]["call_params"]
-            if "call_params" in bar_params[args.bar]
-            else {}
-        )
 
-        policy_bar = algo_mapping[args.bar](**bar_params_init)(**bar_params_call)
-    else:
-        policy_bar = algo_mapping[args.bar](**bar_params[args.bar])
+def init_and_call_policy():
+    """Initialises and calls policies for the agent puck and bar
 
-    return (policy_puck, policy_bar)
+    Returns:
+        Tuple[Policy, Policy]: Returns the policies for puck and bar
+    """
+    return (make_policy("puck", args.puck), make_policy("bar", args.bar))
 
 
 def load_policy(policy_puck, policy_bar):
@@ -253,10 +248,18 @@ def train():
     args.action_shape = env.action_space.shape
 
     # Create training and testing environments
-    (train_envs_obj, train_envs) = make_envs(args.training_num, **env_params["train"])
-    train_envs = SubprocVectorEnv(train_envs)
-    (test_envs_obj, test_envs) = make_envs(args.test_num, **env_params["test"])
-    test_envs = SubprocVectorEnv(test_envs)
+    train_envs = make_vector_env(
+        args.training_num,
+        args.vector_env,
+        num_workers=args.vector_env_workers,
+        **env_params["train"],
+    )
+    test_envs = make_vector_env(
+        args.test_num,
+        args.vector_env,
+        num_workers=args.vector_env_workers,
+        **env_params["test"],
+    )
     print(
         f"Created {args.training_num} training environments and {args.test_num} test environments.."
     )
@@ -274,6 +277,8 @@ def train():
     # Create Two Agent Policy
     policy = TwoAgentPolicy(
         (policy_puck, policy_bar),
+        trainable=(not args.freeze_puck, not args.freeze_bar),
+        concurrent_learn=args.concurrent_learn,
         observation_space=env.observation_space,
         action_space=env.action_space,
     )
@@ -309,11 +314,15 @@ def train():
     if not args.save:
         save_checkpoint_fn = None
 
+    # The trainer only has to suit the policies being trained
+    puck_trainer = None if args.freeze_puck else puck_params[args.puck].get("trainer")
+    bar_trainer = None if args.freeze_bar else bar_params[args.bar].get("trainer")
+
     print("Starting training and testing model ..")
     if (
         args.trainer == "off"
-        and puck_params[args.puck].get("trainer", "off") == "off"
-        and bar_params[args.bar].get("trainer", "off") == "off"
+        and (puck_trainer or "off") == "off"
+        and (bar_trainer or "off") == "off"
     ):
         result = offpolicy_trainer(
             policy,
@@ -332,8 +341,8 @@ def train():
         )
     elif (
         args.trainer == "on"
-        and puck_params[args.puck].get("trainer", "on") == "on"
-        and bar_params[args.bar].get("trainer", "on") == "on"
+        and (puck_trainer or "on") == "on"
+        and (bar_trainer or "on") == "on"
     ):
         result = ts.trainer.onpolicy_trainer(
             policy,
@@ -0,0 +1,538 @@
+import numpy as np
+import multiprocessing as mp
+import pickle
+from multiprocessing.sharedctypes import RawArray
+from tianshou.data import Batch
+from tianshou.env import BaseVectorEnv, DummyVectorEnv, SubprocVectorEnv
+import torch
+from gym_env.envs import BatchedPSE
+from gym_env.envs.torch_penalty_shot import TorchBatchedPSE
+from utils.envs import MakeEnv, make_envs
+from utils.episode_log import EpisodeWriter
+
+
+def _seed_list(seed, env_num):
+    """Seeds of every environment, as tianshou's vector environments seed them"""
+    if seed is None:
+        return [seed] * env_num
+    elif isinstance(seed, int):
+        return [seed + i for i in range(env_num)]
+    return seed
+
+
+class BatchedVectorEnv(BaseVectorEnv):
+    """In-process vector environment running all the environments on a single BatchedPSE
+
+    Behaves like a ``DummyVectorEnv`` over ``EnvWrapper`` environments (same flattened observations, reward
+    shaping and discrete action mapping) but steps all the environments with a handful of NumPy operations.
+    The environments do not render while they are stepped, use the ``subproc`` or ``dummy`` backend to render or
+    save renders of environments.
+
+    Args:
+        BaseVectorEnv (): Tianshou's base vector environment class
+    """
+
+    def __init__(
+        self,
+        num_envs: int = 1,
+        discrete: dict = {},
+        modified_reward: str = "exp",
+        flat_obs: bool = True,
+        render_env_count: int = 0,
+        render_skip_ep: int = 100,
+        episode_log_path: str = None,
+        **kwargs
+    ):
+        """In-process vector environment on BatchedPSE
+
+        Takes the parameters of ``make_envs``. Observations are flattened whatever flat_obs, as ``EnvWrapper``
+        flattens them, and render_skip_ep is only used by environments which render.
+
+        Args:
+            num_envs (int, optional): Number of environments. Defaults to 1.
+            discrete (dict, optional): Number of discrete actions of the discretised agents. Defaults to {}.
+            modified_reward (str, optional): Reward shaping, None, "exp" or "puck_exp". Defaults to "exp".
+            flat_obs (bool, optional): Whether PSE flattens its observations. Defaults to True.
+            render_env_count (int, optional): Number of environments rendering, must be 0. Defaults to 0.
+            render_skip_ep (int, optional): Episodes skipped between renders. Defaults to 100.
+            episode_log_path (str, optional): Episode log the episodes are appended to (see ``EpisodeWriter``).
+                Defaults to None.
+
+        Raises:
+            Exception: If the reward type is not identified
+            ValueError: If environments should render or are given parameters the backend does not support
+        """
+        if modified_reward not in [None, "exp", "puck_exp"]:
+            raise Exception("Unidentified reward type")
+        if render_env_count > 0:
+            raise ValueError(
+                "{} does not render environments, use the subproc or dummy backend".format(type(self).__name__)
+            )
+        if kwargs:
+            raise ValueError(
+                "{} does not support {}, use the subproc, dummy or shmem backend".format(
+                    type(self).__name__, ", ".join(sorted(kwargs))
+                )
+            )
+
+        # Environment used only to expose the same spaces as EnvWrapper
+        self.spec_env = MakeEnv(discrete=discrete, modified_reward=modified_reward).create_env()
+        self.engine = BatchedPSE(num_envs)
+        self.discrete = discrete
+        self.modified_reward = modified_reward
+        # One writer per environment, as every EnvWrapper of the other backends has its own
+        self.episode_logs = (
+            [EpisodeWriter(episode_log_path) for _ in range(num_envs)] if episode_log_path else None
+        )
+        self.seeds = [self.spec_env.unwrapped.mainSeed] * num_envs  # Seeds of the logged episodes
+
+        pse_spaces = self.spec_env.unwrapped.state_space.spaces
+        self.theta_n, self.v_ind_n = pse_spaces[2].n, pse_spaces[3].n
+
+        self.env_num = num_envs
+        self.wait_num = num_envs
+        self.timeout = None
+        self.is_async = False
+        self.waiting_conn = []
+        self.waiting_id = []
+        self.ready_id = list(range(self.env_num))
+        self.is_closed = False
+        self.norm_obs = False
+        self.obs_rms = None
+        self.update_obs_rms = False
+
+    def __getattr__(self, key):
+        """Fetches attributes like action_space from the EnvWrapper used for the spaces"""
+        spec_env = self.__dict__.get("spec_env")
+        if spec_env is None:
+            raise AttributeError(key)
+        return [getattr(spec_env, key)] * self.env_num
+
+    def _flatten(self, state):
+        """Flattens a batch of PSE states exactly like FlattenObservation does for a single state
+
+        Args:
+            state (Tuple[np.ndarray]): Batched state returned by BatchedPSE
+
+        Returns:
+            np.ndarray: Array of flattened observations
+        """
+        puck_pos, bar_pos, theta, v_ind = state
+        n = len(theta)
+        obs = np.zeros((n, 4 + self.theta_n + self.v_ind_n))
+        obs[:, 0:2] = puck_pos.astype(np.float32)
+        obs[:, 2:4] = bar_pos.astype(np.float32)
+        obs[np.arange(n), 4 + theta] = 1
+        obs[np.arange(n), 4 + self.theta_n + v_ind] = 1
+        return obs
+
+    def _map_action(self, agent, act, n):
+        """Maps a batch of actions of an agent to the continuous actions taken by PSE
+
+        Args:
+            agent (str): Name of the agent
+            act (np.ndarray): Batch of actions of the agent
+            n (int): Number of environments stepped
+
+        Returns:
+            np.ndarray: Array of actions of shape (n,)
+        """
+        act = np.asarray(act)
+        if agent in self.discrete:
+            # Same as unflattening a one hot Discrete action in EnvWrapper
+            return np.argmax(act.reshape(n, self.discrete[agent]) != 0, axis=1)
+        return act.reshape(n, -1)[:, 0]
+
+    def _begin_episodes(self, id):
+        """Starts logging the episodes of the environments in id, which were just reset"""
+        if self.episode_logs is not None:
+            for i in id:
+                self.episode_logs[i].begin(self.spec_env.unwrapped, seed=self.seeds[i])
+
+    def _record_actions(self, id, puck_action, bar_action):
+        """Logs the actions of the environments in id
+
+        Returns:
+            Tuple[np.ndarray]: Puck and bar actions, rounded to float32 as they are logged so that replays match
+        """
+        if self.episode_logs is None:
+            return puck_action, bar_action
+        for i, puck, bar in zip(id, puck_action, bar_action):
+            self.episode_logs[i].record({"puck": puck, "bar": bar})
+        return puck_action.astype(np.float32), bar_action.astype(np.float32)
+
+    def _end_episodes(self, id, rew, done):
+        """Writes the finished episodes of the environments in id to the log, rew being the reward of PSE"""
+        if self.episode_logs is not None:
+            for i, outcome in zip(id[done], rew[done]):
+                self.episode_logs[i].end(outcome)
+
+    def _close_episode_logs(self):
+        if self.episode_logs is not None:
+            for episode_log in self.episode_logs:
+                episode_log.close()
+
+    def reset(self, id=None):
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        self._begin_episodes(id)
+        return self._flatten(self.engine.reset(id))
+
+    def step(self, action, id=None):
+        """Steps the environments in id with the given actions
+
+        Args:
+            action (Batch): Batch with the actions of the puck and the bar for every environment in id
+            id (List[int], optional): Indices of the environments to step. Defaults to None (all environments).
+
+        Returns:
+            List: Observations, rewards, dones and a Batch of infos with steps and env_id
+        """
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        puck_action = self._map_action("puck", action["puck"], len(id))
+        bar_action = self._map_action("bar", action["bar"], len(id))
+        puck_action, bar_action = self._record_actions(id, puck_action, bar_action)
+
+        state, rew, done, info = self.engine.step(puck_action, bar_action, ids=id)
+        self._end_episodes(id, rew, done)
+        obs = self._flatten(state)
+        rew = self._shape_reward(obs, rew.astype(np.float64), done)
+        return [obs, rew, done, Batch(steps=info["steps"], env_id=id)]
+
+    def _shape_reward(self, obs, rew, done):
+        """Applies the reward shaping of EnvWrapper to a batch of rewards, in place
+
+        Args:
+            obs (np.ndarray): Flattened observations
+            rew (np.ndarray): Rewards of PSE as float64
+            done (np.ndarray): Mask of the environments which are over
+
+        Returns:
+            np.ndarray: Shaped rewards
+        """
+        if self.modified_reward is not None:
+            # Same exponential reward functions as EnvWrapper
+            scale = 3 if self.modified_reward == "exp" else 25
+            dist = np.abs(obs[:, 0] - obs[:, 2]) + np.abs(obs[:, 1] - obs[:, 3])
+            rew[done] = 2 * np.exp(-scale * dist[done] ** 2) - 1
+        return rew
+
+    def seed(self, seed=None):
+        self.engine.seed(seed)
+        self.seeds = _seed_list(seed, self.env_num)
+        return [None] * self.env_num
+
+    def render(self, mode="rgb_array", **kwargs):
+        self._assert_is_not_closed()
+        if mode != "rgb_array":
+            raise NotImplementedError("BatchedVectorEnv only renders in rgb_array mode")
+        return list(self.engine.render().copy())
+
+    def close(self):
+        self._assert_is_not_closed()
+        self.engine.close()
+        self.spec_env.close()
+        self._close_episode_logs()
+        self.is_closed = True
+
+
+class TorchVectorEnv(BatchedVectorEnv):
+    """In-process vector environment running all the environments on a single TorchBatchedPSE
+
+    Same observations, rewards and dones as ``BatchedVectorEnv``, with the games stepped on torch tensors. Tianshou's
+    collector works on numpy arrays, so actions are converted to tensors and observations back to arrays at every
+    step; rollouts which keep the policy on tensors can use ``engine`` directly. Rendering is not supported.
+
+    Args:
+        BatchedVectorEnv (): In-process vector environment on BatchedPSE
+    """
+
+    def __init__(self, num_envs: int = 1, device: str = "cpu", **kwargs):
+        super().__init__(num_envs, **kwargs)
+        self.engine = TorchBatchedPSE(num_envs, device=device)
+        self.device = device
+
+    def reset(self, id=None):
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        self._begin_episodes(id)
+        return self.engine.reset(torch.as_tensor(id, device=self.device)).cpu().numpy().astype(np.float64)
+
+    def step(self, action, id=None):
+        """Steps the environments in id with the given actions
+
+        Args:
+            action (Batch): Batch with the actions of the puck and the bar for every environment in id
+            id (List[int], optional): Indices of the environments to step. Defaults to None (all environments).
+
+        Returns:
+            List: Observations, rewards, dones and a Batch of infos with steps and env_id
+        """
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        puck_action = self._map_action("puck", action["puck"], len(id))
+        bar_action = self._map_action("bar", action["bar"], len(id))
+        puck_action, bar_action = self._record_actions(id, puck_action, bar_action)
+
+        obs, rew, done, info = self.engine.step(
+            torch.as_tensor(puck_action),
+            torch.as_tensor(bar_action),
+            ids=torch.as_tensor(id, device=self.device),
+        )
+        obs = obs.cpu().numpy().astype(np.float64)
+        done = done.cpu().numpy().copy()
+        rew = rew.cpu().numpy().astype(np.float64)
+        self._end_episodes(id, rew, done)
+        rew = self._shape_reward(obs, rew, done)
+        return [obs, rew, done, Batch(steps=info["steps"].cpu().numpy(), env_id=id)]
+
+    def seed(self, seed=None):
+        # The dynamics of PSE are deterministic, the seeds are only logged with the episodes
+        self.seeds = _seed_list(seed, self.env_num)
+        return [None] * self.env_num
+
+    def render(self, mode="rgb_array", **kwargs):
+        raise NotImplementedError("TorchVectorEnv does not render, use the batched backend to render environments")
+
+    def close(self):
+        self._assert_is_not_closed()
+        self.spec_env.close()
+        self._close_episode_logs()
+        self.is_closed = True
+
+
+def _shared_array(dtype, shape):
+    """Allocates a shared memory block which can be viewed as an array of the given dtype and shape"""
+    dtype = np.dtype(dtype)
+    return (RawArray(np.ctypeslib.as_ctypes_type(dtype), int(np.prod(shape))), dtype, shape)
+
+
+def _as_array(buffer):
+    """Numpy view of a block allocated by _shared_array"""
+    raw, dtype, shape = buffer
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _read_action(act):
+    """Copies an action out of shared memory, single valued actions are given to the environment as floats"""
+    return act.item() if act.size == 1 else act.copy()
+
+
+def _shard_worker(parent, pipe, env_fns, offset, buffers):
+    """Worker process stepping a shard of environments and writing results into shared memory
+
+    The step and reset doorbells are single byte messages, the environments to step are marked in the todo
+    block and the actions are read from the action blocks. Any other command is a pickled (command, data) tuple.
+
+    Args:
+        parent (Connection): Parent end of the pipe, closed in the worker
+        pipe (Connection): Worker end of the pipe
+        env_fns (List[Callable]): Functions creating the environments of the shard
+        offset (int): Global index of the first environment of the shard
+        buffers (dict): Shared memory blocks
+    """
+    parent.close()
+    envs = [env_fn() for env_fn in env_fns]
+    arrays = {key: _as_array(buffer) for key, buffer in buffers.items()}
+    obs, rew, done, steps = arrays["obs"], arrays["rew"], arrays["done"], arrays["steps"]
+    act_puck, act_bar, todo = arrays["act_puck"], arrays["act_bar"], arrays["todo"]
+    shard = range(offset, offset + len(envs))
+
+    while True:
+        msg = pipe.recv_bytes()
+        if msg == b"s":
+            for j, env in zip(shard, envs):
+                if todo[j]:
+                    action = {
+                        "puck": _read_action(act_puck[j]),
+                        "bar": _read_action(act_bar[j]),
+                    }
+                    obs[j], rew[j], done[j], info = env.step(action)
+                    steps[j] = info["steps"]
+            pipe.send_bytes(b"")
+        elif msg == b"r":
+            for j, env in zip(shard, envs):
+                if todo[j]:
+                    obs[j] = env.reset()
+            pipe.send_bytes(b"")
+        else:
+            cmd, data = pickle.loads(msg)
+            if cmd == "seed":
+                pipe.send([env.seed(seed) for env, seed in zip(envs, data)])
+            elif cmd == "render":
+                pipe.send([env.render(**data) for env in envs])
+            elif cmd == "getattr":
+                pipe.send([getattr(env, data) for env in envs])
+            elif cmd == "close":
+                pipe.send([env.close() for env in envs])
+                pipe.close()
+                break
+
+
+class ShardedShmemVectorEnv(BaseVectorEnv):
+    """Subprocess vector environment where every worker process owns a shard of environments
+
+    Observations, rewards, dones, ``info["steps"]`` and actions are exchanged through preallocated shared
+    memory blocks, so a step only costs a one byte doorbell message per worker instead of pickling every
+    observation and action through a pipe.
+
+    Args:
+        BaseVectorEnv (): Tianshou's base vector environment class
+    """
+
+    def __init__(self, env_fns, num_workers: int = None):
+        self.env_num = len(env_fns)
+        self.wait_num = self.env_num
+        self.timeout = None
+        self.is_async = False
+        self.waiting_conn = []
+        self.waiting_id = []
+        self.ready_id = list(range(self.env_num))
+        self.is_closed = False
+        self.norm_obs = False
+        self.obs_rms = None
+        self.update_obs_rms = False
+
+        # Query the spaces once to size the shared memory blocks
+        dummy = env_fns[0]()
+        obs_space, action_space = dummy.observation_space, dummy.action_space
+        dummy.close()
+
+        self.buffers = {
+            "obs": _shared_array(obs_space.dtype, (self.env_num,) + obs_space.shape),
+            "rew": _shared_array(np.float64, (self.env_num,)),
+            "done": _shared_array(np.bool_, (self.env_num,)),
+            "steps": _shared_array(np.int64, (self.env_num,)),
+            "act_puck": _shared_array(
+                np.float64, (self.env_num,) + action_space["puck"].shape
+            ),
+            "act_bar": _shared_array(
+                np.float64, (self.env_num,) + action_space["bar"].shape
+            ),
+            "todo": _shared_array(np.bool_, (self.env_num,)),
+        }
+        self.arrays = {key: _as_array(buffer) for key, buffer in self.buffers.items()}
+
+        # Split the environments in contiguous shards, one per worker
+        num_workers = min(num_workers or mp.cpu_count(), self.env_num)
+        shards = np.array_split(np.arange(self.env_num), num_workers)
+        self.worker_of = np.empty(self.env_num, dtype=np.int64)
+        self.pipes, self.processes = [], []
+        for w, shard in enumerate(shards):
+            self.worker_of[shard] = w
+            parent, child = mp.Pipe()
+            process = mp.Process(
+                target=_shard_worker,
+                args=(parent, child, [env_fns[j] for j in shard], shard[0], self.buffers),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    def __getattr__(self, key):
+        """Fetches an attribute from every environment"""
+        pipes = self.__dict__.get("pipes")
+        if pipes is None:
+            raise AttributeError(key)
+        return self._broadcast("getattr", key)
+
+    def _broadcast(self, cmd, data):
+        """Sends a command to every worker and concatenates the per-environment results"""
+        for pipe in self.pipes:
+            pipe.send((cmd, data))
+        return [res for pipe in self.pipes for res in pipe.recv()]
+
+    def _ring(self, doorbell, id):
+        """Marks the environments in id and rings the workers owning them, waiting for them to finish"""
+        todo = self.arrays["todo"]
+        todo[:] = False
+        todo[id] = True
+        workers = np.unique(self.worker_of[id])
+        for w in workers:
+            self.pipes[w].send_bytes(doorbell)
+        for w in workers:
+            self.pipes[w].recv_bytes()
+
+    def reset(self, id=None):
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        self._ring(b"r", id)
+        return self.arrays["obs"][id]
+
+    def step(self, action, id=None):
+        """Steps the environments in id with the given actions
+
+        Args:
+            action (Batch): Batch with the actions of the puck and the bar for every environment in id
+            id (List[int], optional): Indices of the environments to step. Defaults to None (all environments).
+
+        Returns:
+            List: Observations, rewards, dones and a Batch of infos with steps and env_id
+        """
+        self._assert_is_not_closed()
+        id = np.asarray(self._wrap_id(id))
+        self.arrays["act_puck"][id] = np.asarray(action["puck"]).reshape(
+            (len(id),) + self.arrays["act_puck"].shape[1:]
+        )
+        self.arrays["act_bar"][id] = np.asarray(action["bar"]).reshape(
+            (len(id),) + self.arrays["act_bar"].shape[1:]
+        )
+        self._ring(b"s", id)
+        return [
+            self.arrays["obs"][id],
+            self.arrays["rew"][id],
+            self.arrays["done"][id],
+            Batch(steps=self.arrays["steps"][id], env_id=id),
+        ]
+
+    def seed(self, seed=None):
+        self._assert_is_not_closed()
+        seed_list = _seed_list(seed, self.env_num)
+        for w, pipe in enumerate(self.pipes):
+            pipe.send(("seed", [seed_list[j] for j in np.flatnonzero(self.worker_of == w)]))
+        return [res for pipe in self.pipes for res in pipe.recv()]
+
+    def render(self, **kwargs):
+        self._assert_is_not_closed()
+        return self._broadcast("render", kwargs)
+
+    def close(self):
+        self._assert_is_not_closed()
+        self._broadcast("close", None)
+        for process in self.processes:
+            process.join()
+        self.is_closed = True
+
+
+# Maps names of the vector environment backends to their classes
+vector_env_mapping = {
+    "subproc": SubprocVectorEnv,
+    "dummy": DummyVectorEnv,
+    "batched": BatchedVectorEnv,
+    "shmem": ShardedShmemVectorEnv,
+    "torch": TorchVectorEnv,
+}
+
+
+def make_vector_env(
+    num_envs: int = 1, backend: str = "subproc", num_workers: int = None, **kwargs
+):
+    """Creates a vector environment of num_envs environments with the given backend
+
+    Args:
+        num_envs (int, optional): Number of environments to create. Defaults to 1.
+        backend (str, optional): One of the keys of vector_env_mapping. Defaults to "subproc".
+        num_workers (int, optional): Number of worker processes of the shmem backend. Defaults to None (cpu count).
+
+    Returns:
+        BaseVectorEnv: Vector environment
+    """
+    if backend in ["batched", "torch"]:
+        return vector_env_mapping[backend](num_envs, **kwargs)
+    (_, env_fns) = make_envs(num_envs, **kwargs)
+    if backend == "shmem":
+        return ShardedShmemVectorEnv(env_fns, num_workers=num_workers)
+    return vector_env_mapping[backend](env_fns)
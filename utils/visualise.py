@@ -3,13 +3,13 @@ import numpy as np
 import tianshou as ts
 import pprint
 from tianshou.utils import WandbLogger
-from tianshou.env import SubprocVectorEnv
 from tianshou.data import Collector, VectorReplayBuffer
 from tianshou.trainer import offpolicy_trainer, onpolicy_trainer
 from torch.serialization import save
 from agents import TwoAgentPolicy
 from agents.lib_agents import *
 from utils.envs import make_envs, MakeEnv
+from utils.vector_envs import make_vector_env, vector_env_mapping
 from utils.config import puck_params, bar_params, env_params
 import argparse
 import os
@@ -129,6 +129,13 @@ def get_args():
     parser.add_argument("--batch-size", type=int, default=64)
     parser.add_argument("--training-num", type=int, default=10)
     parser.add_argument("--test-num", type=int, default=100)
+    parser.add_argument(
+        "--vector-env",
+        type=str,
+        default="subproc",
+        choices=list(vector_env_mapping.keys()),
+    )
+    parser.add_argument("--vector-env-workers", type=int, default=None)
     parser.add_argument("--logdir", type=str, default="log")
     parser.add_argument("--render", type=float, default=0.0)
     parser.add_argument(
@@ -147,6 +154,7 @@ def get_args():
     parser.add_argument("--load-bar-id", type=str, default=None)
     parser.add_argument("--run-id", type=str, default=None)
     parser.add_argument("--save-render", type=str, default=None)
+    parser.add_argument("--episode-log", type=str, default=None)
     parser.add_argument("--num-episodes-render", type=int, default=10)
     return parser.parse_args()
 
@@ -256,8 +264,14 @@ def visualise():
     # Create testing environments
     if args.save_render: 
         env_params["test"]["save_render_path"] = args.save_render
-    (test_envs_obj, test_envs) = make_envs(args.test_num, **env_params["test"])
-    test_envs = SubprocVectorEnv(test_envs)
+    if args.episode_log:
+        env_params["test"]["episode_log_path"] = args.episode_log
+    test_envs = make_vector_env(
+        args.test_num,
+        args.vector_env,
+        num_workers=args.vector_env_workers,
+        **env_params["test"],
+    )
     print(
         f"Created {args.test_num} test environments.."
     )